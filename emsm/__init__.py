@@ -40,6 +40,10 @@ from .license_ import LICENSE
 from .version import VERSION
 from . import logging_ as logging
 from . import paths
+from . import ping
 from . import plugins
+from . import profile_ as profile
+from . import rcon
 from . import server
+from . import trace
 from . import worlds
@@ -31,10 +31,13 @@ import os
 import pwd
 import grp
 import sys
+import time
 import logging
 import atexit
+import contextlib
 
 # third party
+import blinker
 import filelock
 
 # local
@@ -44,7 +47,9 @@ from . import conf
 from . import logging_
 from . import paths
 from . import plugins
+from . import profile_
 from . import server
+from . import trace
 from . import worlds
 from . import license_
 from . import version
@@ -127,6 +132,12 @@ class Application(object):
         self._server = server.ServerManager(self)
         self._plugins = plugins.PluginManager(self)
 
+        # The time in seconds, the application waited for the file lock.
+        self._lock_wait_time = None
+
+        # The profiler of the run phases, if ``--profile`` is given.
+        self._profiler = None
+
         # The exit code can be changed by plugins. This is useful when the
         # plugin does or can not throw a SystemExit() exception.
         self._exit_code = 0
@@ -144,6 +155,23 @@ class Application(object):
         """
         return self._conf
 
+    def lock(self):
+        """
+        Returns the EMSM file lock, which is held from :meth:`setup` until
+        :meth:`finish`.
+
+        Long running plugins may release the lock while they are idle, but
+        must hold it again, when they return.
+        """
+        return self._lock
+
+    def lock_wait_time(self):
+        """
+        Returns the time in seconds, :meth:`setup` waited for the file lock,
+        or ``None``, if the lock has not been acquired yet.
+        """
+        return self._lock_wait_time
+
     def argparser(self):
         """
         Returns the EMSM :class:`~emsm.argparse_.ArgumentParser` that is used
@@ -258,6 +286,99 @@ class Application(object):
         log.exception("uncaught exception:")
         return None
         
+    def _setup_trace(self):
+        """
+        Starts the tracer, if the ``--trace`` argument is given, and records
+        the lifecycle signals as instant events.
+
+        .. seealso::
+
+            * :mod:`emsm.trace`
+        """
+        if self._argparser.early_args().trace is None:
+            return None
+
+        trace.start()
+
+        def trace_signal(signal):
+            def receiver(sender, **kwargs):
+                name = sender.name() if hasattr(sender, "name") else sender
+                trace.instant(signal.name, "signal", sender=name)
+                return None
+            signal.connect(receiver, weak=False)
+            return None
+
+        for name in ("world_uninstalled", "world_about_to_start",
+                     "world_started", "world_start_failed",
+                     "world_about_to_stop", "world_stopped",
+                     "world_stop_failed", "backup_created", "guard_action",
+                     "initd_start", "initd_stop", "plugin_uninstalled"):
+            trace_signal(blinker.signal(name))
+        return None
+
+    def _write_trace(self):
+        """
+        Stops the tracer and writes the trace to the ``--trace`` file.
+        """
+        tracer = trace.stop()
+        if tracer is None:
+            return None
+
+        path = self._argparser.early_args().trace
+        try:
+            tracer.write(path)
+        except OSError as err:
+            log.error("could not write the trace to '{}': {}"\
+                      .format(path, err))
+        else:
+            log.info("wrote the trace to '{}'.".format(path))
+        return None
+
+    def _write_profile(self):
+        """
+        Writes the profile to the ``--profile`` file and the summary of the
+        phases to the same path with the suffix *.txt*. The summary is also
+        printed to *stderr*.
+        """
+        if self._profiler is None:
+            return None
+
+        path = self._argparser.early_args().profile
+        summary = self._profiler.summary()
+        try:
+            self._profiler.write(path)
+            with open(path + ".txt", "w") as file:
+                file.write(summary + "\n")
+        except OSError as err:
+            log.error("could not write the profile to '{}': {}"\
+                      .format(path, err))
+        else:
+            log.info("wrote the profile to '{}'.".format(path))
+
+        print("EMSM profile ({}):".format(path), file=sys.stderr)
+        print(summary, file=sys.stderr)
+        self._profiler = None
+        return None
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        """
+        Traces and profiles the code in the context as the run phase
+        *name*.
+
+        .. seealso::
+
+            * :mod:`emsm.trace`
+            * :mod:`emsm.profile_`
+        """
+        with trace.span(name):
+            if self._profiler is None:
+                yield
+            else:
+                with self._profiler.phase(name):
+                    yield
+        return None
+
     def setup(self):
         """
         Initialises all components of the EMSM.
@@ -265,6 +386,20 @@ class Application(object):
         This method will block, until the EMSM filelock could be acquired or
         the configuration timeout value is reached.
         """
+        self._setup_trace()
+        if self._argparser.early_args().profile is not None:
+            self._profiler = profile_.PhaseProfiler()
+
+        with trace.span("Application.setup"):
+            self._setup()
+        return None
+
+    def _setup(self):
+        """
+        .. seealso::
+
+            * :meth:`setup`
+        """
         log.info("----------")
         log.info("setting the EMSM {} up ...".format(version.VERSION))
         
@@ -274,7 +409,8 @@ class Application(object):
         # since the EMSM simply uses default values if the configuration
         # files are not available, so *self._paths.create()* can be called
         # later.
-        self._conf.read()
+        with self._phase("conf read"):
+            self._conf.read()
 
         # Try to switch the EMSM user and the EMSM root directory before doing
         # anything else.
@@ -292,21 +428,30 @@ class Application(object):
         
         lock_timeout = self._conf.main()["emsm"].getint("timeout", 0)
         lock_timeout = lock_timeout if lock_timeout > 0 else None
-        self._lock.acquire(lock_timeout, 0.05)
+        lock_wait_start = time.monotonic()
+        with self._phase("lock wait"):
+            self._lock.acquire(lock_timeout, 0.05)
+        self._lock_wait_time = time.monotonic() - lock_wait_start
 
         # Now we have the file lock, so we can acquire the emsm.log file.
         self._logger.setup()
 
         # Reload the configuration again, since it may have changed while
-        # waiting for the file lock.
-        self._conf.read()
+        # waiting for the file lock. (Only the modified files are read
+        # again.)
+        with self._phase("conf read"):
+            self._conf.read()
 
-        self._worlds.load_worlds()
-        
-        self._plugins.setup()
-        self._plugins.init_plugins()
-        
+        with self._phase("world load"):
+            self._worlds.load_worlds()
+
+        # The global arguments are needed to find the selected plugin.
         self._argparser.setup()
+
+        with self._phase("plugin import"):
+            self._plugins.setup()
+        with self._phase("plugin init"):
+            self._plugins.init_plugins()
         return None
 
     def run(self):
@@ -322,12 +467,15 @@ class Application(object):
         self._argparser.args(cache=False)
 
         # Dispatch the plugins.
-        self._plugins.run()
-        self._plugins.finish()
+        with self._phase("plugin run"):
+            self._plugins.run()
+        with self._phase("plugin finish"):
+            self._plugins.finish()
 
         # Save changes to the configuration that have been made during
-        # execution.
-        self._conf.write()
+        # execution. (Only the modified files are written.)
+        with self._phase("conf write"):
+            self._conf.write()
         return None
 
     def finish(self):
@@ -347,6 +495,9 @@ class Application(object):
             * :meth:`run`
             * :meth:`exit_code`
         """
+        self._write_trace()
+        self._write_profile()
+
         log.info("EMSM finished.")
         self._lock.release()
         return self._exit_code
@@ -32,6 +32,8 @@ Python :class:`argparse.ArgumentParser` for the EMSM.
 # ------------------------------------------------
 
 # std
+import os
+import sys
 import argparse
 import subprocess
 import logging
@@ -47,12 +49,39 @@ from .version import VERSION
 __all__ = [
     "LicenseAction",
     "LongHelpAction",
-    "ArgumentParser"
+    "ArgumentParser",
+    "describe_arguments"
     ]
 
 log = logging.getLogger(__file__)
 
 
+# Functions
+# ------------------------------------------------
+
+def describe_arguments(parser):
+    """
+    Returns a JSON serialisable description of the arguments of the
+    *parser*, which can be restored with
+    :meth:`ArgumentParser.plugin_help_parser`. The help actions are not
+    included.
+    """
+    arguments = list()
+    for action in parser._actions:
+        if isinstance(action, (argparse._HelpAction, LongHelpAction)):
+            continue
+        metavar = action.metavar
+        arguments.append({
+            "option_strings": list(action.option_strings),
+            "dest": action.dest,
+            "nargs": action.nargs,
+            "metavar": list(metavar) if isinstance(metavar, tuple) \
+                       else metavar,
+            "help": action.help
+            })
+    return arguments
+
+
 # Classes
 # ------------------------------------------------
 
@@ -180,8 +209,49 @@ class ArgumentParser(object):
             description = "The name of the plugin, you want to invoke."
             )
 
+        # The global arguments, which are needed before the plugins are
+        # loaded, are parsed by an own parser first. Abbreviations are not
+        # allowed, since the parser would otherwise take the options of the
+        # plugins, which are prefixes of the early arguments.
+        self._early_argparser = argparse.ArgumentParser(
+            add_help=False, allow_abbrev=False
+            )
+        self._add_early_arguments(self._early_argparser)
+        self._add_early_arguments(self._argparser)
+
         # Contains and caches the parsed arguments.
         self._args = None
+        self._early_args = None
+        return None
+
+    def _add_early_arguments(self, parser):
+        """
+        Adds the global arguments, which are evaluated before the
+        application is set up, to the *parser*.
+
+        .. seealso::
+
+            * :meth:`early_args`
+        """
+        parser.add_argument(
+            "--trace",
+            action = "store",
+            dest = "trace",
+            metavar = "FILE",
+            type = os.path.abspath,
+            default = None,
+            help = "Writes a trace of the run in the Chrome trace event "\
+            "format to FILE."
+            )
+        parser.add_argument(
+            "--profile",
+            action = "store",
+            dest = "profile",
+            metavar = "OUT",
+            type = os.path.abspath,
+            default = None,
+            help = "Profiles the run phases and writes the pstats to OUT."
+            )
         return None
 
     def argparser(self):
@@ -211,11 +281,104 @@ class ArgumentParser(object):
             log.info("parsed arguments: {}".format(self._args))
         return self._args
 
+    def early_args(self):
+        """
+        Returns a namespace object with the global arguments, which are
+        needed before the plugins and worlds are loaded (e.g. ``--trace``
+        or ``--profile``).
+
+        Only these arguments are parsed, all other arguments are ignored
+        and parsed later by :meth:`args`.
+
+        .. seealso::
+
+            * :meth:`argparse.ArgumentParser.parse_known_args`
+        """
+        if self._early_args is None:
+            self._early_args, rest = self._early_argparser.parse_known_args()
+        return self._early_args
+
+    def selected_plugin(self):
+        """
+        Returns the name of the plugin, which is selected on the command
+        line, or ``None``. The arguments are not validated.
+
+        The name is needed to load the plugin, before the arguments can be
+        parsed. It is the first argument, which is neither a global option
+        nor its value. So the global arguments must have been added with
+        :meth:`setup` before.
+        """
+        # The global options, which are followed by a value.
+        options = set()
+        for action in self._argparser._actions:
+            if action.option_strings and action.nargs != 0:
+                options.update(action.option_strings)
+
+        argv = sys.argv[1:]
+        i = 0
+        while i < len(argv):
+            if argv[i] == "--":
+                return argv[i + 1] if i + 1 < len(argv) else None
+            elif not argv[i].startswith("-"):
+                return argv[i]
+            elif argv[i] in options:
+                i += 1
+            i += 1
+        return None
+
     def plugin_parser(self, plugin_name):
         """
         Returns the subparser for the plugin with the name *plugin_name*.
+        The subparser is created, if it does not exist yet or if it only
+        has been created by :meth:`plugin_help_parser`.
+        """
+        parser = self._plugin_subparsers.choices.get(plugin_name)
+        if parser is not None and getattr(parser, "emsm_help_only", False):
+            del self._plugin_subparsers.choices[plugin_name]
+            parser = None
+        if parser is None:
+            parser = self._plugin_subparsers.add_parser(plugin_name)
+        return parser
+
+    def plugin_help_parser(self, plugin_name, description, arguments):
         """
-        return self._plugin_subparsers.add_parser(plugin_name)
+        Creates the subparser for the plugin *plugin_name*, which has not
+        been loaded, from the cached *description* and *arguments*, so that
+        the plugin is documented in the help of the EMSM.
+
+        The parser only describes the arguments of the plugin. It is replaced
+        by :meth:`plugin_parser`, when the plugin is loaded.
+
+        :param list arguments:
+            A list of dictionaries created by :func:`describe_arguments`.
+        """
+        if plugin_name in self._plugin_subparsers.choices:
+            return self._plugin_subparsers.choices[plugin_name]
+
+        parser = self._plugin_subparsers.add_parser(plugin_name)
+        parser.emsm_help_only = True
+        parser.description = description
+        for argument in arguments:
+            kargs = {"help": argument["help"]}
+            if argument["option_strings"]:
+                kargs["dest"] = argument["dest"]
+            if argument["nargs"] == 0:
+                kargs["action"] = "store_true"
+            else:
+                kargs["nargs"] = argument["nargs"]
+                kargs["metavar"] = tuple(argument["metavar"]) \
+                                   if isinstance(argument["metavar"], list) \
+                                   else argument["metavar"]
+            try:
+                parser.add_argument(
+                    *(argument["option_strings"] or [argument["dest"]]),
+                    **kargs
+                    )
+            except (argparse.ArgumentError, TypeError, ValueError) as err:
+                log.warning("could not restore the argument '{}' of the "\
+                            "plugin '{}': {}"\
+                            .format(argument["dest"], plugin_name, err))
+        return parser
 
     def setup(self):
         """
@@ -69,6 +69,16 @@ class BasePlugin(object):
     #: A higher value results in a later call of the finish method.
     FINISH_PRIORITY = 0
 
+    #: If ``True``, the plugin is loaded on every run of the EMSM. Otherwise,
+    #: it is only loaded, when it is selected on the command line or needed
+    #: by another plugin. Set this, if the plugin subscribes to signals or
+    #: does some work in :meth:`finish`.
+    #:
+    #: .. seealso::
+    #:
+    #:      * :class:`emsm.plugins.PluginManager`
+    SUBSCRIBER = False
+
     #: The last version number of the EMSM version that worked correctly
     #: with that plugin.
     VERSION = "0.0.0"
@@ -48,6 +48,7 @@ __all__ = [
     "ConfigParser",
     "MainConfiguration",
     "WorldsConfiguration",
+    "ServerConfiguration",
     "Configuration"
     ]
 
@@ -62,6 +63,9 @@ class ConfigParser(configparser.ConfigParser):
     Extends the standard Python :class:`configparser.ConfigParser` by some
     useful methods.
 
+    The parser keeps track of the modifications, so that the configuration
+    file is only written, if something changed.
+
     :param str path:
         The path to the configuration file. This file is used, when you call
         :meth:`read` or :meth:`write`.
@@ -80,6 +84,13 @@ class ConfigParser(configparser.ConfigParser):
             interpolation=configparser.ExtendedInterpolation()
             )
         self._path = path
+
+        # ``True``, if the configuration differs from the file.
+        self._dirty = False
+
+        # The stat key of the file, when it has been read or written the last
+        # time.
+        self._stat = None
         return None
 
     def path(self):
@@ -88,21 +99,130 @@ class ConfigParser(configparser.ConfigParser):
         """
         return self._path
 
+    def is_dirty(self):
+        """
+        Returns ``True``, if the configuration has been modified since the
+        last :meth:`read` or :meth:`write`.
+        """
+        return self._dirty
+
+    def _file_stat(self):
+        """
+        Returns a key, which changes when the file at :meth:`path` is
+        modified, or ``None`` if the file does not exist.
+        """
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def set(self, section, option, value=None):
+        """
+        Sets the *option* and marks the configuration as modified, if the
+        value changed.
+        """
+        try:
+            old_value = self.get(section, option, raw=True)
+        except (configparser.NoSectionError, configparser.NoOptionError):
+            old_value = None
+        super().set(section, option, value)
+        if value != old_value:
+            self._dirty = True
+        return None
+
+    def add_section(self, section):
+        """
+        """
+        super().add_section(section)
+        self._dirty = True
+        return None
+
+    def remove_section(self, section):
+        """
+        """
+        existed = super().remove_section(section)
+        if existed:
+            self._dirty = True
+        return existed
+
+    def remove_option(self, section, option):
+        """
+        """
+        existed = super().remove_option(section, option)
+        if existed:
+            self._dirty = True
+        return existed
+
     def read(self):
         """
         Reads the configuration from :meth:`path`.
+
+        The values in the file replace the current values. Options, which
+        are not in the file (e.g. new default values), are kept and the
+        configuration is marked as modified, so that they are written into
+        the file.
+
+        The file is only read again, if it has been modified since the last
+        call.
         """
+        stat = self._file_stat()
+        if stat is not None and stat == self._stat:
+            return None
+
+        # The raw options, which are not loaded from the file.
+        defaults = dict(self._defaults)
+        sections = {section: dict(self._sections[section]) \
+                    for section in self._sections}
+
         try:
-            with open(self._path, "r") as file:
-                super().read_file(file)
-        except (FileNotFoundError, IOError):
-            pass
+            file = open(self._path, "r")
+        except FileNotFoundError:
+            self._stat = None
+            self._dirty = True
+            return None
+        except IOError:
+            return None
+
+        with file:
+            self._defaults.clear()
+            for section in list(self._sections):
+                super().remove_section(section)
+            super().read_file(file)
+
+        # Restore the options, which are not in the file.
+        dirty = False
+        for option, value in defaults.items():
+            if option not in self._defaults:
+                self._defaults[option] = value
+                dirty = True
+        for section, options in sections.items():
+            if section not in self._sections:
+                super().add_section(section)
+                dirty = True
+            for option, value in options.items():
+                if option not in self._sections[section]:
+                    self._sections[section][option] = value
+                    dirty = True
+
+        self._stat = stat
+        self._dirty = dirty
         return None
 
-    def write(self):
+    def write(self, force=False):
         """
-        Writes the configuration into :meth:`path`.
+        Writes the configuration into :meth:`path`, if it has been modified
+        or *force* is ``True``.
+
+        The configuration is written into a temporary file first, which
+        replaces the old file, so that the file is never only partially
+        written.
+
+        Returns ``True``, if the file has been written.
         """
+        if not (self._dirty or force):
+            return False
+
         # Get the comment prefix.
         comment_prefix = self._comment_prefixes[0]
         comment_format = "{} {{}}".format(comment_prefix)
@@ -112,11 +232,32 @@ class ConfigParser(configparser.ConfigParser):
                      type(self)._EPILOG.split("\n"))
         epilog = "\n".join(epilog) + "\n\n"
 
-        # Write the configuration into the file.
-        with open(self._path, "w") as file:
-            file.write(epilog)
-            super().write(file)
-        return None
+        # Write the configuration into a temporary file and replace the
+        # configuration file.
+        tmp_path = self._path + ".tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                file.write(epilog)
+                super().write(file)
+                file.flush()
+                os.fsync(file.fileno())
+
+            # Keep the permissions of the old file.
+            try:
+                os.chmod(tmp_path, os.stat(self._path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self._stat = self._file_stat()
+        self._dirty = False
+        return True
 
 
 class MainConfiguration(ConfigParser):
@@ -149,6 +290,7 @@ class MainConfiguration(ConfigParser):
         "[emsm]\n"
         "user = minecraft\n"
         "timeout = -1\n"
+        "download_mirror = \n"
         "\n"
         "The configuration section of each plugin is titled with the plugins\n"
         "name."
@@ -163,6 +305,10 @@ class MainConfiguration(ConfigParser):
         self.add_section("emsm")
         self["emsm"]["user"] = "minecraft"
         self["emsm"]["timeout"] = "0"
+
+        # The base URL of a mirror for the server downloads
+        # (see emsm.lib.artifacts).
+        self["emsm"]["download_mirror"] = ""
         return None
 
     
@@ -182,6 +328,7 @@ class WorldsConfiguration(ConfigParser):
         "stop_message = string\n"
         "stop_delay = int\n"
         "server = a server in server.conf\n"
+        "backend = screen | supervisor\n"
         "\n"
         "Note, that some plugins may offer you some more options for\n"
         "a world, like *enable_initd*. Take a look at the plugins help page\n"
@@ -199,9 +346,40 @@ class WorldsConfiguration(ConfigParser):
         defaults["stop_delay"] = "5"
         defaults["stop_message"] = "The server is going down.\n"\
                                    "Hope to see you soon."
+        defaults["backend"] = "screen"
         return None
     
 
+class ServerConfiguration(ConfigParser):
+    """
+    Handles the *server.conf* configuration file, which extends the
+    built-in server catalog.
+
+    Each section adds a new server or overrides some values of a built-in
+    server. The values are read raw, so the regular expressions can
+    contain a *$*.
+
+    .. seealso::
+
+        * :meth:`emsm.server.ServerManager.catalog`
+    """
+
+    _EPILOG = (
+        "[the server's name]\n"
+        "type = vanilla | forge | bungeecord\n"
+        "url = the download url of the server executable (or installer)\n"
+        "checksum = sha1:... | sha256:... | url of a checksum file\n"
+        "start_cmd = java -jar {server} nogui\n"
+        "log_path = ./logs/latest.log\n"
+        "log_start_re = ^.*Starting minecraft server version.*\n"
+        "\n"
+        "A section with the name of a built-in server (e.g. *vanilla 1.8*)\n"
+        "overrides only the given values. Forge server need a *jar_re*,\n"
+        "which matches the name of the server jar in the installation\n"
+        "directory. It is available as *{jar}* in the start_cmd.\n"
+        )
+
+    
 class Configuration(object):
     """
     Manages all configuration files of an EMSM application
@@ -221,6 +399,7 @@ class Configuration(object):
 
         self._main = MainConfiguration(os.path.join(self._dir, "main.conf"))
         self._worlds = WorldsConfiguration(os.path.join(self._dir, "worlds.conf"))
+        self._server = ServerConfiguration(os.path.join(self._dir, "server.conf"))
         return None
 
     def main(self):
@@ -235,6 +414,12 @@ class Configuration(object):
         """
         return self._worlds
 
+    def server(self):
+        """
+        Returns the :class:`ServerConfiguration`.
+        """
+        return self._server
+
     def read(self):
         """
         Reads all configration files.
@@ -244,6 +429,7 @@ class Configuration(object):
         # Don't change the order!
         self._main.read()
         self._worlds.read()
+        self._server.read()
         return None
 
     def write(self):
@@ -251,7 +437,8 @@ class Configuration(object):
         Saves all configuration values.
         """
         log.info("writing configuration ...")
-        
-        self._main.write()
-        self._worlds.write()
+
+        for conf in (self._main, self._worlds, self._server):
+            if conf.write():
+                log.info("wrote '{}'.".format(conf.path()))
         return None
@@ -0,0 +1,521 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+A content-addressed cache for downloaded files, like the server executables
+and installers.
+
+Each file is stored only once with the SHA-256 hash of its content as name.
+An index maps the download URLs to the hashes, so that a file is only
+downloaded again, when it has been removed from the cache:
+
+.. code-block:: none
+
+    |- CACHE_DIR
+       |- index.json
+       |- objects
+          |- 3fa8...e1c2
+          |- ...
+       |- partial
+          |- 8d1b...a0f4.part
+
+Interrupted downloads are kept in the *partial* directory and resumed with
+an HTTP range request. If the server ignores the range, the download starts
+from the beginning.
+
+If a *mirror* is given, all files are downloaded from the mirror instead of
+their original location. The mirror must serve the files by their file
+names, e.g. ``https://s3.amazonaws.com/.../minecraft_server.1.8.jar`` is
+fetched from ``MIRROR/minecraft_server.1.8.jar``. All URL schemes supported
+by :mod:`urllib.request` can be used, including ``file://``. Since the
+content of a mirror can not be trusted, a file is only downloaded from the
+mirror, if its checksum is known. Downloads without a checksum from the
+original location are not verified and logged with a warning.
+
+Instead of the checksum itself, the URL of a checksum file can be given,
+like the *.sha1* files next to the artifacts in a maven repository. The
+checksum file is always downloaded from its original location and never
+from the mirror.
+
+**Example:**
+
+.. code-block:: python
+
+    >>> cache = ArtifactCache("/opt/minecraft/server/.artifacts")
+    >>> cache.fetch("https://.../minecraft_server.1.8.jar",
+    ...             "sha1:a028f00e678ee5c6aef0e29656dca091b5df11c7")
+    '/opt/minecraft/server/.artifacts/objects/40e2...9c3b'
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+import urllib.error
+import concurrent.futures
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "ArtifactError",
+    "ChecksumError",
+    "MissingChecksumError",
+    "parse_checksum",
+    "is_checksum_url",
+    "ArtifactCache"
+    ]
+
+log = logging.getLogger(__file__)
+
+#: The hash algorithms, which can be used to verify a download.
+ALGORITHMS = ("sha1", "sha256")
+
+#: The number of bytes, which are read at once from a download.
+CHUNK_SIZE = 64*1024
+
+
+# Exceptions
+# ------------------------------------------------
+
+class ArtifactError(Exception):
+    """
+    Base class for all exceptions in this module.
+    """
+    pass
+
+
+class ChecksumError(ArtifactError):
+    """
+    Raised if the checksum of a download does not match the expected
+    checksum.
+    """
+
+    def __init__(self, url, expected, actual):
+        self.url = url
+        self.expected = expected
+        self.actual = actual
+        return None
+
+    def __str__(self):
+        temp = "The checksum of '{}' is '{}', but '{}' was expected."\
+               .format(self.url, self.actual, self.expected)
+        return temp
+
+
+class MissingChecksumError(ArtifactError):
+    """
+    Raised if a file should be downloaded from a mirror, but its checksum
+    is unknown.
+    """
+
+    def __init__(self, url, source_url):
+        self.url = url
+        self.source_url = source_url
+        return None
+
+    def __str__(self):
+        temp = "Refusing to download '{}' from the mirror ('{}') without "\
+               "a checksum.".format(self.url, self.source_url)
+        return temp
+
+
+# Functions
+# ------------------------------------------------
+
+def parse_checksum(checksum):
+    """
+    Returns the tuple *(algorithm, hexdigest)* for the *checksum*.
+
+    The *checksum* is either a string like ``"sha1:<hexdigest>"`` or only the
+    hexdigest. In the latter case, the algorithm is guessed from the length of
+    the digest.
+
+    :raises ValueError:
+        if the checksum is malformed.
+    """
+    algorithm, sep, digest = checksum.strip().lower().rpartition(":")
+    if not sep:
+        algorithm = {40: "sha1", 64: "sha256"}.get(len(digest))
+    if algorithm not in ALGORITHMS:
+        raise ValueError("Unknown checksum: '{}'".format(checksum))
+
+    length = hashlib.new(algorithm).digest_size*2
+    if len(digest) != length \
+       or digest.strip("0123456789abcdef"):
+        raise ValueError("Malformed checksum: '{}'".format(checksum))
+    return (algorithm, digest)
+
+
+def is_checksum_url(checksum):
+    """
+    Returns ``True``, if the *checksum* is the URL of a checksum file and
+    not the checksum itself.
+    """
+    scheme = urllib.parse.urlparse(checksum.strip()).scheme
+    return scheme.lower() in ("http", "https", "ftp", "file")
+
+
+def _file_digests(path):
+    """
+    Returns the SHA-1 and the SHA-256 hexdigest of the file at *path*.
+    """
+    sha1 = hashlib.sha1()
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            sha1.update(chunk)
+            sha256.update(chunk)
+    return {"sha1": sha1.hexdigest(), "sha256": sha256.hexdigest()}
+
+
+# Classes
+# ------------------------------------------------
+
+class ArtifactCache(object):
+    """
+    The content-addressed cache in the *directory*.
+
+    :param str directory:
+        The root directory of the cache. It is created, when the first file
+        is downloaded.
+    :param str mirror:
+        The base URL of a mirror, which is used instead of the original
+        download locations.
+    :param float timeout:
+        The timeout in seconds for the network operations.
+    """
+
+    def __init__(self, directory, mirror=None, timeout=60):
+        """
+        """
+        self._directory = directory
+        self._mirror = mirror or None
+        self._timeout = timeout
+
+        # Maps the URL to the digests and the size of the file.
+        # (Loaded on demand.)
+        self._index = None
+
+        # Protects the index and the partial downloads, when multiple files
+        # are fetched concurrently.
+        self._lock = threading.Lock()
+        self._downloading = set()
+
+        # Maps the URL of a checksum file to the checksum.
+        self._checksums = dict()
+        return None
+
+    def directory(self):
+        """
+        Returns the root directory of the cache.
+        """
+        return self._directory
+
+    def mirror(self):
+        """
+        Returns the base URL of the mirror or ``None``.
+        """
+        return self._mirror
+
+    def source_url(self, url):
+        """
+        Returns the URL, the file *url* is actually downloaded from.
+        """
+        if self._mirror is None:
+            return url
+
+        filename = os.path.basename(urllib.parse.urlparse(url).path)
+        return self._mirror.rstrip("/") + "/" + urllib.parse.quote(filename)
+
+    def object_path(self, sha256):
+        """
+        Returns the path of the cached file with the SHA-256 hexdigest
+        *sha256*.
+        """
+        return os.path.join(self._directory, "objects", sha256)
+
+    def _partial_path(self, url):
+        """
+        Returns the path of the (interrupted) download of *url*.
+        """
+        name = hashlib.sha1(url.encode()).hexdigest() + ".part"
+        return os.path.join(self._directory, "partial", name)
+
+    def _index_path(self):
+        """
+        Returns the path of the index file.
+        """
+        return os.path.join(self._directory, "index.json")
+
+    def _load_index(self):
+        """
+        Loads the index, if it has not been loaded yet.
+        """
+        if self._index is not None:
+            return None
+
+        try:
+            with open(self._index_path()) as file:
+                self._index = json.load(file)
+        except (OSError, ValueError):
+            self._index = dict()
+        return None
+
+    def _save_index(self):
+        """
+        Writes the index atomically.
+        """
+        path = self._index_path()
+        fd, tmp_path = tempfile.mkstemp(
+            prefix="index.", suffix=".tmp", dir=self._directory
+            )
+        try:
+            with open(fd, "w") as file:
+                json.dump(self._index, file, indent=4, sort_keys=True)
+            os.replace(tmp_path, path)
+        except:
+            os.remove(tmp_path)
+            raise
+        return None
+
+    def lookup(self, url, checksum=None):
+        """
+        Returns the path of the cached file for *url* or ``None``, if the file
+        is not in the cache.
+
+        If a *checksum* is given, the file is also found, when it has been
+        downloaded from another URL.
+        """
+        with self._lock:
+            self._load_index()
+
+            entries = list()
+            if url in self._index:
+                entries.append(self._index[url])
+
+            if checksum is not None:
+                algorithm, digest = parse_checksum(checksum)
+                if algorithm == "sha256":
+                    entries.insert(0, {"sha256": digest, "sha1": None})
+                entries.extend(
+                    entry for entry in self._index.values() \
+                    if entry.get(algorithm) == digest
+                    )
+
+                # Ignore entries with another content.
+                entries = [entry for entry in entries \
+                           if entry.get(algorithm) in (digest, None)]
+
+            for entry in entries:
+                path = self.object_path(entry["sha256"])
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    def resolve_checksum(self, checksum):
+        """
+        Returns the *checksum*. If *checksum* is the URL of a checksum file,
+        the file is downloaded from its original location (never from the
+        mirror) and the checksum in it is returned.
+
+        The checksum file contains the hexdigest, optionally followed by
+        the name of the file, like the output of :command:`sha1sum`.
+
+        :raises ValueError:
+            if the checksum is malformed.
+        :raises OSError:
+            if the checksum file could not be downloaded.
+        """
+        if checksum is None or not is_checksum_url(checksum):
+            return checksum
+
+        with self._lock:
+            if checksum in self._checksums:
+                return self._checksums[checksum]
+
+        with urllib.request.urlopen(checksum, timeout=self._timeout) \
+             as response:
+            content = response.read(4096).decode(errors="replace").split()
+        if not content:
+            raise ValueError("Empty checksum file: '{}'".format(checksum))
+        algorithm, digest = parse_checksum(content[0])
+        resolved = "{}:{}".format(algorithm, digest)
+
+        with self._lock:
+            self._checksums[checksum] = resolved
+        return resolved
+
+    def _download(self, url, part_path):
+        """
+        Downloads *url* to *part_path*. An existing partial download is
+        resumed, if the server supports range requests.
+        """
+        source_url = self.source_url(url)
+        offset = os.path.getsize(part_path) \
+                 if os.path.exists(part_path) else 0
+
+        request = urllib.request.Request(source_url)
+        if offset:
+            request.add_header("Range", "bytes={}-".format(offset))
+
+        try:
+            response = urllib.request.urlopen(request, timeout=self._timeout)
+        except urllib.error.HTTPError as err:
+            # 416: The partial download is corrupt or the file changed.
+            if err.code != 416 or not offset:
+                raise
+            os.remove(part_path)
+            return self._download(url, part_path)
+
+        with response:
+            # Only a *206 Partial Content* response continues the partial
+            # download. All other responses (and file:// URLs) deliver the
+            # whole file.
+            mode = "ab" if offset and response.getcode() == 206 else "wb"
+            with open(part_path, mode) as file:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                    file.write(chunk)
+        return None
+
+    def fetch(self, url, checksum=None):
+        """
+        Returns the path of the cached file for *url*. The file is downloaded,
+        if it is not in the cache yet.
+
+        :param str url:
+            The download URL of the file.
+        :param str checksum:
+            The expected checksum of the file (see :func:`parse_checksum`)
+            or the URL of a checksum file (see :meth:`resolve_checksum`).
+            If given, the download is verified. Without a checksum, the
+            file is not downloaded from the mirror.
+
+        :raises ChecksumError:
+            if the downloaded file does not match the *checksum*.
+        :raises MissingChecksumError:
+            if a mirror is used, but no *checksum* is given.
+        :raises OSError:
+            if the download failed. Network errors are also subclasses
+            of :exc:`OSError`. The partial download is kept and resumed
+            by the next call.
+        """
+        # The files in the cache have been verified, when they were
+        # downloaded. So the checksum file is only needed for a download.
+        if checksum is not None and is_checksum_url(checksum):
+            path = self.lookup(url)
+            if path is not None:
+                return path
+            checksum = self.resolve_checksum(checksum)
+
+        path = self.lookup(url, checksum)
+        if path is not None:
+            return path
+
+        if checksum is None:
+            if self._mirror is not None:
+                raise MissingChecksumError(url, self.source_url(url))
+            log.warning(
+                "no checksum for '{}', the download is not verified."\
+                .format(url)
+                )
+
+        part_path = self._partial_path(url)
+        with self._lock:
+            if part_path in self._downloading:
+                raise ArtifactError(
+                    "'{}' is already being downloaded.".format(url)
+                    )
+            self._downloading.add(part_path)
+
+        try:
+            os.makedirs(os.path.dirname(part_path), exist_ok=True)
+            os.makedirs(os.path.dirname(self.object_path("")), exist_ok=True)
+
+            self._download(url, part_path)
+            digests = _file_digests(part_path)
+
+            if checksum is not None:
+                algorithm, digest = parse_checksum(checksum)
+                if digests[algorithm] != digest:
+                    os.remove(part_path)
+                    raise ChecksumError(
+                        url, checksum,
+                        "{}:{}".format(algorithm, digests[algorithm])
+                        )
+
+            path = self.object_path(digests["sha256"])
+            os.replace(part_path, path)
+
+            with self._lock:
+                self._load_index()
+                self._index[url] = {
+                    "sha1": digests["sha1"],
+                    "sha256": digests["sha256"],
+                    "size": os.path.getsize(path)
+                    }
+                self._save_index()
+        finally:
+            with self._lock:
+                self._downloading.discard(part_path)
+        return path
+
+    def fetch_all(self, downloads, max_workers=4):
+        """
+        Fetches all *downloads* concurrently and returns a dictionary, which
+        maps the URL to the path of the cached file or the exception, which
+        was raised by :meth:`fetch`.
+
+        :param list downloads:
+            A list of *(url, checksum)* tuples.
+        :param int max_workers:
+            The maximum number of parallel downloads.
+        """
+        downloads = dict(downloads)
+        if not downloads:
+            return dict()
+
+        results = dict()
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch, url, checksum): url \
+                for url, checksum in downloads.items()
+                }
+            for future in concurrent.futures.as_completed(futures):
+                url = futures[future]
+                try:
+                    results[url] = future.result()
+                except Exception as err:
+                    results[url] = err
+        return results
@@ -0,0 +1,374 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module provides a persistent index of the server start lines in a
+log file.
+
+The index is stored in a small *sidecar* file, which is kept in the EMSM
+data directory and not in the log directory of the server. It contains the byte offsets of the recent server start lines, the number of
+lines since the last start and the position up to which the log file has
+already been scanned. Each update only reads
+the bytes, that have been appended to the log file since the last update.
+
+When the inode, the size, the modification time or a checksum of the last
+scanned bytes show, that the log file has been rotated or truncated, the
+index is rebuilt. The rebuild
+scans the log file backwards, so it only reads the latest log.
+
+**Example:**
+
+.. code-block:: python
+
+    >>> index = LogIndex(
+    ...     "logs/latest.log", world.server().log_start_re(),
+    ...     "data/foo/latest.log.index"
+    ...     )
+    >>> index.update()
+    >>> index.last_start()
+    1024
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import re
+import json
+import zlib
+import logging
+
+# local
+from . import logtail
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "LogIndex"
+    ]
+
+log = logging.getLogger(__file__)
+
+#: The version of the index file format.
+VERSION = 2
+
+#: The maximum number of start offsets, that are kept in the index.
+MAX_STARTS = 32
+
+#: The number of bytes before the scanned position, whose checksum is
+#: stored in the index to detect a log file, that has been truncated and
+#: rewritten in the meantime.
+CHECKSUM_SIZE = 64
+
+
+# Classes
+# ------------------------------------------------
+
+class LogIndex(object):
+    """
+    Indexes the lines of the log file at *path*, that match the regex
+    *start_re*.
+
+    :param str path:
+        The path of the log file.
+    :param start_re:
+        The (compiled) regular expression, that matches a server start line.
+    :param str index_path:
+        The path of the sidecar file. Its directory is created, when the
+        index is saved.
+    """
+
+    def __init__(self, path, start_re, index_path):
+        """
+        """
+        if isinstance(start_re, str):
+            start_re = re.compile(start_re)
+
+        self._path = path
+        self._start_re = start_re
+        self._index_path = index_path
+
+        # The state of the index. *None* as long as the sidecar file has
+        # not been loaded.
+        self._state = None
+        return None
+
+    def path(self):
+        """
+        Returns the path of the indexed log file.
+        """
+        return self._path
+
+    def index_path(self):
+        """
+        Returns the path of the sidecar file.
+        """
+        return self._index_path
+
+    def starts(self):
+        """
+        Returns the byte offsets of the recent server start lines in
+        ascending order.
+
+        .. seealso::
+
+            * :meth:`update`
+        """
+        return list(self._state["starts"]) if self._state else list()
+
+    def last_start(self):
+        """
+        Returns the byte offset of the last server start line or ``0``, if
+        the log file contains no start line.
+
+        .. seealso::
+
+            * :meth:`update`
+        """
+        starts = self._state["starts"] if self._state else None
+        return starts[-1] if starts else 0
+
+    def scanned(self):
+        """
+        Returns the position in the log file, up to which the log file
+        has been indexed.
+        """
+        return self._state["scanned"] if self._state else 0
+
+    def size(self):
+        """
+        Returns the size of the log file at the time of the last update.
+        """
+        return self._state["size"] if self._state else 0
+
+    def num_lines(self):
+        """
+        Returns the number of lines since the last server start line
+        (including the start line). An incomplete last line is counted too.
+
+        .. seealso::
+
+            * :meth:`update`
+        """
+        if not self._state:
+            return 0
+        num_lines = self._state["lines"]
+        if self._state["size"] > self._state["scanned"]:
+            num_lines += 1
+        return num_lines
+
+    def _empty_state(self, stat):
+        """
+        Returns a new, empty index state for the log file with the stat
+        result *stat*.
+        """
+        state = {
+            "version": VERSION,
+            "pattern": self._start_re.pattern,
+            "dev": stat.st_dev,
+            "inode": stat.st_ino,
+            "size": 0,
+            "mtime": 0,
+            "scanned": 0,
+            "checksum": 0,
+            "lines": 0,
+            "starts": list()
+            }
+        return state
+
+    def _load(self):
+        """
+        Loads the index from the sidecar file. If the sidecar file does not
+        exist or is invalid, ``None`` is returned.
+        """
+        try:
+            with open(self._index_path) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(state, dict) \
+           or state.get("version") != VERSION \
+           or state.get("pattern") != self._start_re.pattern:
+            return None
+        return state
+
+    def _save(self):
+        """
+        Writes the index atomically to the sidecar file. Errors are only
+        logged, since the index can always be rebuilt.
+        """
+        tmp_path = "{}.{}.tmp".format(self._index_path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+            with open(tmp_path, "w") as file:
+                json.dump(self._state, file)
+            os.replace(tmp_path, self._index_path)
+        except OSError as err:
+            log.debug("could not write the log index '{}': {}"\
+                      .format(self._index_path, err))
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return None
+
+    def _checksum(self, file, end):
+        """
+        Returns the checksum of the :data:`CHECKSUM_SIZE` bytes before *end*.
+        """
+        start = max(0, end - CHECKSUM_SIZE)
+        file.seek(start)
+        return zlib.crc32(file.read(end - start))
+
+    def _is_valid(self, state, file, stat):
+        """
+        Returns ``True``, if the index *state* still describes the log *file*
+        with the stat result *stat* and can be updated incrementally.
+        """
+        if state is None:
+            return False
+        # The file has been rotated.
+        if state["dev"] != stat.st_dev or state["inode"] != stat.st_ino:
+            return False
+        # The file has been truncated.
+        if stat.st_size < state["size"] or stat.st_size < state["scanned"]:
+            return False
+        # The file has been rewritten in place.
+        if stat.st_size == state["size"] and stat.st_mtime_ns != state["mtime"]:
+            return False
+        # The file has been truncated and rewritten.
+        if stat.st_size != state["size"] \
+           and self._checksum(file, state["scanned"]) != state["checksum"]:
+            return False
+        return True
+
+    def _scan(self, file, start, end, find_starts=True):
+        """
+        Scans the complete lines of *file* between *start* and *end* for
+        start lines, adds their offsets to the index and counts the lines
+        since the last start. Returns the offset after the last complete
+        line.
+
+        If *find_starts* is false, the lines are only counted. This is used
+        after a rebuild, when it is already known, that there's no start
+        line after *start*.
+        """
+        regex = re.compile(
+            "^(?:{})".format(self._start_re.pattern),
+            self._start_re.flags | re.MULTILINE
+            )
+        starts = self._state["starts"]
+
+        file.seek(start)
+        pos = start
+        rest = bytes()
+        while pos < end:
+            block = file.read(min(logtail.BLOCK_SIZE, end - pos))
+            if not block:
+                break
+            block_start = pos - len(rest)
+            pos += len(block)
+
+            # Only complete lines are scanned. The incomplete last line is
+            # scanned with the next block.
+            block = rest + block
+            i = block.rfind(b"\n")
+            rest = block[i + 1:]
+            block = block[:i + 1]
+
+            if not find_starts:
+                self._state["lines"] += block.count(b"\n")
+                continue
+
+            text = block.decode("latin-1")
+            line_start = None
+            for match in regex.finditer(text):
+                line_start = text.rfind("\n", 0, match.start()) + 1
+                offset = block_start + line_start
+                if not starts or starts[-1] < offset:
+                    starts.append(offset)
+
+            if line_start is None:
+                self._state["lines"] += text.count("\n")
+            else:
+                self._state["lines"] = text.count("\n", line_start)
+        del starts[:-MAX_STARTS]
+        return pos - len(rest)
+
+    def _rebuild(self, file, stat):
+        """
+        Rebuilds the index by scanning the log file backwards for the
+        last start line and counting the lines after it.
+        """
+        self._state = self._empty_state(stat)
+
+        offset = logtail.rfind_line(
+            file, self._start_re, end=stat.st_size
+            )
+        if offset is None:
+            offset = 0
+        else:
+            self._state["starts"].append(offset)
+        return self._scan(file, offset, stat.st_size, find_starts=False)
+
+    def update(self):
+        """
+        Updates the index with the bytes, that have been appended to the log
+        file since the last update. If the log file has been rotated or
+        truncated, the index is rebuilt.
+
+        If the log file does not exist, the index is cleared.
+        """
+        if self._state is None:
+            self._state = self._load()
+
+        try:
+            file = open(self._path, "rb")
+        except OSError:
+            self._state = None
+            return None
+
+        with file:
+            stat = os.fstat(file.fileno())
+            if self._is_valid(self._state, file, stat):
+                if stat.st_size == self._state["size"]:
+                    return None
+                scanned = self._scan(file, self._state["scanned"], stat.st_size)
+            else:
+                scanned = self._rebuild(file, stat)
+
+            self._state["scanned"] = scanned
+            self._state["checksum"] = self._checksum(
+                file, self._state["scanned"]
+                )
+            self._state["size"] = stat.st_size
+            self._state["mtime"] = stat.st_mtime_ns
+
+        self._save()
+        return None
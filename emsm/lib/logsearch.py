@@ -0,0 +1,305 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module searches the current and the rotated log files of a world.
+
+Newer minecraft servers rotate the log into gzip compressed files, which
+are named like *logs/2014-05-20-1.log.gz*. The files are decompressed on the
+fly and only the files, which may contain lines of the requested time range,
+are read.
+
+The rotated files are ordered by their names. Since the logs are written
+one after another, a file contains lines from the modification time of the
+previous file up to its own modification time. The date in the name of a
+rotated file is the day, the file has been started.
+
+The matches are streamed: The worker processes send them in small chunks
+through bounded queues, so that the output starts immediately and the
+memory usage does not depend on the number of matches.
+
+**Example:**
+
+.. code-block:: python
+
+    >>> files = select_logs("worlds/foo/logs/latest.log", since=yesterday)
+    >>> for key, path, lineno, line in search([("foo", files)], "ERROR"):
+    ...     print(key, path, lineno, line)
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import re
+import io
+import gzip
+import queue
+import datetime
+import multiprocessing
+import concurrent.futures
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "rotated_logs",
+    "select_logs",
+    "search_file",
+    "search"
+    ]
+
+#: Matches the name of a rotated log file, e.g. *2014-05-20-1.log.gz*.
+ROTATED_LOG_RE = re.compile(
+    r"^(?P<date>\d{4}-\d{2}-\d{2})-(?P<index>\d+)\.log(\.gz)?$"
+    )
+
+#: The maximum number of matches, which are sent at once from a worker
+#: process.
+CHUNK_SIZE = 256
+
+#: The maximum number of chunks, which are buffered for a file.
+MAX_CHUNKS = 8
+
+#: Matches the timestamp at the beginning of the lines in the old
+#: *server.log* files, e.g. *2014-05-20 13:37:00 [INFO] ...*.
+TIMESTAMP_RE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"
+    )
+
+
+# Functions
+# ------------------------------------------------
+
+def rotated_logs(log_dir):
+    """
+    Returns the paths of the rotated log files in *log_dir*, ordered from
+    the oldest to the newest file.
+    """
+    try:
+        names = os.listdir(log_dir)
+    except OSError:
+        return list()
+
+    logs = list()
+    for name in names:
+        match = ROTATED_LOG_RE.match(name)
+        if match:
+            key = (match.group("date"), int(match.group("index")))
+            logs.append((key, os.path.join(log_dir, name)))
+    logs.sort()
+    return [path for key, path in logs]
+
+
+def select_logs(log_path, since=None, until=None):
+    """
+    Returns the paths of the rotated log files next to the current log
+    file *log_path* and of the current log file itself, that may contain
+    lines between *since* and *until*. The files are ordered from the oldest
+    to the newest one.
+
+    :param str log_path:
+        The path of the current log file.
+    :param datetime.datetime since:
+        If not ``None``, files, which have been modified the last time
+        before this point, are skipped.
+    :param datetime.datetime until:
+        If not ``None``, files, which have been started at or after this
+        point, are skipped.
+    """
+    log_dir = os.path.dirname(log_path)
+    paths = rotated_logs(log_dir) + [log_path]
+
+    since = since.timestamp() if since is not None else None
+    until = until.timestamp() if until is not None else None
+
+    selected = list()
+    prev_end = None
+    for path in paths:
+        try:
+            end = os.path.getmtime(path)
+        except OSError:
+            continue
+
+        # The file contains the lines from the end of the previous file up
+        # to its own modification time, but not before the day in its name.
+        start = prev_end
+        match = ROTATED_LOG_RE.match(os.path.basename(path))
+        if match:
+            day = datetime.datetime.strptime(match.group("date"), "%Y-%m-%d")
+            start = max(start or 0, day.timestamp())
+
+        if (since is None or end >= since) \
+           and (until is None or start is None or start < until):
+            selected.append(path)
+        prev_end = end
+    return selected
+
+
+def _open_log(path):
+    """
+    Opens the log file at *path* in text mode and decompresses it on the
+    fly, if it is a gzip file.
+    """
+    if path.endswith(".gz"):
+        file = gzip.open(path, "rb")
+    else:
+        file = open(path, "rb")
+    return io.TextIOWrapper(file, errors="replace")
+
+
+def search_file(path, pattern, flags=0, since=None, until=None):
+    """
+    Yields the tuples *(lineno, line)* of all lines in the log file at
+    *path*, that match the regex *pattern*.
+
+    Lines, which start with a full timestamp (old *server.log* files) are
+    also filtered by *since* and *until*. The newer log files only contain
+    the time of day, so they are selected as a whole by :func:`select_logs`.
+
+    This function is executed in the worker processes of :func:`search`,
+    therefore all arguments must be picklable.
+    """
+    regex = re.compile(pattern, flags)
+    since = str(since) if since is not None else None
+    until = str(until) if until is not None else None
+
+    try:
+        with _open_log(path) as log:
+            for lineno, line in enumerate(log, 1):
+                if not regex.search(line):
+                    continue
+                if since is not None or until is not None:
+                    match = TIMESTAMP_RE.match(line)
+                    if match:
+                        timestamp = match.group(1)
+                        if since is not None and timestamp < since[:19]:
+                            continue
+                        if until is not None and timestamp > until[:19]:
+                            continue
+                yield (lineno, line.rstrip("\n"))
+    except (OSError, EOFError):
+        pass
+    return None
+
+
+def _put(results, cancelled, item):
+    """
+    Puts the *item* into the queue *results*. Returns ``False``, if the
+    search has been cancelled in the meantime.
+    """
+    while not cancelled.is_set():
+        try:
+            results.put(item, timeout=0.1)
+        except queue.Full:
+            continue
+        return True
+    return False
+
+
+def _search_worker(results, cancelled, path, pattern, flags, since, until):
+    """
+    Sends the matches of :func:`search_file` in chunks of at most
+    :data:`CHUNK_SIZE` matches to the queue *results*, followed by ``None``.
+    """
+    try:
+        chunk = list()
+        for match in search_file(path, pattern, flags, since, until):
+            chunk.append(match)
+            if len(chunk) >= CHUNK_SIZE:
+                if not _put(results, cancelled, chunk):
+                    return None
+                chunk = list()
+        if chunk:
+            _put(results, cancelled, chunk)
+    finally:
+        _put(results, cancelled, None)
+    return None
+
+
+def search(logs, pattern, flags=0, since=None, until=None, max_workers=None):
+    """
+    Searches the log files in parallel and yields the tuples
+    *(key, path, lineno, line)* of all matching lines, in the order of
+    *logs*.
+
+    :param logs:
+        A list with the tuples *(key, paths)*, e.g. the name of a world and
+        the result of :func:`select_logs`.
+    :param int max_workers:
+        The maximum number of worker processes. If ``None``, the number of
+        cpus is used.
+
+    .. seealso::
+
+        * :func:`search_file`
+    """
+    tasks = [(key, path) for key, paths in logs for path in paths]
+    if not tasks:
+        return None
+
+    # A process pool is only worth it, if there's more than one file.
+    if len(tasks) == 1:
+        key, path = tasks[0]
+        for lineno, line in search_file(path, pattern, flags, since, until):
+            yield (key, path, lineno, line)
+        return None
+
+    # Each file gets its own bounded queue. The workers block, when the
+    # queue is full, so that the matches of the later files do not pile up
+    # while the matches of the earlier files are consumed. The files are
+    # processed in order, so the file, which is consumed, is always running.
+    with multiprocessing.Manager() as manager, \
+         concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        cancelled = manager.Event()
+        queues = [manager.Queue(MAX_CHUNKS) for task in tasks]
+        futures = [
+            executor.submit(
+                _search_worker, results, cancelled, path, pattern, flags,
+                since, until
+                )
+            for (key, path), results in zip(tasks, queues)
+            ]
+        try:
+            for (key, path), results, future in zip(tasks, queues, futures):
+                while True:
+                    try:
+                        chunk = results.get(timeout=0.5)
+                    except queue.Empty:
+                        # The worker died without finishing the queue.
+                        if future.done():
+                            future.result()
+                            break
+                        continue
+                    if chunk is None:
+                        break
+                    for lineno, line in chunk:
+                        yield (key, path, lineno, line)
+                future.result()
+        finally:
+            cancelled.set()
+    return None
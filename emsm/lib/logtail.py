@@ -0,0 +1,710 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module provides a log tail engine, which follows a growing log file
+and wakes up on *inotify* events instead of polling the file.
+
+When inotify is not available (e.g. on other systems than Linux), the
+engine falls back to polling.
+
+**Example:**
+
+.. code-block:: python
+
+    >>> with LogTail("logs/latest.log") as tail:
+    ...     while True:
+    ...         tail.wait(timeout=1)
+    ...         print(tail.read(), end="")
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import re
+import time
+import errno
+import select
+import collections
+import struct
+import codecs
+import ctypes
+import ctypes.util
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "Inotify",
+    "inotify_available",
+    "LogTail",
+    "MultiTail",
+    "rfind_line",
+    "iter_lines",
+    "iter_lines_reverse"
+    ]
+
+#: The size of the blocks, that are read when a file is scanned backwards.
+BLOCK_SIZE = 64*1024
+
+
+# Functions
+# ------------------------------------------------
+
+def rfind_line(file, regex, start=0, end=None, block_size=BLOCK_SIZE):
+    """
+    Scans the binary *file* backwards in blocks of *block_size* bytes and
+    returns the offset of the last line, that matches *regex*, or ``None``
+    if there is no such line.
+
+    The cost is proportional to the distance between the end of the file
+    and the last matching line and not to the size of the whole file.
+
+    :param file:
+        A file object opened in binary mode.
+    :param regex:
+        A (compiled) regular expression for :func:`re.match`. The regex is
+        applied to the *latin-1* decoded lines, so that character offsets
+        are byte offsets.
+    :param int start:
+        Lines before this offset are not scanned.
+    :param int end:
+        The end of the scanned range. If ``None``, the end of the file.
+    """
+    # Anchor the regex at the start of each line, like :func:`re.match`.
+    if isinstance(regex, str):
+        regex = re.compile(regex)
+    regex = re.compile(
+        "^(?:{})".format(regex.pattern), regex.flags | re.MULTILINE
+        )
+
+    if end is None:
+        end = file.seek(0, os.SEEK_END)
+
+    pos = end
+    tail = bytes()
+    while pos > start:
+        block_start = max(start, pos - block_size)
+        file.seek(block_start)
+        block = file.read(pos - block_start) + tail
+        pos = block_start
+
+        # The first line in the block may be incomplete. In this case,
+        # it's completed with the next block.
+        if block_start > start:
+            i = block.find(b"\n")
+            if i == -1:
+                tail = block
+                continue
+            tail = block[:i + 1]
+            block = block[i + 1:]
+            block_start += i + 1
+        else:
+            tail = bytes()
+
+        text = block.decode("latin-1")
+        match = None
+        for match in regex.finditer(text):
+            pass
+        if match is not None:
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            return block_start + line_start
+    return None
+
+
+def iter_lines(file, start=0, end=None, block_size=BLOCK_SIZE):
+    """
+    Yields the lines of the binary *file* between *start* and *end* without
+    the line separator. The file is read in blocks, so only one block is
+    kept in memory.
+
+    :param file:
+        A file object opened in binary mode.
+    :param int start:
+        The offset of the first line.
+    :param int end:
+        The end of the range. If ``None``, the end of the file.
+    """
+    if end is None:
+        end = file.seek(0, os.SEEK_END)
+
+    pos = start
+    rest = bytes()
+    while pos < end:
+        # The file position may have been changed by the caller between two
+        # lines.
+        file.seek(pos)
+        block = file.read(min(block_size, end - pos))
+        if not block:
+            break
+        pos += len(block)
+
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+    return None
+
+
+def iter_lines_reverse(file, start=0, end=None, block_size=BLOCK_SIZE):
+    """
+    Like :func:`iter_lines`, but yields the lines in reverse order, starting
+    with the last line. The file is read backwards in blocks, so only one
+    block is kept in memory.
+    """
+    if end is None:
+        end = file.seek(0, os.SEEK_END)
+
+    pos = end
+    rest = None
+    while pos > start:
+        block_start = max(start, pos - block_size)
+        file.seek(block_start)
+        block = file.read(pos - block_start)
+        pos = block_start
+
+        if rest is None:
+            # The separator of the last line does not start a new line.
+            if block.endswith(b"\n"):
+                block = block[:-1]
+            rest = bytes()
+
+        lines = (block + rest).split(b"\n")
+        rest = lines.pop(0)
+        yield from reversed(lines)
+    if rest is not None:
+        yield rest
+    return None
+
+
+# Classes
+# ------------------------------------------------
+
+class Inotify(object):
+    """
+    A thin wrapper around the Linux inotify API.
+
+    :raises OSError:
+        if inotify is not available.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+
+    _IN_CLOEXEC = 0o2000000
+    _IN_NONBLOCK = 0o4000
+
+    # struct inotify_event {int wd; uint32 mask; uint32 cookie; uint32 len;}
+    _EVENT_HEADER = struct.Struct("iIII")
+
+    # The libc is loaded, when it is first needed.
+    _libc = None
+
+    @classmethod
+    def _load_libc(cls):
+        """
+        Loads the libc and returns it.
+        """
+        if cls._libc is None:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+                )
+            # Raises an AttributeError if inotify is not supported.
+            libc.inotify_init1
+            libc.inotify_add_watch
+            libc.inotify_rm_watch
+            cls._libc = libc
+        return cls._libc
+
+    def __init__(self):
+        """
+        """
+        try:
+            self._libc = self._load_libc()
+        except (OSError, AttributeError) as err:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self._fd = self._libc.inotify_init1(self._IN_CLOEXEC|self._IN_NONBLOCK)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return None
+
+    def fileno(self):
+        """
+        Returns the inotify file descriptor, which can be used with
+        :func:`select.select`.
+        """
+        return self._fd
+
+    def add_watch(self, path, mask):
+        """
+        Watches *path* for the events in *mask* and returns the watch
+        descriptor.
+        """
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        """
+        Removes the watch *wd*.
+        """
+        self._libc.inotify_rm_watch(self._fd, wd)
+        return None
+
+    def read_events(self):
+        """
+        Returns a list with all pending events. Each event is a tuple
+        *(wd, mask, cookie, name)*.
+
+        This method does not block.
+        """
+        events = list()
+        while True:
+            try:
+                data = os.read(self._fd, 64*1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, size = self._EVENT_HEADER.unpack_from(
+                    data, offset
+                    )
+                offset += self._EVENT_HEADER.size
+                name = data[offset:offset + size].rstrip(b"\x00")
+                offset += size
+                events.append((wd, mask, cookie, os.fsdecode(name)))
+        return events
+
+    def wait(self, timeout=None):
+        """
+        Blocks until an event is available or *timeout* seconds passed.
+        Returns ``True`` if an event is available.
+        """
+        try:
+            rlist, wlist, xlist = select.select([self._fd], [], [], timeout)
+        except InterruptedError:
+            return False
+        return bool(rlist)
+
+    def close(self):
+        """
+        Closes the inotify file descriptor.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        return None
+
+
+def inotify_available():
+    """
+    Returns ``True`` if the inotify API can be used.
+    """
+    try:
+        Inotify().close()
+    except OSError:
+        return False
+    return True
+
+
+class LogTail(object):
+    """
+    Follows the log file at *path*.
+
+    The file descriptor is kept open between two reads. When the log file
+    is rotated (a new file is created at *path*) or truncated, the rest of
+    the old file is read and the tail continues at the beginning of the
+    new file.
+
+    :param str path:
+        The path of the log file. The file does not need to exist yet.
+    :param int offset:
+        The first byte that is read. If ``None``, only content that is
+        appended from now on is read.
+    :param Inotify inotify:
+        If given, this inotify instance is used to watch the file. This allows
+        to follow many files with one inotify instance. In this case, the
+        owner of *inotify* must pass the events to :meth:`handle_events` and
+        :meth:`wait` must not be used.
+    :param float poll_intervall:
+        The time between two checks, if inotify is not available.
+    """
+
+    # The events of the directory, that are watched.
+    _WATCH_MASK = Inotify.IN_MODIFY | Inotify.IN_CREATE | Inotify.IN_MOVED_TO\
+                  | Inotify.IN_MOVED_FROM | Inotify.IN_DELETE \
+                  | Inotify.IN_CLOSE_WRITE | Inotify.IN_ATTRIB
+
+    def __init__(self, path, offset=None, inotify=None, poll_intervall=0.2):
+        """
+        """
+        self._path = os.path.abspath(path)
+        self._dirname, self._basename = os.path.split(self._path)
+        self._poll_intervall = poll_intervall
+
+        # The open log file and the next byte, that is read.
+        self._file = None
+        self._offset = offset
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        # We watch the directory and not the file itself, so that we get
+        # notified if the file is rotated.
+        self._own_inotify = inotify is None
+        self._inotify = inotify
+        self._wd = None
+        if self._inotify is None:
+            try:
+                self._inotify = Inotify()
+            except OSError:
+                self._inotify = None
+        if self._inotify is not None:
+            try:
+                self._wd = self._inotify.add_watch(
+                    self._dirname, self._WATCH_MASK
+                    )
+            except OSError:
+                self._wd = None
+
+        # Set when inotify reported a change of the file.
+        self._changed = True
+
+        self._open(offset)
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return None
+
+    def path(self):
+        """
+        Returns the path of the followed file.
+        """
+        return self._path
+
+    def uses_inotify(self):
+        """
+        Returns ``True`` if the tail is woken up by inotify events.
+        """
+        return self._wd is not None
+
+    def watch_descriptor(self):
+        """
+        Returns the inotify watch descriptor of the directory, that contains
+        the log file, or ``None``.
+        """
+        return self._wd
+
+    def _open(self, offset=None):
+        """
+        (Re)opens the log file. If *offset* is ``None``, the file is read from
+        the end.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            
+        try:
+            self._file = open(self._path, "rb")
+        except (FileNotFoundError, IOError):
+            # The file is read from the beginning, when it is created.
+            self._offset = 0
+            return None
+
+        if offset is None:
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file.seek(offset, os.SEEK_SET)
+        self._offset = self._file.tell()
+        return None
+
+    def _rotated(self):
+        """
+        Returns ``True`` if a new file has been created at :meth:`path` or
+        the current file has been truncated.
+        """
+        try:
+            path_stat = os.stat(self._path)
+        except OSError:
+            return False
+
+        if self._file is None:
+            return True
+
+        file_stat = os.fstat(self._file.fileno())
+        if (path_stat.st_ino, path_stat.st_dev) \
+           != (file_stat.st_ino, file_stat.st_dev):
+            return True
+        return file_stat.st_size < self._offset
+
+    def read(self):
+        """
+        Returns all content, that has been appended to the log file since
+        the last call.
+        """
+        data = bytes()
+        if self._file is not None:
+            data = self._file.read()
+
+        if self._rotated():
+            # Read the rest of the old file, if it has been rotated,
+            # and continue with the new file.
+            if self._file is not None:
+                try:
+                    file_stat = os.fstat(self._file.fileno())
+                except OSError:
+                    file_stat = None
+                if file_stat is not None and file_stat.st_size >= self._offset:
+                    data += self._file.read()
+            self._open(0)
+            if self._file is not None:
+                data += self._file.read()
+
+        if self._file is not None:
+            self._offset = self._file.tell()
+        self._changed = False
+        return self._decoder.decode(data)
+
+    def changed(self):
+        """
+        Returns ``True`` if the log file may have changed since the last
+        :meth:`read`.
+        """
+        return self._changed
+
+    def handle_events(self, events):
+        """
+        Checks, if one of the inotify *events* concerns the log file.
+        Returns ``True`` if the file has changed.
+        """
+        for wd, mask, cookie, name in events:
+            if mask & Inotify.IN_Q_OVERFLOW:
+                self._changed = True
+            elif wd == self._wd and name == self._basename:
+                self._changed = True
+        return self._changed
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the log file changed or *timeout* seconds passed.
+        Returns ``True`` if the file may have changed.
+        """
+        if self._changed:
+            return True
+
+        # Polling fallback.
+        if self._wd is None or not self._own_inotify:
+            if timeout is None:
+                timeout = self._poll_intervall
+            time.sleep(min(timeout, self._poll_intervall))
+            return True
+
+        start_time = time.time()
+        while True:
+            remaining = None
+            if timeout is not None:
+                remaining = timeout - (time.time() - start_time)
+                if remaining <= 0:
+                    return False
+            if self._inotify.wait(remaining):
+                if self.handle_events(self._inotify.read_events()):
+                    return True
+        return None
+
+    def close(self):
+        """
+        Closes the log file and the inotify watch.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if self._inotify is not None:
+            if self._own_inotify:
+                self._inotify.close()
+            elif self._wd is not None:
+                # Other tails may use the same watch.
+                pass
+            self._inotify = None
+            self._wd = None
+        return None
+
+
+class MultiTail(object):
+    """
+    Follows many log files with one inotify instance.
+
+    Each file is identified by a *key*, e.g. the name of a world. If inotify
+    is not available, all files are polled every *poll_intervall* seconds.
+
+    **Example:**
+
+    .. code-block:: python
+
+        >>> with MultiTail() as tail:
+        ...     tail.add("foo", "foo/logs/latest.log")
+        ...     tail.add("bar", "bar/logs/latest.log")
+        ...     while True:
+        ...         tail.wait()
+        ...         for key, data in tail.read():
+        ...             print(key, data, end="")
+    """
+
+    def __init__(self, poll_intervall=0.2):
+        """
+        """
+        self._poll_intervall = poll_intervall
+        try:
+            self._inotify = Inotify()
+        except OSError:
+            self._inotify = None
+
+        # Maps the key to the LogTail of the file.
+        self._tails = collections.OrderedDict()
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return None
+
+    def uses_inotify(self):
+        """
+        Returns ``True`` if the files are watched with inotify.
+        """
+        return self._inotify is not None
+
+    def keys(self):
+        """
+        Returns the keys of all followed files.
+        """
+        return list(self._tails)
+
+    def add(self, key, path, offset=None):
+        """
+        Follows the log file at *path*. The content of the file is returned
+        with *key* by :meth:`read`.
+
+        .. seealso::
+
+            * :class:`LogTail`
+        """
+        self._tails[key] = LogTail(
+            path, offset=offset, inotify=self._inotify,
+            poll_intervall=self._poll_intervall
+            )
+        return None
+
+    def wait(self, timeout=None):
+        """
+        Blocks until at least one file may have changed or *timeout* seconds
+        passed. Returns ``True`` if a file may have changed.
+        """
+        if any(tail.changed() for tail in self._tails.values()):
+            return True
+
+        # Files without an inotify watch (e.g. if their directory does not
+        # exist yet) are polled.
+        polling = not all(tail.uses_inotify() for tail in self._tails.values())
+        if polling:
+            timeout = self._poll_intervall if timeout is None \
+                      else min(timeout, self._poll_intervall)
+
+        start_time = time.time()
+        while True:
+            remaining = None
+            if timeout is not None:
+                remaining = timeout - (time.time() - start_time)
+                if remaining <= 0:
+                    return polling
+
+            if self._inotify is None:
+                time.sleep(remaining)
+            elif self._inotify.wait(remaining):
+                events = self._inotify.read_events()
+                changed = False
+                for tail in self._tails.values():
+                    changed = tail.handle_events(events) or changed
+                if changed:
+                    return True
+        return None
+
+    def read(self):
+        """
+        Returns a list with the tuples *(key, data)* for all files, that
+        have changed since the last call.
+        """
+        data = list()
+        for key, tail in self._tails.items():
+            if tail.uses_inotify() and not tail.changed():
+                continue
+            content = tail.read()
+            if content:
+                data.append((key, content))
+        return data
+
+    def close(self):
+        """
+        Closes all files and the inotify instance.
+        """
+        for tail in self._tails.values():
+            tail.close()
+        self._tails.clear()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        return None
@@ -0,0 +1,413 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module samples the resource usage of processes through the Linux
+*/proc* filesystem.
+
+The session process (screen or the EMSM supervisor) of a world is not the
+minecraft server itself. The server is found by walking the process tree
+from the session process to its descendants. The process table is read once
+per sample for all worlds.
+
+The cpu usage and the io rates are computed from two snapshots, so
+:meth:`Sampler.sample` takes two snapshots of all processes and waits
+*interval* seconds in between.
+
+**Example:**
+
+.. code-block:: python
+
+    >>> sampler = Sampler()
+    >>> usage = sampler.sample({"foo": 1234, "bar": 1337}, interval=0.5)
+    >>> usage["foo"].cpu_percent()
+    12.5
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import time
+import collections
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "available",
+    "ProcessSnapshot",
+    "ResourceUsage",
+    "Sampler"
+    ]
+
+#: The name of the processes, which are preferred when the server process is
+#: searched in the process tree.
+SERVER_COMMANDS = ("java",)
+
+
+# Functions
+# ------------------------------------------------
+
+def available():
+    """
+    Returns ``True`` if the */proc* filesystem is available.
+    """
+    return os.path.exists("/proc/self/stat")
+
+
+def _read_stat(pid):
+    """
+    Returns the fields of */proc/<pid>/stat*. The first field after the pid
+    is the command name, which may contain spaces and parentheses.
+
+    :raises OSError:
+        if the process does not exist (anymore).
+    """
+    with open("/proc/{}/stat".format(pid), "rb") as file:
+        data = file.read().decode(errors="replace")
+    head, sep, tail = data.rpartition(")")
+    comm = head.partition("(")[2]
+    return [comm] + tail.split()
+
+
+# Classes
+# ------------------------------------------------
+
+class ProcessSnapshot(object):
+    """
+    The resource counters of a process at one point of time.
+    """
+
+    def __init__(self, pid, timestamp, cpu_time, rss, threads, fds,
+                 read_bytes, write_bytes, start_time):
+        """
+        """
+        self._pid = pid
+        self._timestamp = timestamp
+        self._cpu_time = cpu_time
+        self._rss = rss
+        self._threads = threads
+        self._fds = fds
+        self._read_bytes = read_bytes
+        self._write_bytes = write_bytes
+        self._start_time = start_time
+        return None
+
+    def pid(self):
+        return self._pid
+
+    def timestamp(self):
+        """
+        The monotonic time, when the snapshot has been taken.
+        """
+        return self._timestamp
+
+    def cpu_time(self):
+        """
+        The used cpu time (user + system) in seconds.
+        """
+        return self._cpu_time
+
+    def rss(self):
+        """
+        The resident set size in bytes.
+        """
+        return self._rss
+
+    def threads(self):
+        return self._threads
+
+    def fds(self):
+        """
+        The number of open file descriptors or ``None``, if they are not
+        readable.
+        """
+        return self._fds
+
+    def read_bytes(self):
+        """
+        The bytes read from the storage layer or ``None``, if
+        */proc/<pid>/io* is not readable.
+        """
+        return self._read_bytes
+
+    def write_bytes(self):
+        """
+        The bytes written to the storage layer or ``None``, if
+        */proc/<pid>/io* is not readable.
+        """
+        return self._write_bytes
+
+    def start_time(self):
+        """
+        The unix timestamp, when the process has been started.
+        """
+        return self._start_time
+
+
+class ResourceUsage(object):
+    """
+    The resource usage of a process between two snapshots *first* and
+    *second*.
+    """
+
+    def __init__(self, first, second):
+        """
+        """
+        self._first = first
+        self._second = second
+        return None
+
+    def _elapsed(self):
+        return max(1e-9, self._second.timestamp() - self._first.timestamp())
+
+    def _rate(self, first, second):
+        if first is None or second is None:
+            return None
+        return max(0, second - first)/self._elapsed()
+
+    def pid(self):
+        """
+        The pid of the sampled process.
+        """
+        return self._second.pid()
+
+    def cpu_percent(self):
+        """
+        The cpu usage in percent of one core. A process, which keeps two
+        cores busy, has a cpu usage of *200%*.
+        """
+        used = self._second.cpu_time() - self._first.cpu_time()
+        return 100*max(0, used)/self._elapsed()
+
+    def rss(self):
+        """
+        The resident set size in bytes.
+        """
+        return self._second.rss()
+
+    def threads(self):
+        """
+        The number of threads.
+        """
+        return self._second.threads()
+
+    def fds(self):
+        """
+        The number of open file descriptors or ``None``.
+        """
+        return self._second.fds()
+
+    def read_rate(self):
+        """
+        The read rate in bytes per second or ``None``.
+        """
+        return self._rate(self._first.read_bytes(), self._second.read_bytes())
+
+    def write_rate(self):
+        """
+        The write rate in bytes per second or ``None``.
+        """
+        return self._rate(self._first.write_bytes(), self._second.write_bytes())
+
+    def uptime(self):
+        """
+        The time in seconds since the process has been started.
+        """
+        return max(0, time.time() - self._second.start_time())
+
+
+class Sampler(object):
+    """
+    Samples the resource usage of the server processes below session
+    processes.
+    """
+
+    def __init__(self):
+        """
+        """
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        return None
+
+    def _boot_time(self):
+        """
+        Returns the boot time of the system as unix timestamp.
+
+        The boot time is computed from */proc/uptime*, since the *btime* in
+        */proc/stat* only has a resolution of one second.
+        """
+        try:
+            with open("/proc/uptime") as file:
+                uptime = float(file.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            uptime = time.monotonic()
+        return time.time() - uptime
+
+    def process_tree(self):
+        """
+        Reads the process table and returns a dictionary, which maps a pid to
+        the tuples *(pid, command name)* of its children.
+        """
+        children = collections.defaultdict(list)
+        for name in os.listdir("/proc"):
+            if not name.isdigit():
+                continue
+            try:
+                stat = _read_stat(name)
+            except OSError:
+                continue
+            children[int(stat[2])].append((int(name), stat[0]))
+        return children
+
+    def find_server(self, pid, tree):
+        """
+        Returns the pid of the server process below the session process
+        *pid*. A descendant, whose command is in :data:`SERVER_COMMANDS`, is
+        preferred. Otherwise, the deepest descendant is chosen. If *pid* has
+        no children, *pid* itself is returned.
+
+        :param dict tree:
+            The result of :meth:`process_tree`.
+        """
+        deepest = (0, pid)
+        stack = [(child, comm, 1) for child, comm in tree.get(pid, ())]
+        while stack:
+            child, comm, depth = stack.pop()
+            if comm in SERVER_COMMANDS:
+                return child
+            deepest = max(deepest, (depth, child))
+            stack.extend(
+                (grandchild, comm, depth + 1)
+                for grandchild, comm in tree.get(child, ())
+                )
+        return deepest[1]
+
+    def snapshot(self, pid):
+        """
+        Returns a :class:`ProcessSnapshot` of the process *pid* or ``None``,
+        if the process does not exist.
+        """
+        timestamp = time.monotonic()
+        try:
+            stat = _read_stat(pid)
+        except OSError:
+            return None
+
+        # The fields are numbered like in proc(5) minus 2, since the pid
+        # is not in the list.
+        cpu_time = (int(stat[12]) + int(stat[13]))/self._clock_ticks
+        threads = int(stat[18])
+        start_time = self._boot_time() + int(stat[20])/self._clock_ticks
+        rss = int(stat[22])*self._page_size
+
+        try:
+            fds = len(os.listdir("/proc/{}/fd".format(pid)))
+        except OSError:
+            fds = None
+
+        read_bytes = write_bytes = None
+        try:
+            with open("/proc/{}/io".format(pid)) as file:
+                for line in file:
+                    key, sep, value = line.partition(":")
+                    if key == "read_bytes":
+                        read_bytes = int(value)
+                    elif key == "write_bytes":
+                        write_bytes = int(value)
+        except (OSError, ValueError):
+            pass
+
+        return ProcessSnapshot(
+            pid, timestamp, cpu_time, rss, threads, fds, read_bytes,
+            write_bytes, start_time
+            )
+
+    def server_pids(self, session_pids):
+        """
+        Returns a dictionary, which maps each key in *session_pids* to the
+        pid of the server process below the session process.
+
+        .. seealso::
+
+            * :meth:`find_server`
+        """
+        tree = self.process_tree()
+        return {
+            key: self.find_server(pid, tree)
+            for key, pid in session_pids.items()
+            }
+
+    def snapshots(self, session_pids):
+        """
+        Takes one snapshot of each server process below the session
+        processes. The counters in the snapshots (e.g. the cpu time) are
+        cumulative, so no second snapshot is needed to export them.
+
+        :param dict session_pids:
+            Maps a key (e.g. the name of a world) to the pid of the session
+            process.
+
+        :returns:
+            A dictionary, which maps each key to a :class:`ProcessSnapshot`
+            or ``None``, if the process does not exist.
+        """
+        return {
+            key: self.snapshot(pid)
+            for key, pid in self.server_pids(session_pids).items()
+            }
+
+    def sample(self, session_pids, interval=0.5):
+        """
+        Samples the resource usage of the server processes below the
+        session processes.
+
+        :param dict session_pids:
+            Maps a key (e.g. the name of a world) to the pid of the session
+            process.
+        :param float interval:
+            The time in seconds between the two snapshots.
+
+        :returns:
+            A dictionary, which maps each key to a :class:`ResourceUsage` or
+            ``None``, if the process does not exist.
+        """
+        server_pids = self.server_pids(session_pids)
+
+        first = {key: self.snapshot(pid) for key, pid in server_pids.items()}
+        if any(first.values()):
+            time.sleep(interval)
+
+        usage = dict()
+        for key, pid in server_pids.items():
+            second = self.snapshot(pid)
+            if first[key] is None or second is None:
+                usage[key] = None
+            else:
+                usage[key] = ResourceUsage(first[key], second)
+        return usage
@@ -102,6 +102,13 @@ class Pathsystem(object):
               |- emsm.log.1
               |- emsm.log.2
               |- ...
+            |- run             # the control sockets of the EMSM supervisor
+              |- 20405.minecraft_foo
+              |- ...
+            |- data            # data generated by the EMSM for the worlds
+              |- foo
+                 |- latest.log.index
+              |- ...
     """
 
     def __init__(self):
@@ -118,6 +125,8 @@ class Pathsystem(object):
         self._worlds_dir = os.path.join(self._root_dir, "worlds")
         self._emsm_dir = os.path.join(self._root_dir, "emsm")
         self._log_dir = os.path.join(self._root_dir, "logs")
+        self._run_dir = os.path.join(self._root_dir, "run")
+        self._data_dir = os.path.join(self._root_dir, "data")
         return None
 
     def create(self):
@@ -143,6 +152,8 @@ class Pathsystem(object):
         make_dir(self._worlds_dir)
         make_dir(self._emsm_dir)
         make_dir(self._log_dir)
+        make_dir(self._run_dir)
+        make_dir(self._data_dir)
         return None
 
     def root_dir(self):
@@ -234,3 +245,32 @@ class Pathsystem(object):
         Note, that this is NOT the log directory of the minecraft server.
         """
         return self._log_dir
+
+    def run_dir(self):
+        """
+        Contains the control sockets of the supervisor processes, that run
+        the worlds with the *supervisor* backend.
+
+        .. seealso::
+
+            * :class:`emsm.worlds.SupervisorBackend`
+        """
+        return self._run_dir
+
+    def data_dir(self):
+        """
+        Contains the data, which is generated by the EMSM itself and can
+        always be rebuilt, like the log indexes of the worlds.
+
+        .. seealso:: :meth:`world_data_dir`
+        """
+        return self._data_dir
+
+    def world_data_dir(self, world_name):
+        """
+        Contains the data, which is generated by the EMSM for the world
+        *world_name*. This directory is not created automatically.
+
+        Furthermore, it is a child of :meth:`data_dir`.
+        """
+        return os.path.join(self._data_dir, world_name)
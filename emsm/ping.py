@@ -0,0 +1,417 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module implements the minecraft *Server List Ping*, which is used by
+the game client to show the status of a server in the server list.
+
+The ping checks, that the server actually answers minecraft requests and not
+only accepts tcp connections. It also returns the round trip time and the
+number of online players.
+
+Servers since minecraft 1.7 use the new protocol. Older servers are asked
+with the legacy ping (0xFE 0x01), if the new protocol fails.
+
+.. seealso::
+
+    * http://wiki.vg/Server_List_Ping
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import io
+import json
+import time
+import socket
+import struct
+import random
+import logging
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "PingError",
+    "PingUnavailableError",
+    "PingResponse",
+    "ping",
+    "ping_modern",
+    "ping_legacy"
+    ]
+
+log = logging.getLogger(__file__)
+
+#: The protocol version sent in the handshake. Servers answer status requests
+#: independent of the protocol version.
+PROTOCOL_VERSION = 47
+
+# The maximum size of a status response.
+_MAX_PACKET_SIZE = 2**21
+
+
+# Exceptions
+# ------------------------------------------------
+
+class PingError(Exception):
+    """
+    Raised if the server could not be reached or did not answer the ping
+    correctly.
+    """
+    pass
+
+
+class PingUnavailableError(PingError):
+    """
+    Raised if no connection to the server could be established.
+    """
+    pass
+
+
+# Classes
+# ------------------------------------------------
+
+class PingResponse(object):
+    """
+    The answer of a server to the *Server List Ping*.
+    """
+
+    def __init__(self, latency, online_players, max_players, version=None,
+                 protocol=None, motd=None, legacy=False):
+        """
+        """
+        self._latency = latency
+        self._online_players = online_players
+        self._max_players = max_players
+        self._version = version
+        self._protocol = protocol
+        self._motd = motd
+        self._legacy = legacy
+        return None
+
+    def __repr__(self):
+        return "<PingResponse latency={:.1f}ms players={}/{}>"\
+               .format(self._latency*1000, self._online_players,
+                       self._max_players)
+
+    def latency(self):
+        """
+        Returns the round trip time of the ping in seconds.
+        """
+        return self._latency
+
+    def online_players(self):
+        """
+        Returns the number of online players.
+        """
+        return self._online_players
+
+    def max_players(self):
+        """
+        Returns the maximum number of players.
+        """
+        return self._max_players
+
+    def version(self):
+        """
+        Returns the version name of the server or ``None``, if the server did
+        not send it.
+        """
+        return self._version
+
+    def protocol(self):
+        """
+        Returns the protocol version of the server or ``None``, if the server
+        did not send it.
+        """
+        return self._protocol
+
+    def motd(self):
+        """
+        Returns the *message of the day* of the server.
+        """
+        return self._motd
+
+    def legacy(self):
+        """
+        Returns ``True`` if the server answered the legacy ping.
+        """
+        return self._legacy
+
+
+# Functions
+# ------------------------------------------------
+
+def _pack_varint(value):
+    """
+    Returns the *VarInt* encoding of *value*.
+    """
+    value &= 0xFFFFFFFF
+    data = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+
+def _pack_string(value):
+    """
+    Returns the encoding of the string *value* (length prefixed utf-8).
+    """
+    value = value.encode("utf-8")
+    return _pack_varint(len(value)) + value
+
+
+def _pack_packet(packet_id, data=b""):
+    """
+    Returns the length prefixed packet with the id *packet_id*.
+    """
+    data = _pack_varint(packet_id) + data
+    return _pack_varint(len(data)) + data
+
+
+def _recv_exactly(sock, size):
+    """
+    Receives exactly *size* bytes from the socket.
+
+    :raises PingError:
+        if the connection has been closed before.
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise PingError("the server closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+def _recv_varint(sock):
+    """
+    Reads a *VarInt* from the socket.
+    """
+    value = 0
+    for i in range(5):
+        byte = _recv_exactly(sock, 1)[0]
+        value |= (byte & 0x7F) << (7*i)
+        if not byte & 0x80:
+            return value
+    raise PingError("invalid varint")
+
+
+def _read_varint(stream):
+    """
+    Reads a *VarInt* from the binary *stream*.
+    """
+    value = 0
+    for i in range(5):
+        byte = stream.read(1)
+        if not byte:
+            raise PingError("truncated packet")
+        value |= (byte[0] & 0x7F) << (7*i)
+        if not byte[0] & 0x80:
+            return value
+    raise PingError("invalid varint")
+
+
+def _recv_packet(sock):
+    """
+    Receives the next packet and returns the tuple *(packet_id, stream)*.
+    """
+    size = _recv_varint(sock)
+    if not 0 < size <= _MAX_PACKET_SIZE:
+        raise PingError("invalid packet size: {}".format(size))
+    stream = io.BytesIO(_recv_exactly(sock, size))
+    return (_read_varint(stream), stream)
+
+
+def _motd_text(description):
+    """
+    Returns the plain text of the *description* in the status response,
+    which is either a string or a chat component.
+    """
+    if isinstance(description, str):
+        return description
+    if isinstance(description, dict):
+        text = description.get("text", "")
+        for extra in description.get("extra", list()):
+            text += _motd_text(extra)
+        return text
+    return str()
+
+
+def ping_modern(host, port=25565, timeout=3):
+    """
+    Pings the server with the protocol of minecraft 1.7 and newer.
+
+    The latency is the round trip time of the *ping* packet or of the status
+    request, if the server does not answer the ping packet.
+
+    :raises PingUnavailableError:
+        if the server is not reachable.
+    :raises PingError:
+        if the server did not answer correctly.
+    """
+    try:
+        sock = socket.create_connection((host, port), timeout)
+    except OSError as err:
+        raise PingUnavailableError(err)
+
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # Handshake (next state: status) and status request.
+        handshake = _pack_varint(PROTOCOL_VERSION) + _pack_string(host)\
+                    + struct.pack(">H", port) + _pack_varint(1)
+        start = time.perf_counter()
+        sock.sendall(_pack_packet(0x00, handshake) + _pack_packet(0x00))
+
+        packet_id, stream = _recv_packet(sock)
+        latency = time.perf_counter() - start
+        if packet_id != 0x00:
+            raise PingError("unexpected packet: {}".format(packet_id))
+        size = _read_varint(stream)
+        status = json.loads(stream.read(size).decode("utf-8"))
+
+        # Ping - Pong
+        payload = random.getrandbits(63)
+        start = time.perf_counter()
+        sock.sendall(_pack_packet(0x01, struct.pack(">q", payload)))
+        try:
+            packet_id, stream = _recv_packet(sock)
+        except PingError:
+            # Some servers close the connection after the status response.
+            pass
+        else:
+            if packet_id == 0x01 and stream.read(8) == struct.pack(">q", payload):
+                latency = time.perf_counter() - start
+    except (OSError, ValueError) as err:
+        raise PingError(err)
+    finally:
+        sock.close()
+
+    if not isinstance(status, dict):
+        raise PingError("invalid status response")
+    players = status.get("players", dict())
+    version = status.get("version", dict())
+    try:
+        response = PingResponse(
+            latency = latency,
+            online_players = int(players.get("online", 0)),
+            max_players = int(players.get("max", 0)),
+            version = version.get("name"),
+            protocol = version.get("protocol"),
+            motd = _motd_text(status.get("description"))
+            )
+    except (TypeError, ValueError, AttributeError) as err:
+        raise PingError("invalid status response: {}".format(err))
+    return response
+
+
+def ping_legacy(host, port=25565, timeout=3):
+    """
+    Pings the server with the legacy protocol of minecraft 1.6 and older.
+
+    :raises PingUnavailableError:
+        if the server is not reachable.
+    :raises PingError:
+        if the server did not answer correctly.
+    """
+    try:
+        sock = socket.create_connection((host, port), timeout)
+    except OSError as err:
+        raise PingUnavailableError(err)
+
+    try:
+        start = time.perf_counter()
+        sock.sendall(b"\xfe\x01")
+        packet_id = _recv_exactly(sock, 1)
+        latency = time.perf_counter() - start
+        if packet_id != b"\xff":
+            raise PingError("unexpected packet: {}".format(packet_id))
+        size, = struct.unpack(">H", _recv_exactly(sock, 2))
+        data = _recv_exactly(sock, 2*size).decode("utf-16-be")
+    except (OSError, ValueError) as err:
+        raise PingError(err)
+    finally:
+        sock.close()
+
+    try:
+        # 1.4 - 1.6: "§1\0protocol\0version\0motd\0online\0max"
+        if data.startswith("§1\x00"):
+            fields = data.split("\x00")
+            response = PingResponse(
+                latency = latency,
+                online_players = int(fields[4]),
+                max_players = int(fields[5]),
+                version = fields[2],
+                protocol = int(fields[1]),
+                motd = fields[3],
+                legacy = True
+                )
+        # Beta 1.8 - 1.3: "motd§online§max"
+        else:
+            motd, online, max_players = data.rsplit("§", 2)
+            response = PingResponse(
+                latency = latency,
+                online_players = int(online),
+                max_players = int(max_players),
+                motd = motd,
+                legacy = True
+                )
+    except (IndexError, ValueError) as err:
+        raise PingError("invalid legacy response: {}".format(err))
+    return response
+
+
+def ping(host, port=25565, timeout=3):
+    """
+    Pings the server and returns a :class:`PingResponse`. If the server does
+    not answer the ping of minecraft 1.7 and newer, the legacy ping is tried.
+
+    :raises PingUnavailableError:
+        if the server is not reachable.
+    :raises PingError:
+        if the server did not answer correctly.
+
+    .. seealso::
+
+        * :func:`ping_modern`
+        * :func:`ping_legacy`
+    """
+    try:
+        return ping_modern(host, port, timeout)
+    except PingUnavailableError:
+        raise
+    except PingError as err:
+        log.debug("modern ping of {}:{} failed ({}), trying the legacy "\
+                  "ping ...".format(host, port, err))
+    return ping_legacy(host, port, timeout)
@@ -29,6 +29,8 @@
 # std
 import os
 import sys
+import json
+import hashlib
 import logging
 import importlib.machinery
 
@@ -38,6 +40,8 @@ import blinker
 # local
 from .version import VERSION
 from .base_plugin import BasePlugin
+from . import argparse_
+from . import trace
 
 
 # Backward compatibility
@@ -65,6 +69,10 @@ __all__ = [
 
 log = logging.getLogger(__file__)
 
+#: The version of the plugin manifest format. Manifests with another version
+#: are rebuilt.
+MANIFEST_VERSION = 2
+
 
 # Exceptions
 # ------------------------------------------------
@@ -111,6 +119,25 @@ class PluginOutdatedError(PluginException):
         return temp
 
 
+# Functions
+# ------------------------------------------------
+
+def _file_is_plugin(path):
+    """
+    Returns ``True`` if the path probably points to a plugin module.
+    """
+    filename = os.path.basename(path)
+    if os.path.isdir(path):
+        return False
+    elif filename.startswith("_"):
+        return False
+    elif not filename.endswith(".py"):
+        return False
+    elif filename.count(".") != 1:
+        return False
+    return True
+
+
 # Classes
 # ------------------------------------------------
 
@@ -118,6 +145,18 @@ class PluginManager(object):
     """
     Loads and manages all plugins.
 
+    The plugins are not imported on every run. The metadata of each plugin
+    (name, version, priorities, arguments and default configuration) is
+    stored in a manifest, which is cached in the
+    :meth:`~emsm.paths.Pathsystem.plugins_data_dir`. Only the plugin, which
+    has been selected on the command line, and the
+    :attr:`~emsm.base_plugin.BasePlugin.SUBSCRIBER` plugins are imported and
+    initialised. All other plugins are loaded, when they are first
+    needed (:meth:`get_plugin`).
+
+    A new or modified plugin is initialised once, so that its arguments and
+    its default configuration can be recorded in the manifest.
+
     If you want to write a plugin and search for the docs, take a look at the
     :mod:`plugins.hellodolly` plugin.
     
@@ -140,6 +179,17 @@ class PluginManager(object):
         # Maps the module name to the plugin instance.
         self._plugins = dict()
 
+        # Maps the module name to the manifest entry of each available
+        # plugin, also of those which have not been imported yet.
+        self._manifest = dict()
+
+        # The name of the plugin, which is selected on the command line.
+        self._selected = None
+
+        # True, if the manifest entries have been completed after the
+        # initialisation of a plugin and must be saved.
+        self._manifest_modified = False
+
         # Unload the plugin when it has been uninstalled.
         #
         # See also:
@@ -147,18 +197,40 @@ class PluginManager(object):
         BasePlugin.plugin_uninstalled.connect(self._uninstall)
         return None
 
+    def _import_available(self, plugin_name):
+        """
+        Imports the plugin *plugin_name*, if it is available but has not
+        been imported yet.
+        """
+        if plugin_name in self._plugin_modules \
+           or plugin_name not in self._manifest:
+            return None
+
+        try:
+            self.import_plugin(self._manifest[plugin_name]["path"])
+        except (PluginImplementationError, PluginOutdatedError) as err:
+            log.warning(err)
+            del self._manifest[plugin_name]
+        return None
+
     def get_module(self, plugin_name):
         """
         Returns the Python module object that contains the plugin with the
         name *plugin_name* or ``None`` if there is no plugin with that name.
+
+        The plugin is imported, if this has not been done yet.
         """
+        self._import_available(plugin_name)
         return self._plugin_modules.get(plugin_name)
     
     def get_plugin_type(self, plugin_name):
         """
         Returns the plugin class for the plugin with the name *plugin_name* or
         ``None``, if there is no plugin with that name.
+
+        The plugin is imported, if this has not been done yet.
         """
+        self._import_available(plugin_name)
         return self._plugin_types.get(plugin_name)
     
     def plugin_is_available(self, plugin_name):
@@ -166,24 +238,38 @@ class PluginManager(object):
         Returns ``True``, if the plugin with the name *plugin_name* is
         available.
         """
-        return plugin_name in self._plugin_modules
+        return plugin_name in self._manifest \
+               or plugin_name in self._plugin_modules
 
     def get_plugin_names(self):
         """
-        Returns the names of all loaded plugins.
+        Returns the names of all available plugins, also of those, which
+        have not been imported yet.
         """
-        return list(self._plugin_modules.keys())
+        names = set(self._manifest.keys())
+        names.update(self._plugin_modules.keys())
+        return list(names)
     
     def get_plugin(self, plugin_name):
         """
         Returns the instance of the plugin with the name *plugin_name* that is
-        currently loaded and used by the EMSM.
+        currently loaded and used by the EMSM or ``None``, if there is no
+        plugin with that name.
+
+        If the plugin has not been loaded yet, it is imported and
+        initialised now.
         """
+        if plugin_name not in self._plugins:
+            plugin_type = self.get_plugin_type(plugin_name)
+            if plugin_type is None:
+                return None
+            self._init_plugin(plugin_name, plugin_type)
         return self._plugins.get(plugin_name)
 
     def get_all_plugins(self):
         """
-        Returns all currently loaded plugin instances.
+        Returns all currently loaded plugin instances. Plugins, which have
+        not been needed in this run, are not included.
 
         .. seealso::
         
@@ -239,7 +325,8 @@ class PluginManager(object):
 
         # Try to import the module.
         try:
-            module = _import_module(name, path)
+            with trace.span("import " + name, "plugin", path=path):
+                module = _import_module(name, path)
         except Exception as err:
             raise PluginImplementationError(name, err)            
 
@@ -273,6 +360,159 @@ class PluginManager(object):
         self._plugin_types[name] = plugin_type
         return None
 
+    def _manifest_path(self):
+        """
+        Returns the path of the cached plugin manifest.
+        """
+        return os.path.join(
+            self._app.paths().plugins_data_dir(), ".manifest.json"
+            )
+
+    def _load_manifest(self):
+        """
+        Returns the cached manifest entries, which map the filename of a
+        plugin module to its metadata.
+        """
+        try:
+            with open(self._manifest_path()) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return dict()
+
+        if not isinstance(manifest, dict) \
+           or manifest.get("version") != MANIFEST_VERSION \
+           or manifest.get("emsm") != VERSION:
+            return dict()
+        return manifest.get("plugins", dict())
+
+    def _save_manifest(self, entries):
+        """
+        Saves the manifest *entries* atomically.
+        """
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "emsm": VERSION,
+            "plugins": entries
+            }
+
+        path = self._manifest_path()
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(manifest, file, indent=4, sort_keys=True)
+            os.replace(tmp_path, path)
+        except OSError as err:
+            log.warning("could not save the plugin manifest: {}".format(err))
+        return None
+
+    def _manifest_entry(self, path, stat, sha1, cached=None):
+        """
+        Imports the plugin at *path* and returns its manifest entry.
+
+        The arguments and the configuration of the plugin are recorded, when
+        the plugin is initialised (:meth:`_record_plugin`). The default
+        configuration of the *cached* entry is kept.
+
+        :raises PluginImplementationError:
+        :raises PluginOutdatedError:
+        """
+        self.import_plugin(path)
+
+        name = os.path.basename(path)[:-3]
+        plugin_type = self._plugin_types[name]
+        return {
+            "name": name,
+            "path": path,
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha1": sha1,
+            "class": plugin_type.__name__,
+            "version": plugin_type.VERSION,
+            "init_priority": plugin_type.INIT_PRIORITY,
+            "finish_priority": plugin_type.FINISH_PRIORITY,
+            "subscriber": bool(plugin_type.SUBSCRIBER),
+            "description": None,
+            "arguments": None,
+            "conf": dict(cached.get("conf") or {}) if cached else dict()
+            }
+
+    def scan_directory(self, directory):
+        """
+        Updates the manifest with the plugins in the :file:`directory`.
+
+        Only modules, which have been changed since the manifest has been
+        cached, are imported. A module is considered to be changed, if its
+        modification time or size changed and the SHA-1 hash of its content
+        is different.
+
+        Files that do not contain a valid EMSM plugin, are ignored and
+        checked again with the next run. You can check the log files to see
+        which plugins have been ignored.
+
+        .. seealso::
+
+            * :meth:`import_from_directory`
+        """
+        log.info("scanning plugins in '{}' ...".format(directory))
+
+        cached = self._load_manifest()
+        entries = dict()
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if not _file_is_plugin(path):
+                continue
+
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            entry = cached.get(filename)
+            if entry is not None and entry["path"] == path \
+               and entry["mtime"] == stat.st_mtime_ns \
+               and entry["size"] == stat.st_size:
+                entries[filename] = entry
+                continue
+
+            with open(path, "rb") as file:
+                sha1 = hashlib.sha1(file.read()).hexdigest()
+            if entry is not None and entry["path"] == path \
+               and entry["sha1"] == sha1:
+                entries[filename] = dict(
+                    entry, mtime=stat.st_mtime_ns, size=stat.st_size
+                    )
+                continue
+
+            try:
+                entries[filename] = self._manifest_entry(
+                    path, stat, sha1, entry
+                    )
+            except PluginImplementationError as err:
+                log.warning(err)
+            except PluginOutdatedError as err:
+                log.warning(err)
+            else:
+                log.info("loaded plugin from '{}'.".format(path))
+
+        if entries != cached:
+            self._save_manifest(entries)
+
+        for entry in entries.values():
+            self._manifest[entry["name"]] = entry
+        return None
+
+    def _save_manifest_entries(self):
+        """
+        Saves the manifest entries of all available plugins.
+        """
+        entries = {
+            os.path.basename(entry["path"]): entry \
+            for entry in self._manifest.values()
+            }
+        self._save_manifest(entries)
+        self._manifest_modified = False
+        return None
+
     def import_from_directory(self, directory):
         """
         Imports all Python modules in the :file:`directory`.
@@ -284,26 +524,11 @@ class PluginManager(object):
         
             * :meth:`import_plugin`
         """
-        def file_is_plugin(path):
-            """
-            Returns ``True`` if the path probably points to a plugin module.
-            """
-            filename = os.path.basename(path)
-            if os.path.isdir(path):
-                return False
-            elif filename.startswith("_"):
-                return False
-            elif not filename.endswith(".py"):
-                return False
-            elif filename.count(".") != 1:
-                return False
-            return True
-
         log.info("loading plugins from '{}' ...".format(directory))
         
         for filename in os.listdir(directory):
             path = os.path.join(directory, filename)
-            if not file_is_plugin(path):
+            if not _file_is_plugin(path):
                 continue
 
             try:
@@ -339,8 +564,9 @@ class PluginManager(object):
 
         # Remove the plugin.
         del self._plugins[plugin_name]
-        del self._plugin_types[plugin_name]
-        del self._plugin_modules[plugin_name]
+        self._plugin_types.pop(plugin_name, None)
+        self._plugin_modules.pop(plugin_name, None)
+        self._manifest.pop(plugin_name, None)
 
         # The plugin has been removed.
         log.info("the plugin '{}' has been unloaded.".format(plugin_name))
@@ -364,19 +590,120 @@ class PluginManager(object):
     
     def setup(self):
         """
-        Imports all plugins from the application's plugin directory.
+        Updates the manifest of the plugins in the application's plugin
+        directory and imports the plugin, which is selected on the command
+        line, and all :attr:`~emsm.base_plugin.BasePlugin.SUBSCRIBER`
+        plugins.
+
+        The global arguments must have been added to the argument parser
+        before, so that the selected plugin can be found.
 
         .. seealso::
 
             * :meth:`emsm.paths.Pathsystem.plugins_dir`
+            * :meth:`emsm.argparse_.ArgumentParser.selected_plugin`
+            * :meth:`scan_directory`
         """
         plugins_dir = self._app.paths().plugins_dir()
-        self.import_from_directory(plugins_dir)
+        self.scan_directory(plugins_dir)
+
+        self._selected = self._app.argparser().selected_plugin()
+        for name in sorted(self._manifest):
+            if self._is_needed(name):
+                self._import_available(name)
+        return None
+
+    def _is_needed(self, name):
+        """
+        Returns ``True`` if the plugin *name* must be initialised with the
+        start of the EMSM. These are the selected plugin, the subscribers,
+        the new or modified plugins and plugins, which have been imported
+        explicitly with :meth:`import_plugin`.
+        """
+        entry = self._manifest.get(name)
+        return entry is None or entry["subscriber"] \
+               or entry["arguments"] is None or name == self._selected
+
+    def _conf_options(self, name):
+        """
+        Returns the options in the configuration section of the plugin
+        *name*.
+        """
+        main_conf = self._app.conf().main()
+        if not main_conf.has_section(name):
+            return dict()
+        return {option: main_conf.get(name, option, raw=True) \
+                for option in main_conf.options(name)}
+
+    def _init_plugin(self, name, plugin_type):
+        """
+        Creates the instance of the plugin *name*.
+        """
+        options = self._conf_options(name)
+        with trace.span("init " + name, "plugin"):
+            plugin = plugin_type(self._app, name)
+        self._plugins[name] = plugin
+
+        entry = self._manifest.get(name)
+        if entry is not None and entry["arguments"] is None:
+            self._record_plugin(entry, plugin, options)
+        return None
+
+    def _record_plugin(self, entry, plugin, options):
+        """
+        Records the arguments and the default configuration of the
+        initialised *plugin* in its manifest *entry*. *options* is the
+        configuration section before the initialisation. The options, which
+        have been added by the plugin, are its default configuration.
+        """
+        parser = plugin.argparser()
+        entry["description"] = parser.description
+        entry["arguments"] = argparse_.describe_arguments(parser)
+
+        # *None*, if the plugin has no configuration section.
+        if self._app.conf().main().has_section(plugin.name()):
+            entry["conf"].update(
+                (option, value) for option, value \
+                in self._conf_options(plugin.name()).items() \
+                if option not in options
+                )
+        else:
+            entry["conf"] = None
+        self._manifest_modified = True
+        return None
+
+    def _setup_unloaded_plugin(self, name):
+        """
+        Restores the help and the default configuration of the plugin
+        *name*, which has not been initialised in this run, from the
+        manifest.
+        """
+        entry = self._manifest[name]
+        self._app.argparser().plugin_help_parser(
+            name, entry["description"], entry["arguments"] or list()
+            )
+
+        # Only the missing options are added, so that the configuration is
+        # not modified without reason.
+        if entry["conf"] is None:
+            return None
+
+        main_conf = self._app.conf().main()
+        if not main_conf.has_section(name):
+            main_conf.add_section(name)
+        for option, value in sorted(entry["conf"].items()):
+            if not main_conf.has_option(name, option):
+                main_conf.set(name, option, value)
         return None
 
     def init_plugins(self):
         """
-        Creates a plugin instance for each loaded plugin class.
+        Creates a plugin instance for the selected plugin and the
+        subscribers.
+
+        The subparsers and the default configuration of the other plugins
+        are restored from the manifest, so that they are listed in the help
+        of the EMSM and their configuration sections are created.
 
         When you call this method multiple times, only plugins that have
         not been initialised already, will be initialised.
@@ -389,13 +716,20 @@ class PluginManager(object):
         
         for name, plugin_type in init_queue:
             
-            # The plugin has already been initialised.
-            if name in self._plugins:
+            # The plugin has already been initialised or is not needed
+            # in this run.
+            if name in self._plugins or not self._is_needed(name):
                 continue
 
             # Create a new plugin instance and save it.
-            plugin = plugin_type(self._app, name)
-            self._plugins[name] = plugin
+            self._init_plugin(name, plugin_type)
+
+        for name in sorted(self._manifest):
+            if name not in self._plugins:
+                self._setup_unloaded_plugin(name)
+
+        if self._manifest_modified:
+            self._save_manifest_entries()
 
         log.info("initialised plugins.")
         return None
@@ -420,8 +754,9 @@ class PluginManager(object):
 
         # Execute the plugin.
         log.info("running plugin '{}' ...".format(plugin_name))
-        plugin = self._plugins[plugin_name]
-        plugin.run(args)
+        plugin = self.get_plugin(plugin_name)
+        with trace.span("run " + plugin_name, "plugin"):
+            plugin.run(args)
         return None
 
     def finish(self):
@@ -435,5 +770,6 @@ class PluginManager(object):
         finish_queue = sorted(finish_queue, key=lambda p: p.FINISH_PRIORITY)
         
         for plugin in finish_queue:
-            plugin.finish()
+            with trace.span("finish " + plugin.name(), "plugin"):
+                plugin.finish()
         return None
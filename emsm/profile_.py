@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module profiles the phases of an EMSM run (reading the configuration,
+waiting for the file lock, importing and initialising the plugins, running
+the plugin, ...) with :mod:`cProfile`.
+
+The application enables the profiler, when the global ``--profile OUT``
+argument is given. The profiles of all phases are written to *OUT* in the
+:mod:`pstats` format, which can be inspected with:
+
+.. code-block:: bash
+
+    $ python3 -m pstats OUT
+
+A short summary with the functions with the highest cumulative time in each
+phase is written to *OUT.txt* and printed to *stderr*.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import io
+import time
+import cProfile
+import pstats
+import contextlib
+import collections
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "PhaseProfiler"
+    ]
+
+
+# Classes
+# ------------------------------------------------
+
+class PhaseProfiler(object):
+    """
+    Profiles each phase of a run with its own :class:`cProfile.Profile`.
+
+    The phases must not be nested, since only one profiler can be active at
+    the same time. A phase may be entered more than once, its profiles are
+    accumulated.
+    """
+
+    def __init__(self):
+        """
+        """
+        # Maps the name of the phase to its profile and the wall clock
+        # time spent in the phase.
+        # name => cProfile.Profile
+        self._profiles = collections.OrderedDict()
+        # name => seconds
+        self._durations = collections.defaultdict(float)
+        return None
+
+    def phases(self):
+        """
+        Returns the names of the profiled phases in the order of their first
+        occurrence.
+        """
+        return list(self._profiles.keys())
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Profiles the code in the context as part of the phase *name*.
+        """
+        profile = self._profiles.get(name)
+        if profile is None:
+            profile = self._profiles[name] = cProfile.Profile()
+
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            self._durations[name] += time.perf_counter() - start
+        return None
+
+    def stats(self, name=None):
+        """
+        Returns the :class:`pstats.Stats` of the phase *name* or of all
+        phases, if *name* is ``None``.
+        """
+        if name is not None:
+            profiles = [self._profiles[name]]
+        else:
+            profiles = list(self._profiles.values())
+        return pstats.Stats(*profiles, stream=io.StringIO())
+
+    def summary(self, limit=5):
+        """
+        Returns a short text, which lists the duration of each phase and its
+        *limit* functions with the highest cumulative time.
+        """
+        lines = list()
+        for name in self.phases():
+            lines.append("{}: {:.3f}s".format(name, self._durations[name]))
+
+            # stats.stats maps a function to the tuple
+            # (primitive calls, calls, total time, cumulative time, callers)
+            stats = self.stats(name).stats
+            functions = sorted(
+                stats.items(), key=lambda item: item[1][3], reverse=True
+                )
+            for func, (cc, nc, tt, ct, callers) in functions[:limit]:
+                lines.append("\t{:>9.4f}s {:>8} {}"\
+                             .format(ct, nc, pstats.func_std_string(func)))
+        return "\n".join(lines)
+
+    def write(self, path):
+        """
+        Writes the profiles of all phases to *path* in the :mod:`pstats`
+        format.
+        """
+        if self._profiles:
+            self.stats().dump_stats(path)
+        return None
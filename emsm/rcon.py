@@ -0,0 +1,380 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+This module implements a client for the minecraft RCON protocol, which
+allows to send commands to a server and to receive the exact response
+to each command.
+
+.. seealso::
+
+    * http://wiki.vg/Rcon
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import socket
+import struct
+import threading
+import logging
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "RconError",
+    "RconUnavailableError",
+    "RconAuthError",
+    "RconStaleConnectionError",
+    "RconClient",
+    "RconPool"
+    ]
+
+log = logging.getLogger(__file__)
+
+# The packet types.
+_TYPE_RESPONSE = 0
+_TYPE_COMMAND = 2
+_TYPE_LOGIN = 3
+
+# The server answers an unknown packet type with a single response
+# packet. Since the packets are processed in order, this response marks the
+# end of the response to the previous command.
+_TYPE_END_MARKER = 200
+
+
+# Exceptions
+# ------------------------------------------------
+
+class RconError(Exception):
+    """
+    Base class for all exceptions in this module.
+    """
+    pass
+
+
+class RconUnavailableError(RconError):
+    """
+    Raised if no connection to the RCON server could be established. When
+    this exception is raised, no command has been sent.
+    """
+    pass
+
+
+class RconAuthError(RconUnavailableError):
+    """
+    Raised if the RCON server rejected the password.
+    """
+    pass
+
+
+class RconStaleConnectionError(RconUnavailableError):
+    """
+    Raised if the command could not be sent or the server closed the
+    connection, before it answered anything. This happens, when the server
+    closed an idle connection. The command has not been executed.
+    """
+    pass
+
+
+# Classes
+# ------------------------------------------------
+
+class RconClient(object):
+    """
+    A single, authenticated connection to a RCON server.
+
+    :param str host:
+        The hostname or ip address of the server.
+    :param int port:
+        The RCON port (*rcon.port* in the :file:`server.properties`).
+    :param str password:
+        The RCON password (*rcon.password*).
+    :param float timeout:
+        Time in seconds waited for the server.
+    """
+
+    def __init__(self, host, port, password, timeout=10):
+        """
+        """
+        self._host = host
+        self._port = port
+        self._password = password
+        self._timeout = timeout
+
+        self._socket = None
+        self._request_id = 0
+
+        # The number of bytes received for the current command.
+        self._received = 0
+        return None
+
+    def set_timeout(self, timeout):
+        """
+        Changes the time in seconds waited for the server.
+        """
+        self._timeout = timeout
+        if self._socket is not None:
+            self._socket.settimeout(timeout)
+        return None
+
+    def is_connected(self):
+        """
+        Returns ``True`` if the client is connected and authenticated.
+        """
+        return self._socket is not None
+
+    def connect(self):
+        """
+        Connects to the server and authenticates the client.
+
+        :raises RconUnavailableError:
+            if the server is not reachable.
+        :raises RconAuthError:
+            if the password has been rejected.
+        """
+        try:
+            self._socket = socket.create_connection(
+                (self._host, self._port), self._timeout
+                )
+        except OSError as err:
+            self._socket = None
+            raise RconUnavailableError(err)
+
+        try:
+            request_id, packet = self._packet(_TYPE_LOGIN, self._password)
+            self._socket.sendall(packet)
+            response_id, response_type, body = self._recv()
+        except (OSError, RconError) as err:
+            self.close()
+            raise RconUnavailableError(err)
+
+        # The server responds with the id -1 if the password is wrong.
+        if response_id != request_id:
+            self.close()
+            raise RconAuthError("The RCON password has been rejected.")
+        return None
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+        return None
+
+    def _packet(self, packet_type, body):
+        """
+        Returns the tuple *(request_id, packet)* with a new request id and
+        the encoded packet.
+        """
+        self._request_id = (self._request_id + 1) % 2**31
+        body = body.encode("utf-8") + b"\x00\x00"
+        packet = struct.pack(
+            "<iii", 8 + len(body), self._request_id, packet_type
+            ) + body
+        return (self._request_id, packet)
+
+    def _recv_exactly(self, size):
+        """
+        Receives exactly *size* bytes.
+        """
+        data = bytes()
+        while len(data) < size:
+            chunk = self._socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionResetError(
+                    "The RCON server closed the connection."
+                    )
+            self._received += len(chunk)
+            data += chunk
+        return data
+
+    def _recv(self):
+        """
+        Receives a packet and returns the tuple
+        *(request_id, packet_type, body)*.
+        """
+        size, = struct.unpack("<i", self._recv_exactly(4))
+        if size < 10:
+            raise RconError("Received an invalid RCON packet.")
+
+        data = self._recv_exactly(size)
+        request_id, packet_type = struct.unpack("<ii", data[:8])
+        body = data[8:-2].decode("utf-8", errors="replace")
+        return (request_id, packet_type, body)
+
+    def command(self, cmd):
+        """
+        Sends the command *cmd* to the server and returns the response.
+
+        Long responses are split into several packets by the server. They
+        are joined again.
+
+        :raises RconStaleConnectionError:
+            if the command could not be sent or the server closed the
+            connection without answering.
+        :raises RconError:
+            if the connection broke or timed out, after the command has been
+            sent.
+        """
+        if self._socket is None:
+            self.connect()
+
+        sent = False
+        self._received = 0
+        try:
+            # Both packets are sent at once to avoid the delay of
+            # Nagle's algorithm.
+            request_id, cmd_packet = self._packet(_TYPE_COMMAND, cmd)
+            end_id, end_packet = self._packet(_TYPE_END_MARKER, str())
+            self._socket.sendall(cmd_packet + end_packet)
+            sent = True
+
+            response = list()
+            while True:
+                response_id, response_type, body = self._recv()
+                if response_id == end_id:
+                    break
+                if response_id == request_id:
+                    response.append(body)
+        except (OSError, RconError) as err:
+            self.close()
+
+            # A timeout is no evidence, that the command has not been
+            # executed, but a closed connection without any answer is.
+            if not sent or (not self._received \
+                            and isinstance(err, ConnectionError)):
+                raise RconStaleConnectionError(err)
+            raise RconError(err)
+        return "".join(response)
+
+
+class RconPool(object):
+    """
+    Keeps the idle connections to a RCON server, so that they can be
+    reused for the next command.
+
+    This class is thread safe.
+
+    .. seealso::
+
+        * :meth:`emsm.worlds.WorldWrapper.rcon`
+    """
+
+    #: The maximum number of idle connections.
+    MAX_IDLE = 4
+
+    def __init__(self, host, port, password):
+        """
+        """
+        self._host = host
+        self._port = port
+        self._password = password
+
+        self._lock = threading.Lock()
+        self._idle = list()
+        return None
+
+    def address(self):
+        """
+        Returns the tuple *(host, port, password)* of the server.
+        """
+        return (self._host, self._port, self._password)
+
+    def _acquire(self, timeout):
+        """
+        Returns an idle connection or a new one, if no connection is idle.
+        The second return value is ``True`` if the connection has been
+        reused.
+        """
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+        if client is not None:
+            client.set_timeout(timeout)
+            return (client, True)
+
+        client = RconClient(self._host, self._port, self._password, timeout)
+        client.connect()
+        return (client, False)
+
+    def _release(self, client):
+        """
+        Returns the *client* to the pool.
+        """
+        with self._lock:
+            if client.is_connected() and len(self._idle) < self.MAX_IDLE:
+                self._idle.append(client)
+                return None
+        client.close()
+        return None
+
+    def command(self, cmd, timeout=10):
+        """
+        Sends the command *cmd* to the server and returns the response.
+
+        :raises RconUnavailableError:
+            if no connection could be established. The command has
+            not been sent.
+        :raises RconError:
+            if the connection broke, after the command has been sent.
+        """
+        client, reused = self._acquire(timeout)
+        try:
+            try:
+                return client.command(cmd)
+            except RconStaleConnectionError:
+                # The server may have closed the idle connection
+                # in the meantime. The command is only sent again, if it
+                # has not reached the server.
+                if not reused:
+                    raise
+
+            log.info("reconnecting to the RCON server {}:{} ..."\
+                     .format(self._host, self._port))
+            client = RconClient(
+                self._host, self._port, self._password, timeout
+                )
+            client.connect()
+            return client.command(cmd)
+        finally:
+            self._release(client)
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, list()
+        for client in idle:
+            client.close()
+        return None
@@ -30,7 +30,6 @@
 import os
 import shlex
 import shutil
-import urllib.request
 import logging
 import subprocess
 import re
@@ -38,6 +37,10 @@ import re
 # third party
 import blinker
 
+# local
+from . import trace
+from .lib import artifacts
+
 
 # Backward compatibility
 # --------------------------------------------------
@@ -67,16 +70,129 @@ except:
 # ------------------------------------------------
 
 __all__ = ["ServerError",
+           "ServerInstallationFailure",
            "ServerUpdateFailure",
            "ServerStatusError",
            "ServerIsOnlineError",
            "ServerIsOfflineError",
            "BaseServerWrapper",
-           "ServerManager"
+           "VanillaServerWrapper",
+           "MinecraftForgeServerWrapper",
+           "BungeeCordServerWrapper",
+           "ServerManager",
+           "CATALOG"
            ]
 
 log = logging.getLogger(__file__)
 
+#: The default values of a catalog entry.
+#:
+#: ``type``
+#:      The name of the server wrapper type
+#:      (see :attr:`ServerManager.SERVER_TYPES`).
+#: ``url``
+#:      The download URL of the server executable or installer.
+#: ``checksum``
+#:      The checksum of the download (``sha1:...`` or ``sha256:...``) or
+#:      the URL of a checksum file.
+#: ``start_cmd``
+#:      The template of the start command. ``{server}`` is replaced with
+#:      the path of the server executable.
+#: ``log_path``
+#:      The path of the log file, relative to the world directory.
+#: ``log_start_re``
+#:      A regex, that matches the first log line after a server restart.
+DEFAULT_ENTRY = {
+    "type": "vanilla",
+    "url": "",
+    "checksum": "",
+    "start_cmd": "java -jar {server} nogui",
+    "log_path": "./logs/latest.log",
+    "log_start_re": r"^.*Starting minecraft server version.*"
+    }
+
+#: The built-in server catalog. The missing values of an entry are taken
+#: from :data:`DEFAULT_ENTRY`.
+#:
+#: The checksums of the vanilla servers are the SHA-1 hashes published in
+#: the version manifests of the Mojang launcher. The forge installers are
+#: verified with the *.sha1* files in the forge maven repository.
+CATALOG = {
+    "vanilla 1.2": {
+        "url": "http://s3.amazonaws.com/Minecraft.Download/versions/1.2.5/minecraft_server.1.2.5.jar",
+        "checksum": "sha1:d8321edc9470e56b8ad5c67bbd16beba25843336",
+        "log_path": "./server.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.2.*"
+        },
+    "vanilla 1.3": {
+        "url": "http://s3.amazonaws.com/Minecraft.Download/versions/1.3.2/minecraft_server.1.3.2.jar",
+        "checksum": "sha1:3de2ae6c488135596e073a9589842800c9f53bfe",
+        "log_path": "./server.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.3.*"
+        },
+    "vanilla 1.4": {
+        "url": "http://s3.amazonaws.com/Minecraft.Download/versions/1.4.7/minecraft_server.1.4.7.jar",
+        "checksum": "sha1:2f0ec8efddd2f2c674c77be9ddb370b727dec676",
+        "log_path": "./server.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.4.*"
+        },
+    "vanilla 1.5": {
+        "url": "http://s3.amazonaws.com/Minecraft.Download/versions/1.5.2/minecraft_server.1.5.2.jar",
+        "checksum": "sha1:f9ae3f651319151ce99a0bfad6b34fa16eb6775f",
+        "log_path": "./server.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.5.*"
+        },
+    "vanilla 1.6": {
+        "url": "https://s3.amazonaws.com/Minecraft.Download/versions/1.6.4/minecraft_server.1.6.4.jar",
+        "checksum": "sha1:050f93c1f3fe9e2052398f7bd6aca10c63d64a87",
+        "log_path": "./server.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.6.*"
+        },
+    "vanilla 1.7": {
+        "url": "https://s3.amazonaws.com/Minecraft.Download/versions/1.7.10/minecraft_server.1.7.10.jar",
+        "checksum": "sha1:952438ac4e01b4d115c5fc38f891710c4941df29",
+        "log_path": "./logs/latest.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.7.*"
+        },
+    "vanilla 1.8": {
+        "url": "https://s3.amazonaws.com/Minecraft.Download/versions/1.8/minecraft_server.1.8.jar",
+        "checksum": "sha1:a028f00e678ee5c6aef0e29656dca091b5df11c7",
+        "log_path": "./logs/latest.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.8.*"
+        },
+    "minecraft forge 1.6": {
+        "type": "forge",
+        "url": "http://files.minecraftforge.net/maven/net/minecraftforge/forge/1.6.4-9.11.1.916/forge-1.6.4-9.11.1.916-installer.jar",
+        "checksum": "http://files.minecraftforge.net/maven/net/minecraftforge/forge/1.6.4-9.11.1.916/forge-1.6.4-9.11.1.916-installer.jar.sha1",
+        "start_cmd": "java -jar {jar} nogui",
+        "jar_re": r"^minecraftforge-universal-1\.6.*\.jar$",
+        "log_path": "./server.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.6.*"
+        },
+    "minecraft forge 1.7": {
+        "type": "forge",
+        "url": "http://files.minecraftforge.net/maven/net/minecraftforge/forge/1.7.10-10.13.0.1180/forge-1.7.10-10.13.0.1180-installer.jar",
+        "checksum": "http://files.minecraftforge.net/maven/net/minecraftforge/forge/1.7.10-10.13.0.1180/forge-1.7.10-10.13.0.1180-installer.jar.sha1",
+        "start_cmd": "java -jar {jar} nogui",
+        "jar_re": r"^forge-1\.7.*\.jar$",
+        "log_path": "./logs/latest.log",
+        "log_start_re": r"^.*Starting minecraft server version 1\.7.*"
+        },
+
+    # Only the **latest** BungeeCord version is available. Unfortunetly, the
+    # BungeeCord server uses the git commit hash value as its version number.
+    # So it would be too many work to keep track of the versions. For the
+    # same reason, the download has no checksum and can not be fetched from
+    # a mirror.
+    "bungeecord": {
+        "type": "bungeecord",
+        "url": "http://ci.md-5.net/job/BungeeCord/lastSuccessfulBuild/artifact/bootstrap/target/BungeeCord.jar",
+        "start_cmd": "java -jar {server}",
+        "log_path": "./proxy.log.0",
+        "log_start_re": r"^.*Enabled BungeeCord version git:.*"
+        }
+    }
+
 
 # Exceptions
 # --------------------------------------------------
@@ -95,7 +211,7 @@ class ServerInstallationFailure(ServerError):
 
     def __init__(self, server, msg=None):
         self.server = server
-        self.msg = str(msg)
+        self.msg = str(msg) if msg is not None else None
         return None
 
     def __str__(self):
@@ -154,52 +270,96 @@ class BaseServerWrapper(object):
     """
     Wraps a minecraft server (executable), NOT a world.
 
-    The BaseServerWrapper is initialized using the options in the
-    :file:`server.conf` configuration file.
+    The server wrappers are created from the entries of the server catalog.
+    The *type* of an entry selects the subclass of BaseServerWrapper, that
+    is used for the server.
 
     :param emsm.application.Application app:
         The parent EMSM application
+    :param str name:
+        The unique name of the server, e.g. ``"vanilla 1.8"``
+    :param dict entry:
+        The catalog entry of the server
+
+    .. seealso::
+
+        * :data:`CATALOG`
+        * :meth:`ServerManager.catalog`
     """
 
-    @classmethod
-    def name(self):
-        """
-        **ABSTRACT**
-        
-        The unique name of the server.
+    #: Signal, that is emitted when a server has been installed.
+    server_installed = blinker.signal("server_installed")
 
-        **Example**:
+    #: Signal, that is emitted when the installation of a server failed.
+    server_install_failed = blinker.signal("server_install_failed")
 
-        ``"vanilla 1.8"``
-        """
-        raise NotImplementedError()
+    #: Maps the name of a (vanilla) server command to a regex, that matches
+    #: the console output, which signals that the command has been
+    #: processed.
+    #:
+    #: .. seealso::
+    #:
+    #:      * :meth:`command_output_re`
+    _COMMAND_OUTPUT_RE = dict()
 
-    @classmethod
-    def url(self):
-        """
-        **ABSTRACT**
-        
-        The URL where the server executable can be downloaded from.
-        """
-        raise NotImplementedError()
-    
-    def __init__(self, app):
+    def __init__(self, app, name, entry):
         """
         """
         # This class is abstract and can not be initialised.
         if type(self) is BaseServerWrapper:
             raise RuntimeError("BaseServerWrapper is an abstract class")            
             
-        log.info("initialising server '{}' ...".format(self.name()))
+        log.info("initialising server '{}' ...".format(name))
         
         self._app = app
+        self._name = name
+        self._entry = entry
 
         # The absolute path to the server executable that is
         # wrapped by this object.
         # The filename is simply *name*.
-        self._server = os.path.join(app.paths().server_dir(), self.name())
+        self._server = os.path.join(app.paths().server_dir(), name)
+
+        # The compiled *log_start_re* of the catalog entry.
+        # (Created on demand.)
+        self._log_start_re = None
         return None
 
+    def name(self):
+        """
+        The unique name of the server.
+
+        **Example**:
+
+        ``"vanilla 1.8"``
+        """
+        return self._name
+
+    def entry(self):
+        """
+        Returns a copy of the catalog entry of the server.
+        """
+        return dict(self._entry)
+
+    def url(self):
+        """
+        The URL where the server executable can be downloaded from.
+        """
+        return self._entry["url"]
+
+    def checksum(self):
+        """
+        The checksum of the file at :meth:`url` (``"sha1:<hexdigest>"`` or
+        ``"sha256:<hexdigest>"``), the URL of a checksum file or ``None``,
+        if the download can not be verified.
+
+        .. seealso::
+
+            * :func:`emsm.lib.artifacts.parse_checksum`
+            * :meth:`emsm.lib.artifacts.ArtifactCache.resolve_checksum`
+        """
+        return self._entry["checksum"] or None
+
     def server(self):
         """
         Absolute path of the server executable.
@@ -225,34 +385,87 @@ class BaseServerWrapper(object):
 
     def install(self):
         """
-        **ABSTRACT**
-
         Installs the server by downloading it to :meth:`server`. If the
-        server is already installed, nothing should happen.
+        server is already installed, nothing happens.
 
-        This method is called during the EMSM start phase if
-        :meth:`is_installed` returns ``False``.
+        This method is called by :meth:`ServerManager.install`, when a world
+        powered by this server is started or the installation is requested
+        explicitly (``server --install``).
 
         :raises ServerInstallationFailure:
             * when the installation failed.
         """
-        raise NotImplementedError()
+        if self.is_installed():
+            return None
+
+        self._install_file(self._fetch())
+        return None
+
+    def _fetch(self):
+        """
+        Returns the path of the file at :meth:`url` in the artifact cache.
+        The file is only downloaded, if it is not in the cache yet.
+
+        :raises ServerInstallationFailure:
+            if the download failed or the checksum does not match.
+
+        .. seealso::
+
+            * :meth:`ServerManager.artifacts`
+        """
+        if not self.url():
+            raise ServerInstallationFailure(
+                self, "The server catalog contains no download URL."
+                )
+
+        cache = self._app.server().artifacts()
+        try:
+            with trace.span("fetch " + self.name(), "server"):
+                return cache.fetch(self.url(), self.checksum())
+        except (OSError, ValueError, artifacts.ArtifactError) as err:
+            raise ServerInstallationFailure(self, err)
+
+    def _install_file(self, path):
+        """
+        Copies the file at *path* atomically to :meth:`server`.
+        """
+        tmp_path = self._server + ".tmp"
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, self._server)
+        except OSError as err:
+            raise ServerInstallationFailure(self, err)
+        return None
+
+    def _start_cmd_fields(self):
+        """
+        Returns the values for the fields in the *start_cmd* template. The
+        values are already quoted for the shell.
+        """
+        return {"server": shlex.quote(self._server)}
 
     def start_cmd(self):
         """
-        **ABSTRACT**
-        
         Returns the bash command string, that must be executed, to start the
         server.
 
-        If there are paths in the returned command, they must be absolute.
+        The command is created from the *start_cmd* template of the catalog
+        entry. ``{server}`` is replaced with the absolute path of
+        :meth:`server`.
+
+        :raises ServerError:
+            if the template contains an unknown field.
         """
-        raise NotImplementedError()
+        try:
+            return self._entry["start_cmd"].format(**self._start_cmd_fields())
+        except (KeyError, IndexError, ValueError) as err:
+            raise ServerError(
+                "Invalid start_cmd of the server '{}': {}"\
+                .format(self._name, err)
+                )
 
     def translate_command(self, cmd):
         """
-        **ABSTRACT**
-        
         Translates the vanilla server command *cmd* to a command with the same
         meaning, but which can be understood by the server.
 
@@ -266,190 +479,113 @@ class BaseServerWrapper(object):
             >>> bungeecord.translate_command("say Hello World!")
             "alert Hello World!"
         """
-        return NotImplementedError()
+        return cmd
 
-    def log_path(cls, self):
+    def command_output_re(self, cmd):
+        """
+        Returns a regex, that matches the console output of the server,
+        which signals that the vanilla server command *cmd* has been
+        processed, or ``None`` if the output of the command is unknown.
+
+        Subclasses can override the matchers in :attr:`_COMMAND_OUTPUT_RE`.
+
+        **Example:**
+
+        .. code-block:: python
+
+            >>> vanilla.command_output_re("save-all")
+            re.compile('Saved the (world|game)|Save complete')
+
+        .. seealso::
+
+            * :meth:`emsm.worlds.WorldWrapper.send_command_get_output`
+        """
+        name = cmd.strip().split(" ", 1)[0]
+        return self._COMMAND_OUTPUT_RE.get(name)
+
+    def log_path(self):
         """
-        **ABSTRACT**
-        
         Returns the path of the server log file of a world.
 
         If a relative path is returned, the base path is the world
         directory.
         """
-        raise NotImplementedError()
+        return self._entry["log_path"]
 
     def log_start_re(self):
         """
-        **ABSTRACT**
-        
         Returns a regex, that matches the first line in the log file,
         after a server restart.
         """
-        raise NotImplementedError()
+        if self._log_start_re is None:
+            self._log_start_re = re.compile(self._entry["log_start_re"])
+        return self._log_start_re
     
 
 # Vanilla
 # '''''''
 
-class VanillaBase(BaseServerWrapper):
-    """
-    Base class for all vanilla server versions.
+class VanillaServerWrapper(BaseServerWrapper):
     """
+    Wraps a vanilla server or any other server, which understands the
+    vanilla commands and is installed by downloading a single jar file.
 
-    def start_cmd(self):
-        return "java -jar {} nogui.".format(shlex.quote(self._server))
-
-    def translate_command(self, cmd):
-        return cmd
-
-    def install(self):
-        """
-        """
-        if self.is_installed():
-            return None
-        
-        # Simply download the minecraft jar from mojang and copy the .jar in
-        # the EMSM_ROOT/server directory.
-        try:
-            tmp_path, http_resp = urllib.request.urlretrieve(self.url())
-        except Exception as err:
-            raise ServerInstallationFailure(self, err)
-        else:
-            shutil.move(tmp_path, self.server())
-        return None
-    
-    
-class Vanilla_1_2(VanillaBase):
-
-    @classmethod
-    def name(self):
-        return "vanilla 1.2"
-
-    @classmethod
-    def url(self):
-        return "http://s3.amazonaws.com/Minecraft.Download/versions/1.2.5/minecraft_server.1.2.5.jar"
-    
-    def log_path(self):
-        return "./server.log"
-
-    def log_start_re(self):
-        return re.compile("^.*Starting minecraft server version 1\.2.*")
-
-
-class Vanilla_1_3(VanillaBase):
-
-    @classmethod
-    def name(self):
-        return "vanilla 1.3"
-
-    @classmethod
-    def url(self):
-        return "http://s3.amazonaws.com/Minecraft.Download/versions/1.3.2/minecraft_server.1.3.2.jar"
-    
-    def log_path(self):
-        return "./server.log"
-
-    def log_start_re(self):
-        return re.compile("^.*Starting minecraft server version 1\.3.*")
-
-
-class Vanilla_1_4(VanillaBase):
-
-    @classmethod
-    def name(self):
-        return "vanilla 1.4"
-
-    @classmethod
-    def url(self):
-        return "http://s3.amazonaws.com/Minecraft.Download/versions/1.4.7/minecraft_server.1.4.7.jar"
-    
-    def log_path(self):
-        return "./server.log"
-
-    def log_start_re(self):
-        return re.compile("^.*Starting minecraft server version 1\.4.*")
-
-
-class Vanilla_1_5(VanillaBase):
-    
-    @classmethod
-    def name(self):
-        return "vanilla 1.5"
-
-    @classmethod
-    def url(self):
-        return "http://s3.amazonaws.com/Minecraft.Download/versions/1.5.2/minecraft_server.1.5.2.jar"
-    
-    def log_path(self):
-        return "./server.log"
-
-    def log_start_re(self):
-        return re.compile("^.*Starting minecraft server version 1\.5.*")
-
-
-class Vanilla_1_6(VanillaBase):
-    
-    @classmethod
-    def name(self):
-        return "vanilla 1.6"
-
-    @classmethod
-    def url(self):
-        return "https://s3.amazonaws.com/Minecraft.Download/versions/1.6.4/minecraft_server.1.6.4.jar"
-    
-    def log_path(self):
-        return "./server.log"
-
-    def log_start_re(self):
-        return re.compile("^.*Starting minecraft server version 1\.6.*")
-
-
-class Vanilla_1_7(VanillaBase):
-    
-    @classmethod
-    def name(self):
-        return "vanilla 1.7"
-
-    @classmethod
-    def url(self):
-        return "https://s3.amazonaws.com/Minecraft.Download/versions/1.7.10/minecraft_server.1.7.10.jar"
-    
-    def log_path(self):
-        return "./logs/latest.log"
+    This is the wrapper for the catalog entries with the type *vanilla*.
+    """
 
-    def log_start_re(self):
-        return re.compile("^.*Starting minecraft server version 1\.7.*")
+    _COMMAND_OUTPUT_RE = {
+        "save-all": re.compile("Saved the (world|game)|Save complete"),
+        "save-off": re.compile("Turned off world auto-saving"\
+                               "|Disabling level saving"\
+                               "|Automatic saving is now disabled"),
+        "save-on": re.compile("Turned on world auto-saving"\
+                              "|Enabling level saving"\
+                              "|Automatic saving is now enabled"),
+        "list": re.compile(r"There are \d+|Connected players")
+        }
 
 
-class Vanilla_1_8(VanillaBase):
-    
-    @classmethod
-    def name(self):
-        return "vanilla 1.8"
+# MinecraftForge
+# ''''''''''''''
 
-    @classmethod
-    def url(self):
-        return "https://s3.amazonaws.com/Minecraft.Download/versions/1.8/minecraft_server.1.8.jar"
-    
-    def log_path(self):
-        return "./logs/latest.log"
+class MinecraftForgeServerWrapper(VanillaServerWrapper):
+    """
+    Wraps a minecraft forge server. :meth:`server` is a directory, which
+    is created by running the downloaded forge installer.
 
-    def log_start_re(self):
-        return re.compile("^.*Starting minecraft server version 1\.8.*")
+    This is the wrapper for the catalog entries with the type *forge*. The
+    *jar_re* of the entry matches the name of the server jar in the
+    directory. It is available as ``{jar}`` field in the *start_cmd*
+    template.
+    """
 
+    def __init__(self, app, name, entry):
+        """
+        """
+        VanillaServerWrapper.__init__(self, app, name, entry)
 
-# MinecraftForger
-# '''''''''''''''
+        # The compiled *jar_re* of the catalog entry.
+        # (Created on demand.)
+        self._jar_re = None
+        return None
 
+    def _start_cmd_fields(self):
+        """
+        """
+        if self._jar_re is None:
+            self._jar_re = re.compile(self._entry["jar_re"])
 
-class MinecraftForgeBase(BaseServerWrapper):
-    """
-    Base class for the minecraft forge server.
-    """
+        filenames = [filename \
+                     for filename in sorted(os.listdir(self._server)) \
+                     if self._jar_re.match(filename)]
+        if not filenames:
+            raise ServerError(
+                "No server jar found for the server '{}'.".format(self._name)
+                )
 
-    def translate_command(self, cmd):
-        return cmd
+        fields = VanillaServerWrapper._start_cmd_fields(self)
+        fields["jar"] = shlex.quote(os.path.join(self._server, filenames[0]))
+        return fields
 
     def install(self):
         """
@@ -457,136 +593,74 @@ class MinecraftForgeBase(BaseServerWrapper):
         if self.is_installed():
             return None
         
+        # We need to download the *installer* first.
+        installer = self._fetch()
+
+        # The result of the installer is stored next to the installer in the
+        # artifact cache, so that the installer runs only once.
+        archive = installer + ".installed.tar"
         try:
-            # We need to download the *installer* first.
-            try:
-                tmp_path, http_resp = urllib.request.urlretrieve(self.url())
-            except Exception as err:
-                raise ServerInstallationFailure(err)
+            if os.path.exists(self.server()):
+                shutil.rmtree(self.server())            
+            os.makedirs(self.server())
+
+            if os.path.isfile(archive):
+                shutil.unpack_archive(archive, self.server(), "tar")
             else:
-                
-                # Now, we have to run the installer.
-                if os.path.exists(self.server()):
-                    shutil.rmtree(self.server())            
-                os.makedirs(self.server())
-                
-                os.chdir(self.server())
-                if not os.path.samefile(self.server(), os.curdir):
-                    msg = "Could not chdir to {}".format(self.server())
-                    raise ServerInstallationFailure(self, msg)
-
-                sys_install_cmd = "java -jar {} --installServer"\
-                                      .format(tmp_path)
-                sys_install_cmd = shlex.split(sys_install_cmd)
-                try:
-                    p = subprocess.Popen(
-                        sys_install_cmd,
-                        stdout = subprocess.PIPE,
-                        stderr = subprocess.PIPE
-                        )
-
-                    # Store the output of the installer in the logfiles.
-                    out, err = p.communicate()
-                    out = out.decode()
-                    err = err.decode()
-                    log.info(out)
-
-                    # Check, if the installer exited with return code 0 and
-                    # throw an exception if not.
-                    if p.returncode:
-                        msg = "Installer returned with '{}'."\
-                              .format(p.returncode)
-                        raise ServerInstallationFailure(self, msg)
-                except Exception as err:
-                    raise ServerInstallationFailure(self, err)
-        except:
+                self._run_installer(installer)
+
+                tmp_path = shutil.make_archive(
+                    installer + ".tmp", "tar", self.server()
+                    )
+                os.replace(tmp_path, archive)
+        except Exception as err:
             # Try to undo the installation.
             if os.path.exists(self.server()):
                 shutil.rmtree(self.server())
+            if isinstance(err, ServerInstallationFailure):
+                raise
+            raise ServerInstallationFailure(self, err)
         return None
 
+    def _run_installer(self, installer):
+        """
+        Runs the forge *installer* in the :meth:`server` directory.
 
-class MinecraftForge_1_6(MinecraftForgeBase, Vanilla_1_6):
-
-    @classmethod
-    def name(self):
-        return "minecraft forge 1.6"
-
-    @classmethod
-    def url(self):
-        return "http://files.minecraftforge.net/minecraftforge/minecraftforge-installer-1.6.4-9.11.1.916.jar"
-
-    def start_cmd(self):
-        filenames = [filename \
-                     for filename in os.listdir(self.server()) \
-                     if re.match("^minecraftforge-universal-1\.6.*.jar$", filename)]
-        filename = filenames[0]
-        
-        start_cmd =  "java -jar {} nogui."\
-                    .format(shlex.quote(os.path.join(self._server, filename)))
-        return start_cmd
-    
-            
-class MinecraftForge_1_7(MinecraftForgeBase, Vanilla_1_7):
-
-    @classmethod
-    def name(self):
-        return "minecraft forge 1.7"
+        :raises ServerInstallationFailure:
+            if the installer exited with a non-zero return code.
+        """
+        sys_install_cmd = ["java", "-jar", installer, "--installServer"]
+        with trace.span("forge installer", "server"):
+            p = subprocess.Popen(
+                sys_install_cmd,
+                cwd = self.server(),
+                stdout = subprocess.PIPE,
+                stderr = subprocess.PIPE
+                )
+
+            # Store the output of the installer in the logfiles.
+            out, err = p.communicate()
+        log.info(out.decode(errors="replace"))
+
+        # Check, if the installer exited with return code 0 and
+        # throw an exception if not.
+        if p.returncode:
+            log.error(err.decode(errors="replace"))
+            msg = "Installer returned with '{}'.".format(p.returncode)
+            raise ServerInstallationFailure(self, msg)
+        return None
 
-    @classmethod
-    def url(self):
-        return "http://files.minecraftforge.net/maven/net/minecraftforge/forge/1.7.10-10.13.0.1180/forge-1.7.10-10.13.0.1180-installer.jar"
-    
-    def start_cmd(self):
-        filenames = [filename \
-                     for filename in os.listdir(self.server()) \
-                     if re.match("^forge-1\.7.*.jar$", filename)]
-        filename = filenames[0]
-        
-        start_cmd =  "java -jar {} nogui."\
-                    .format(shlex.quote(os.path.join(self._server, filename)))
-        return start_cmd
-    
 
 # Bungeecord
 # ''''''''''
 
 class BungeeCordServerWrapper(BaseServerWrapper):
     """
-    Wraps only the **latest** BungeeCord version.
+    Wraps a BungeeCord proxy.
 
-    Unfortunetly, the BungeeCord server uses the git commit hash value
-    as its version number. So it would be too many work to keep track of the
-    versions.
+    This is the wrapper for the catalog entries with the type *bungeecord*.
     """
 
-    @classmethod
-    def name(self):
-        return "bungeecord"
-
-    @classmethod
-    def url(self):
-        return "http://ci.md-5.net/job/BungeeCord/lastSuccessfulBuild/artifact/bootstrap/target/BungeeCord.jar"
-
-    def install(self):
-        """
-        """
-        if self.is_installed():
-            return None
-        
-        # Simply download the latest build and save it in the EMSM_ROOT/server
-        # directory.
-        try:
-            tmp_path, http_resp = urllib.request.urlretrieve(self.url())
-        except Exception as err:
-            raise ServerInstallationFailure(err)
-        else:
-            shutil.move(tmp_path, self.server())
-        return None
-        
-    def start_cmd(self):
-        return "java -jar {}".format(shlex.quote(self._server))
-    
     def translate_command(self, cmd):
         cmd = cmd.strip()
         if cmd.startswith("say "):
@@ -595,19 +669,6 @@ class BungeeCordServerWrapper(BaseServerWrapper):
             cmd = "end"
         return cmd
 
-    def log_path(self):
-        return "./proxy.log.0"
-
-    def log_start_re(self):
-        return re.compile("^.*Enabled BungeeCord version git:.*")
-
-
-# MC-Server
-# '''''''''
-
-class MCServer(BaseServerWrapper):
-    pass
-
 
 # Server DB
 # ------------------------------------------------
@@ -617,48 +678,101 @@ class ServerManager(object):
     Manages all server wrappers, owned by an EMSM application.
 
     The ServerManager helps to avoid double instances of the same server
-    wrapper.
+    wrapper. The wrappers are created from the server catalog, when they are
+    first needed.
+
+    The built-in :data:`CATALOG` is extended by the sections of the
+    :file:`server.conf` configuration file. A section either adds a new
+    server or overrides some values of a built-in server:
+
+    .. code-block:: ini
+
+        [spigot 1.8]
+        url = file:///srv/mirror/spigot-1.8.jar
+        checksum = sha1:...
+        start_cmd = java -Xmx2G -jar {server} nogui
+
+    .. seealso::
+
+        * :class:`emsm.conf.ServerConfiguration`
     """
 
+    #: Maps the *type* of a catalog entry to the server wrapper class.
+    SERVER_TYPES = {
+        "vanilla": VanillaServerWrapper,
+        "forge": MinecraftForgeServerWrapper,
+        "bungeecord": BungeeCordServerWrapper
+        }
+
     def __init__(self, app):
         """
         """
         self._app = app
+
+        # Maps *server.name()* to the catalog entry of the server.
+        # (Loaded on demand.)
+        self._catalog = None
         
         # Maps *server.name()* to *server*
+        # (Created on demand.)
         self._server = dict()
-        self._load()
+
+        # The ArtifactCache for the downloads.
+        # (Created on demand.)
+        self._artifacts = None
         return None
 
-    def _load(self):
+    def catalog(self):
         """
-        Loads all subclasses of BaseServerWrapper in ``self._server_cls``.
+        Returns the server catalog, which maps the name of each server to its
+        entry. The catalog is loaded, when it is first needed.
         """
-        for cls in globals().values():
-            if type(cls).__name__ != "type"\
-               or not issubclass(cls, BaseServerWrapper):
-                continue
+        if self._catalog is None:
+            self._catalog = self._load_catalog()
+        return self._catalog
 
-            try:
-                name = cls.name()
-            except NotImplementedError as err:
-                pass
-            else:
-                self._server[name] = cls(self._app)
-        return None
+    def _load_catalog(self):
+        """
+        Merges the built-in :data:`CATALOG` and the sections of the
+        :file:`server.conf`.
+        """
+        catalog = dict()
+        for name, entry in CATALOG.items():
+            catalog[name] = dict(DEFAULT_ENTRY)
+            catalog[name].update(entry)
+
+        # The values are read raw, so that the regular expressions can
+        # contain a *$*.
+        conf = self._app.conf().server()
+        for name in conf.sections():
+            entry = catalog.setdefault(name, dict(DEFAULT_ENTRY))
+            entry.update(conf.items(name, raw=True))
+
+        for name, entry in list(catalog.items()):
+            if entry["type"] not in self.SERVER_TYPES:
+                log.error("the server '{}' has the unknown type '{}'."\
+                          .format(name, entry["type"]))
+                del catalog[name]
+        return catalog
 
     def get(self, servername):
         """
         Returns the :class:`ServerWrapper` with the name *servername* and
         ``None``, if there is not such a server.
         """
-        return self._server.get(servername)
+        server = self._server.get(servername)
+        if server is None and servername in self.catalog():
+            entry = self.catalog()[servername]
+            server_type = self.SERVER_TYPES[entry["type"]]
+            server = server_type(self._app, servername, entry)
+            self._server[servername] = server
+        return server
 
     def get_all(self):
         """
-        Returns a list with all loaded :class:`ServerWrapper`.
+        Returns a list with all :class:`ServerWrapper`.
         """
-        return list(self._server.values())
+        return [self.get(name) for name in self.catalog()]
 
     def get_by_pred(self, pred=None):
         """
@@ -669,7 +783,7 @@ class ServerManager(object):
             >>> filter(pred, ServerManager.get_all())
             ...
         """
-        return list(filter(pred, self._server.values()))
+        return list(filter(pred, self.get_all()))
 
     def get_selected(self):
         """
@@ -681,12 +795,94 @@ class ServerManager(object):
         all_server = args.all_server
         
         if all_server:
-            return list(self._server.values())
+            return self.get_all()
         else:
-            return [self._server[server] for server in selected_server]
+            return [self.get(server) for server in selected_server]
 
     def get_names(self):
         """
         Returns a list with the names of all server.
         """
-        return list(self._server.keys())
+        return list(self.catalog().keys())
+
+    def artifacts(self):
+        """
+        Returns the :class:`~emsm.lib.artifacts.ArtifactCache`, which
+        stores the downloaded server executables and installers in
+        :file:`server/.artifacts`.
+
+        The downloads are fetched from the ``download_mirror`` in the
+        ``[emsm]`` section of the :file:`main.conf`, if it is set. Only
+        server with a ``checksum`` in their catalog entry can be fetched
+        from the mirror.
+        """
+        if self._artifacts is None:
+            directory = os.path.join(
+                self._app.paths().server_dir(), ".artifacts"
+                )
+            mirror = self._app.conf().main()["emsm"].get("download_mirror")
+            self._artifacts = artifacts.ArtifactCache(directory, mirror)
+        return self._artifacts
+
+    def install(self, server):
+        """
+        Installs the *server*, if it is not installed yet. Returns ``True``
+        if the server has been installed now.
+
+        **Signals:**
+
+            * :attr:`BaseServerWrapper.server_installed`
+            * :attr:`BaseServerWrapper.server_install_failed`
+
+        :raises ServerInstallationFailure:
+            if the installation failed.
+        """
+        if server.is_installed():
+            return False
+
+        log.info("installing the server '{}' ...".format(server.name()))
+        try:
+            with trace.span("install " + server.name(), "server"):
+                server.install()
+        except ServerInstallationFailure as err:
+            log.error(err)
+            BaseServerWrapper.server_install_failed.send(server)
+            raise
+
+        log.info("installed the server '{}'.".format(server.name()))
+        BaseServerWrapper.server_installed.send(server)
+        return True
+
+    def install_all(self, servers, max_workers=4):
+        """
+        Installs all *servers*, which are not installed yet. The downloads
+        are fetched concurrently, before the servers are installed one after
+        another.
+
+        Returns a dictionary, which maps each server to the return value of
+        :meth:`install` or to the :exc:`ServerInstallationFailure`.
+
+        .. seealso::
+
+            * :meth:`emsm.lib.artifacts.ArtifactCache.fetch_all`
+        """
+        pending = [server for server in servers if not server.is_installed()]
+        downloads = [(server.url(), server.checksum()) for server in pending]
+        with trace.span("fetch all", "server"):
+            fetched = self.artifacts().fetch_all(downloads, max_workers)
+
+        results = dict()
+        for server in servers:
+            err = fetched.get(server.url()) if server in pending else None
+            if isinstance(err, Exception):
+                err = ServerInstallationFailure(server, err)
+                log.error(err)
+                BaseServerWrapper.server_install_failed.send(server)
+                results[server] = err
+                continue
+
+            try:
+                results[server] = self.install(server)
+            except ServerInstallationFailure as err:
+                results[server] = err
+        return results
@@ -0,0 +1,497 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+A small process supervisor, that can be used instead of GNU screen to run
+a minecraft server in the background.
+
+The supervisor runs the server in a pseudo terminal and owns its
+stdin and stdout. It listens on a unix control socket, which is named like
+a screen socket (*pid.session_name*), so that the sessions can be found
+by listing the socket directory.
+
+This module is executed as a script and must therefore only depend on the
+Python standard library:
+
+.. code-block:: bash
+
+    $ python3 supervisor.py SOCKET_DIR SESSION_NAME COMMAND [ARGS ...]
+
+The script returns as soon as the server has been started and the control
+socket is available.
+
+Each connection to the control socket starts with a request line:
+
+``SEND``
+    All following data is written to the stdin of the server.
+``STREAM``
+    Like *SEND*, but the client also receives the output of the server
+    from now on.
+``ATTACH``
+    Like *STREAM*, but the client receives the recent output of the server
+    first.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import sys
+import time
+import pty
+import tty
+import termios
+import signal
+import socket
+import select
+import errno
+import collections
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "SEND",
+    "STREAM",
+    "ATTACH",
+    "Supervisor"
+    ]
+
+#: The request verbs of the control socket protocol.
+SEND = b"SEND"
+STREAM = b"STREAM"
+ATTACH = b"ATTACH"
+
+#: The number of bytes of the recent server output, that is sent to clients
+#: which *ATTACH* to the session.
+BACKLOG_SIZE = 64*1024
+
+#: The maximum number of bytes, which are buffered for a client. Clients,
+#: which do not read their data fast enough, are disconnected, so that
+#: they can not block the server.
+MAX_CLIENT_BUFFER = 1024*1024
+
+#: The maximum number of bytes, which are buffered for the stdin of the
+#: supervised process. If the process does not read its input, the data of
+#: the clients is discarded and the clients are disconnected, so that they
+#: can not block the supervisor.
+MAX_INPUT_BUFFER = 1024*1024
+
+#: The time in seconds, the supervisor waits for the supervised process to
+#: exit after SIGTERM, before it is killed.
+TERMINATE_TIMEOUT = 10
+
+
+# Classes
+# ------------------------------------------------
+
+class Supervisor(object):
+    """
+    Runs the command *args* in a pseudo terminal and serves the control socket
+    at *socket_path*.
+    """
+
+    def __init__(self, socket_path, args):
+        """
+        """
+        self._socket_path = socket_path
+        self._args = args
+
+        # The pid of the supervised process and the master end of its
+        # pseudo terminal.
+        self._pid = None
+        self._master_fd = None
+
+        # The listening control socket.
+        self._socket = None
+
+        # Maps the client socket to its state:
+        # None (request not read yet), SEND, STREAM or ATTACH
+        self._clients = dict()
+
+        # Maps the client socket to the already received, incomplete request
+        # line.
+        self._requests = dict()
+
+        # Maps the client socket to the data, which has not been sent yet.
+        # The client sockets are non-blocking.
+        self._buffers = dict()
+
+        # The data, which has not been written to the stdin of the process
+        # yet. The master end of the pseudo terminal is non-blocking.
+        self._input = bytearray()
+
+        # The recent output of the server.
+        self._backlog = collections.deque()
+        self._backlog_size = 0
+        return None
+
+    def spawn(self):
+        """
+        Starts the supervised process and opens the control socket.
+        """
+        pid, master_fd = pty.fork()
+        if pid == 0:
+            # The child must never return into the caller's code.
+            try:
+                _raw_terminal(pty.STDIN_FILENO)
+                os.execvp(self._args[0], self._args)
+            finally:
+                os._exit(127)
+
+        # The attributes are set by both ends, so that neither the first
+        # output of the server nor the first input of a client races with
+        # the child.
+        _raw_terminal(master_fd)
+        self._pid = pid
+        self._master_fd = master_fd
+        os.set_blocking(master_fd, False)
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(self._socket_path)
+        os.chmod(self._socket_path, 0o600)
+        self._socket.listen(16)
+        return None
+
+    def terminate(self, signum=None, frame=None):
+        """
+        Forwards SIGTERM to the supervised process, waits up to
+        :data:`TERMINATE_TIMEOUT` seconds until it exited (it is killed
+        otherwise), removes the control socket and exits.
+        """
+        try:
+            os.kill(self._pid, signal.SIGTERM)
+        except OSError:
+            pass
+        else:
+            if not self._wait(TERMINATE_TIMEOUT):
+                try:
+                    os.kill(self._pid, signal.SIGKILL)
+                except OSError:
+                    pass
+                self._wait(None)
+        self._cleanup()
+        os._exit(0)
+        return None
+
+    def _wait(self, timeout):
+        """
+        Reaps the supervised process. Returns ``False``, if the process did
+        not exit within *timeout* seconds. If *timeout* is ``None``, this
+        method blocks until the process exited.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                pid, status = os.waitpid(
+                    self._pid, 0 if deadline is None else os.WNOHANG
+                    )
+            except ChildProcessError:
+                return True
+            except InterruptedError:
+                continue
+            if pid:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _cleanup(self):
+        """
+        Removes the control socket.
+        """
+        try:
+            os.remove(self._socket_path)
+        except OSError:
+            pass
+        return None
+
+    def _drop_client(self, client):
+        """
+        Closes the connection to the *client*.
+        """
+        self._clients.pop(client, None)
+        self._requests.pop(client, None)
+        self._buffers.pop(client, None)
+        client.close()
+        return None
+
+    def _send(self, client, data):
+        """
+        Queues *data* for the *client* and sends as much as possible without
+        blocking. The *client* is disconnected, if its buffer exceeds
+        :data:`MAX_CLIENT_BUFFER`.
+        """
+        buf = self._buffers.setdefault(client, bytearray())
+        buf += data
+        if len(buf) > MAX_CLIENT_BUFFER:
+            self._drop_client(client)
+            return None
+        self._flush(client)
+        return None
+
+    def _flush(self, client):
+        """
+        Sends the buffered data to the *client*, until the socket would
+        block.
+        """
+        buf = self._buffers.get(client)
+        while buf:
+            try:
+                n = client.send(buf)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self._drop_client(client)
+                break
+            del buf[:n]
+        return None
+
+    def _write_input(self, client, data):
+        """
+        Queues *data* for the stdin of the supervised process and writes as
+        much as possible without blocking. The *client*, which sent the
+        *data*, is disconnected, if the input buffer would exceed
+        :data:`MAX_INPUT_BUFFER`.
+        """
+        if len(self._input) + len(data) > MAX_INPUT_BUFFER:
+            self._drop_client(client)
+            return None
+        self._input += data
+        self._flush_input()
+        return None
+
+    def _flush_input(self):
+        """
+        Writes the buffered input to the stdin of the supervised process,
+        until the pseudo terminal would block.
+        """
+        while self._input:
+            try:
+                n = os.write(self._master_fd, self._input)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # The slave end has been closed, the process is about to
+                # exit.
+                self._input.clear()
+                break
+            del self._input[:n]
+        return None
+
+    def _handle_output(self, data):
+        """
+        Stores *data* in the backlog and forwards it to all streaming clients.
+        """
+        self._backlog.append(data)
+        self._backlog_size += len(data)
+        while self._backlog_size > BACKLOG_SIZE and len(self._backlog) > 1:
+            self._backlog_size -= len(self._backlog.popleft())
+
+        for client, state in list(self._clients.items()):
+            if state in (STREAM, ATTACH):
+                self._send(client, data)
+        return None
+
+    def _handle_client(self, client):
+        """
+        Reads data from the *client*.
+        """
+        try:
+            data = client.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return None
+        except OSError:
+            data = b""
+        if not data:
+            self._drop_client(client)
+            return None
+
+        # The first line of the connection contains the request.
+        if self._clients[client] is None:
+            data = self._requests.get(client, b"") + data
+            request, sep, data = data.partition(b"\n")
+            if not sep:
+                self._requests[client] = request
+                return None
+
+            request = request.strip()
+            if request not in (SEND, STREAM, ATTACH):
+                self._drop_client(client)
+                return None
+
+            self._requests.pop(client, None)
+            self._clients[client] = request
+            if request == ATTACH:
+                self._send(client, b"".join(self._backlog))
+                if client not in self._clients:
+                    return None
+
+        if data:
+            self._write_input(client, data)
+        return None
+
+    def serve(self):
+        """
+        Serves the control socket until the supervised process exited.
+        """
+        while True:
+            rlist = [self._master_fd, self._socket] + list(self._clients)
+            wlist = [client for client, buf in self._buffers.items() if buf]
+            if self._input:
+                wlist.append(self._master_fd)
+            try:
+                rlist, wlist, xlist = select.select(rlist, wlist, [])
+            except InterruptedError:
+                continue
+
+            for fd in wlist:
+                if fd == self._master_fd:
+                    self._flush_input()
+                elif fd in self._clients:
+                    self._flush(fd)
+
+            for fd in rlist:
+                if fd is self._socket:
+                    client, addr = self._socket.accept()
+                    client.setblocking(False)
+                    self._clients[client] = None
+
+                elif fd == self._master_fd:
+                    # Linux raises EIO when the slave end has been closed.
+                    try:
+                        data = os.read(self._master_fd, 4096)
+                    except (BlockingIOError, InterruptedError):
+                        continue
+                    except OSError as err:
+                        if err.errno != errno.EIO:
+                            raise
+                        data = b""
+                    if not data:
+                        return None
+                    self._handle_output(data)
+
+                elif fd in self._clients:
+                    self._handle_client(fd)
+        return None
+
+    def run(self):
+        """
+        Serves the control socket and cleans up, when the supervised process
+        exited.
+        """
+        try:
+            self.serve()
+        finally:
+            self._cleanup()
+            for client in list(self._clients):
+                self._drop_client(client)
+            try:
+                os.waitpid(self._pid, 0)
+            except OSError:
+                pass
+        return None
+
+
+# Functions
+# ------------------------------------------------
+
+def _raw_terminal(fd):
+    """
+    Disables the echo and the output processing of the terminal *fd*, so
+    that the input and the output of the server are passed through
+    unchanged.
+    """
+    attrs = termios.tcgetattr(fd)
+    attrs[tty.LFLAG] &= ~termios.ECHO
+    attrs[tty.OFLAG] &= ~termios.OPOST
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    return None
+
+
+def daemonize(socket_dir, session_name, args):
+    """
+    Runs the supervisor in a new session in the background and returns the
+    exit code for the calling process, as soon as the control socket is
+    available.
+    """
+    ready_r, ready_w = os.pipe()
+
+    if os.fork():
+        # Wait until the supervisor is ready.
+        os.close(ready_w)
+        with os.fdopen(ready_r, "rb") as ready:
+            msg = ready.read()
+        if msg != b"ok":
+            print(msg.decode(errors="replace"), file=sys.stderr)
+            return 1
+        return 0
+
+    os.close(ready_r)
+    os.setsid()
+    try:
+        socket_path = os.path.join(
+            socket_dir, "{}.{}".format(os.getpid(), session_name)
+            )
+        supervisor = Supervisor(socket_path, args)
+        supervisor.spawn()
+        signal.signal(signal.SIGTERM, supervisor.terminate)
+        signal.signal(signal.SIGHUP, supervisor.terminate)
+    except Exception as err:
+        os.write(ready_w, str(err).encode())
+        os._exit(1)
+
+    # Detach from the calling process.
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+    os.write(ready_w, b"ok")
+    os.close(ready_w)
+
+    try:
+        supervisor.run()
+    finally:
+        os._exit(0)
+    return 0
+
+
+def main():
+    """
+    The command line interface of the supervisor.
+    """
+    if len(sys.argv) < 4:
+        print("usage: {} SOCKET_DIR SESSION_NAME COMMAND [ARGS ...]"\
+              .format(sys.argv[0]), file=sys.stderr)
+        return 2
+    return daemonize(sys.argv[1], sys.argv[2], sys.argv[3:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
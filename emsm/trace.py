@@ -0,0 +1,300 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+This module implements a lightweight tracing layer, which records *spans*
+(a name with a start and an end time) of the EMSM hot paths: the methods of
+the :class:`~emsm.worlds.WorldWrapper`, the ``screen`` invocations, the
+phases of a backup and the plugin runs.
+
+The trace can be exported in the Chrome trace event format and viewed with
+``chrome://tracing`` or `Perfetto <https://ui.perfetto.dev>`_. The
+application starts the tracer, when the global ``--trace FILE`` argument is
+given.
+
+Tracing is disabled by default. A disabled :func:`span` returns a shared
+no-op context manager and a :func:`traced` function only checks a global,
+so the overhead is close to zero.
+
+**Example:**
+
+.. code-block:: python
+
+    >>> trace.start()
+    >>> with trace.span("stop_delay", delay=5):
+    ...     time.sleep(5)
+    >>> trace.stop().write("emsm.trace.json")
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import json
+import time
+import functools
+import threading
+
+
+# Data
+# ------------------------------------------------
+
+__all__ = [
+    "Span",
+    "Tracer",
+    "start",
+    "stop",
+    "enabled",
+    "span",
+    "instant",
+    "traced"
+    ]
+
+#: The active :class:`Tracer` or ``None``, if tracing is disabled.
+_tracer = None
+
+
+# Classes
+# ------------------------------------------------
+
+class _NullSpan(object):
+    """
+    The span, which is used when tracing is disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set(self, key, value):
+        return None
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span(object):
+    """
+    Records the time between entering and leaving the context as complete
+    event of the *tracer*. The *args* are shown in the trace viewer.
+    """
+
+    def __init__(self, tracer, name, category, args):
+        """
+        """
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = None
+        return None
+
+    def set(self, key, value):
+        """
+        Adds the argument *key* with the *value* to the span.
+        """
+        self._args[key] = value
+        return None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self._args["error"] = exc_type.__name__
+        self._tracer.add_complete(
+            self._name, self._category, self._start, end, self._args
+            )
+        return False
+
+
+class Tracer(object):
+    """
+    Collects the trace events of the current process.
+    """
+
+    def __init__(self):
+        """
+        """
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+
+        # list.append() is atomic, so no lock is needed for the events of
+        # the worker threads.
+        self._events = list()
+        return None
+
+    def _timestamp(self, t):
+        """
+        Converts the :func:`time.perf_counter` value *t* to microseconds
+        since the tracer has been created.
+        """
+        return (t - self._origin)*1e6
+
+    def add_complete(self, name, category, start, end, args=None):
+        """
+        Adds a complete event (a span) from *start* to *end*.
+        """
+        self._events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self._timestamp(start),
+            "dur": (end - start)*1e6,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args or dict()
+            })
+        return None
+
+    def add_instant(self, name, category, args=None):
+        """
+        Adds an instant event at the current time.
+        """
+        self._events.append({
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": self._timestamp(time.perf_counter()),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args or dict()
+            })
+        return None
+
+    def events(self):
+        """
+        Returns a list with the recorded events.
+        """
+        return list(self._events)
+
+    def write(self, path):
+        """
+        Writes the events to the file at *path* in the Chrome trace event
+        format.
+        """
+        events = self.events()
+
+        # Name the threads, so that the viewer shows the main thread first.
+        main_thread = threading.main_thread().ident
+        for tid in sorted(set(event["tid"] for event in events)):
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": tid,
+                "args": {
+                    "name": "main" if tid == main_thread else str(tid)
+                    }
+                })
+
+        with open(path, "w") as file:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"}, file,
+                default=str
+                )
+        return None
+
+
+# Functions
+# ------------------------------------------------
+
+def start():
+    """
+    Enables tracing and returns the new :class:`Tracer`.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop():
+    """
+    Disables tracing and returns the :class:`Tracer`, which has been active,
+    or ``None``.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def enabled():
+    """
+    Returns ``True`` if tracing is enabled.
+    """
+    return _tracer is not None
+
+
+def span(name, category="emsm", **args):
+    """
+    Returns a context manager, which records the span *name*, if tracing
+    is enabled.
+
+    .. code-block:: python
+
+        >>> with trace.span("screen", "subprocess", cmd=sys_cmd):
+        ...     subprocess.call(sys_cmd)
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, category, args)
+
+
+def instant(name, category="emsm", **args):
+    """
+    Records the instant event *name*, if tracing is enabled.
+    """
+    if _tracer is not None:
+        _tracer.add_instant(name, category, args)
+    return None
+
+
+def traced(name=None, category="emsm"):
+    """
+    Decorator, which records a span for each call of the decorated
+    function. The *name* defaults to the qualified name of the function.
+
+    .. code-block:: python
+
+        >>> @trace.traced()
+        ... def pids(self):
+        ...     pass
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, span_name, category, dict()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
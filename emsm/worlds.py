@@ -34,16 +34,30 @@ import sys
 import subprocess
 import shlex
 import signal
+import stat
+import pwd
 import collections
 import re
 import random
 import socket
 import logging
 import io
+import select
+import codecs
 
 # third party
 import blinker
 
+# local
+from . import ping
+from . import rcon
+from . import supervisor
+from . import trace
+from .server import ServerInstallationFailure
+from .lib import logtail
+from .lib import logindex
+from .lib import procfs
+
 
 # Backward compatibility
 # ------------------------------------------------
@@ -90,6 +104,9 @@ __all__ = [
     "WorldStartFailed",
     "WorldStopFailed",
     "WorldCommandTimeout",
+    "ProcessBackend",
+    "ScreenBackend",
+    "SupervisorBackend",
     "WorldWrapper",
     "WorldManager"
     ]
@@ -197,6 +214,421 @@ class WorldCommandTimeout(WorldError):
 # Classes
 # ------------------------------------------------
 
+# Process backends
+# ''''''''''''''''
+
+def _scan_socket_dir(path):
+    """
+    Lists the sockets in the directory *path*, which are named like
+    screen sockets (*pid.session_name*), and checks if their processes are
+    still alive using the :file:`/proc` filesystem.
+
+    Returns a dictionary, that maps the session name to the pids of the
+    sessions with that name, or ``None``, if the directory or :file:`/proc`
+    are not accessible.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+
+    try:
+        entries = os.listdir(path)
+    except OSError:
+        return None
+
+    sessions = collections.defaultdict(list)
+    for entry in entries:
+        pid, sep, session_name = entry.partition(".")
+        if not (sep and pid.isdigit()):
+            continue
+
+        # Ignore dead sessions, whichs socket has not been removed.
+        if not os.path.exists("/proc/{}".format(pid)):
+            continue
+
+        # screen uses named pipes instead of sockets on some systems.
+        try:
+            mode = os.stat(os.path.join(path, entry)).st_mode
+        except OSError:
+            continue
+        if not (stat.S_ISSOCK(mode) or stat.S_ISFIFO(mode)):
+            continue
+
+        sessions[session_name].append(int(pid))
+    return dict(sessions)
+
+
+class ProcessBackend(object):
+    """
+    **ABSTRACT**
+
+    Runs the server of a world in the background and gives access to its
+    console.
+
+    Each server runs in a *session* with the name
+    :meth:`WorldWrapper.screen_name`. A session is identified by the pid of
+    the process that owns the console of the server.
+
+    The backend of a world is selected with the *backend* option in the
+    :file:`worlds.conf` configuration file.
+
+    .. warning::
+
+        Do not change the backend of a world, while it is online.
+    """
+
+    #: Printed, when the user opens the console of a world.
+    DETACH_HINT = str()
+
+    @classmethod
+    def name(cls):
+        """
+        **ABSTRACT**
+
+        The unique name of the backend, which is used in the configuration.
+        """
+        raise NotImplementedError()
+
+    def __init__(self, app):
+        """
+        """
+        self._app = app
+        return None
+
+    def read_sessions(self):
+        """
+        **ABSTRACT**
+
+        Returns a dictionary, that maps the name of each running session to
+        the list of the pids of the sessions with that name.
+
+        .. seealso::
+
+            * :meth:`WorldManager.sessions`
+        """
+        raise NotImplementedError()
+
+    def start(self, world):
+        """
+        **ABSTRACT**
+
+        Starts the server of the *world* in a new session. The current working
+        directory is the world's :meth:`~WorldWrapper.directory`.
+        """
+        raise NotImplementedError()
+
+    def send_command(self, world, pid, server_cmd):
+        """
+        **ABSTRACT**
+
+        Writes the (already translated) command *server_cmd* to the console
+        of the session *pid*.
+        """
+        raise NotImplementedError()
+
+    def open_console(self, world, pid):
+        """
+        **ABSTRACT**
+
+        Attaches the terminal of the user to the console of the session *pid*.
+        """
+        raise NotImplementedError()
+
+    def open_stream(self, world, pid):
+        """
+        Returns a socket, that receives the console output of the session
+        *pid* from now on, or ``None``, if the backend does not support this.
+        """
+        return None
+
+
+class ScreenBackend(ProcessBackend):
+    """
+    Runs the servers in GNU screen sessions. This is the default backend.
+    """
+
+    DETACH_HINT = "NOTE: Press [ctrl + a + d] to detach from the console."
+
+    @classmethod
+    def name(cls):
+        return "screen"
+
+    def _screen_dir(self):
+        """
+        Returns the directory, that contains the screen sockets of the
+        current user, or ``None`` if this directory can not be found.
+
+        .. hint::
+
+            The directory does not exist yet, when screen has not been used
+            by the current user before. It may also be located somewhere
+            else, depending on how screen has been compiled. In both cases,
+            ``None`` is returned.
+        """
+        if os.environ.get("SCREENDIR"):
+            screen_dirs = [os.environ["SCREENDIR"]]
+        else:
+            username = pwd.getpwuid(os.geteuid()).pw_name
+            screen_dirs = [
+                os.path.join(base_dir, "S-{}".format(username)) \
+                for base_dir in ("/run/screen", "/var/run/screen")
+                ]
+
+        for screen_dir in screen_dirs:
+            if os.path.isdir(screen_dir):
+                return screen_dir
+        return None
+
+    def read_sessions(self):
+        """
+        The sessions are read from the screen socket directory if possible.
+        If the directory can not be found or is not accessible, the output
+        of ``screen -ls`` is parsed.
+        """
+        screen_dir = self._screen_dir()
+        if screen_dir is not None:
+            sessions = _scan_socket_dir(screen_dir)
+            if sessions is not None:
+                return sessions
+        
+        # XXX: screen -ls seems to exit always with the exit code 1.
+        #   so it's convenient to use gestatusoutput.
+        with trace.span("screen -ls", "subprocess"):
+            status, output = subprocess.getstatusoutput("screen -ls")
+
+        # Example output (without the '>' char):
+        #
+        # > foo@bar:~$ screen -ls
+        # > There is a screen on:
+        # >        20405.minecraft_barz    (07/08/13 14:42:15)     (Detached)
+        # > 1 Socket in /var/run/screen/S-foo.
+        re_session = re.compile(r"^\s*(\d+)\.(\S+)", re.MULTILINE)
+
+        sessions = collections.defaultdict(list)
+        for pid, screen_name in re.findall(re_session, output):
+            sessions[screen_name].append(int(pid))
+        return dict(sessions)
+
+    def start(self, world):
+        """
+        """
+        global _SCREEN
+        
+        sys_cmd = "{screen} -dmS {screen_name} {start_cmd}".format(
+            screen = _SCREEN,
+            screen_name = world.screen_name(),
+            start_cmd = world.server().start_cmd()
+            )
+        sys_cmd = shlex.split(sys_cmd)
+        with trace.span("screen", "subprocess", cmd=sys_cmd):
+            subprocess.call(sys_cmd)
+        return None
+
+    def send_command(self, world, pid, server_cmd):
+        """
+        """
+        # Quote the command.
+        # The '\n' simulates pressing the ENTER key in a screen session.
+        server_cmd += "\n\n"
+        server_cmd = shlex.quote(server_cmd)
+
+        sys_cmd = "screen -S {0}.{1} -p 0 -X stuff {2}"\
+                  .format(pid, world.screen_name(), server_cmd)
+        sys_cmd = shlex.split(sys_cmd)
+        with trace.span("screen", "subprocess", cmd=sys_cmd):
+            subprocess.call(sys_cmd)
+        return None
+
+    def open_console(self, world, pid):
+        """
+        """
+        sys_cmd = "screen -x {pid}".format(pid=pid)
+        sys_cmd = shlex.split(sys_cmd)
+
+        try:
+            with trace.span("screen", "subprocess", cmd=sys_cmd):
+                subprocess.check_call(sys_cmd)
+        except subprocess.CalledProcessError as error:
+            # It's probably not the terminal of the user,
+            # so try this one.
+            sys_cmd = "script -c {} /dev/null"\
+                      .format(shlex.quote(sys_cmd))
+            subprocess.check_call(
+                shlex.split(sys_cmd),
+                stdin = sys.stdin,
+                stdout = sys.stdout,
+                stderr = sys.stderr
+                )
+        return None
+
+
+class SupervisorBackend(ProcessBackend):
+    """
+    Runs the servers with the EMSM :mod:`emsm.supervisor`, which owns the
+    stdin and stdout of the server and serves a unix control socket in the
+    :meth:`~emsm.paths.Pathsystem.run_dir`.
+
+    Sending a command is a simple socket write and the console output
+    can be streamed.
+    """
+
+    DETACH_HINT = "NOTE: Press [ctrl + d] to detach from the console."
+
+    @classmethod
+    def name(cls):
+        return "supervisor"
+
+    def _socket_path(self, world, pid):
+        """
+        Returns the path of the control socket of the session *pid*.
+        """
+        return os.path.join(
+            self._app.paths().run_dir(),
+            "{}.{}".format(pid, world.screen_name())
+            )
+
+    def _connect(self, world, pid, request):
+        """
+        Connects to the control socket of the session *pid* and sends the
+        *request* line.
+
+        .. seealso::
+
+            * :mod:`emsm.supervisor`
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._socket_path(world, pid))
+            sock.sendall(request + b"\n")
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def read_sessions(self):
+        """
+        """
+        sessions = _scan_socket_dir(self._app.paths().run_dir())
+        if sessions is None:
+            return dict()
+        return sessions
+
+    def start(self, world):
+        """
+        """
+        sys_cmd = [sys.executable, supervisor.__file__,
+                   self._app.paths().run_dir(), world.screen_name()]
+        sys_cmd.extend(shlex.split(world.server().start_cmd()))
+        with trace.span("supervisor", "subprocess", cmd=sys_cmd):
+            subprocess.call(sys_cmd)
+        return None
+
+    def send_command(self, world, pid, server_cmd):
+        """
+        """
+        server_cmd += "\n"
+        sock = self._connect(world, pid, supervisor.SEND)
+        try:
+            sock.sendall(server_cmd.encode())
+        finally:
+            sock.close()
+        return None
+
+    def open_console(self, world, pid):
+        """
+        """
+        sock = self._connect(world, pid, supervisor.ATTACH)
+        stdin = sys.stdin.fileno()
+        try:
+            while True:
+                rlist, wlist, xlist = select.select([sock, stdin], [], [])
+                if sock in rlist:
+                    data = sock.recv(4096)
+                    # The server has been stopped.
+                    if not data:
+                        break
+                    sys.stdout.buffer.write(data)
+                    sys.stdout.buffer.flush()
+                if stdin in rlist:
+                    data = os.read(stdin, 4096)
+                    # Detach on EOF (ctrl + d).
+                    if not data:
+                        break
+                    sock.sendall(data)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sock.close()
+        return None
+
+    def open_stream(self, world, pid):
+        """
+        """
+        return self._connect(world, pid, supervisor.STREAM)
+
+
+# World
+# '''''
+
+class _ConsoleStream(object):
+    """
+    Reads the console output from the socket *stream*, which has been opened
+    with :meth:`ProcessBackend.open_stream`.
+
+    This class has the same interface as :class:`~emsm.lib.logtail.LogTail`,
+    so that both can be used by :meth:`WorldWrapper.send_command_get_output`.
+    """
+
+    def __init__(self, stream):
+        """
+        """
+        self._stream = stream
+        self._stream.setblocking(False)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return None
+
+    def wait(self, timeout=None):
+        """
+        Blocks until output is available or *timeout* seconds passed.
+        """
+        try:
+            rlist, wlist, xlist = select.select([self._stream], [], [], timeout)
+        except InterruptedError:
+            return False
+        return bool(rlist)
+
+    def read(self):
+        """
+        Returns the available output or ``None``, if the stream has been
+        closed by the server.
+        """
+        data = bytes()
+        while True:
+            try:
+                chunk = self._stream.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not chunk:
+                if not data:
+                    return None
+                break
+            data += chunk
+        return self._decoder.decode(data)
+
+    def close(self):
+        """
+        Closes the stream.
+        """
+        self._stream.close()
+        return None
+
+
 class WorldWrapper(object):
     """
     Provides methods to handle a minecraft world like
@@ -231,6 +663,12 @@ class WorldWrapper(object):
 
     #: Signal, that is emitted when a world could not be stopped.
     world_stop_failed = blinker.signal("world_stop_failed")
+
+    #: Signal, that is emitted when a world answered a command sent with
+    #: :meth:`send_command_get_output`. The keyword arguments *command*,
+    #: *transport* (``"rcon"`` or ``"console"``) and *duration* (seconds)
+    #: describe the command.
+    world_command_done = blinker.signal("world_command_done")
     
         
     def __init__(self, app, name):
@@ -248,12 +686,22 @@ class WorldWrapper(object):
         self._check_conf()
 
         # The ServerWrapper for the server that powers this world.
-        self._server = app.server().get(self._conf["server"])
-        if not self._server.is_installed():
-            self._server.install()
+        # (Created on demand. The server is installed, when the world is
+        # started.)
+        self._server = None
+
+        # The ProcessBackend that runs the server.
+        self._backend = app.worlds().get_backend(self._conf["backend"])
 
         # The directory that contains the world data.
         self._directory = app.paths().world_dir(name)
+
+        # The pool of RCON connections to the server.
+        self._rcon = None
+
+        # The index of the server start lines in the log file.
+        # (Created on demand.)
+        self._log_index = None
         return None
 
     def _check_conf(self):
@@ -280,6 +728,11 @@ class WorldWrapper(object):
         if not self._conf["server"] in self._app.server().get_names():
             raise ValueError("{} - conf:server does not exist"\
                              .format(self._name))
+
+        # backend
+        if not self._conf["backend"] in self._app.worlds().get_backend_names():
+            raise ValueError("{} - conf:backend does not exist"\
+                             .format(self._name))
         return None
 
     def worldpath_to_ospath(self, rel_path):
@@ -317,9 +770,22 @@ class WorldWrapper(object):
         """
         The :class:`~emsm.server.ServerWrapper` for the server that runs
         this world.
+
+        .. note::
+
+            The server may not be installed yet. It is installed by
+            :meth:`start`.
         """
+        if self._server is None:
+            self._server = self._app.server().get(self._conf["server"])
         return self._server
 
+    def backend(self):
+        """
+        The :class:`ProcessBackend` that runs the server of this world.
+        """
+        return self._backend
+
     def set_server(self, server):
         """
         Changes the server that runs this world. The world has to be offline.
@@ -334,7 +800,7 @@ class WorldWrapper(object):
             raise WorldIsOnlineError(self)
 
         # Break, if we have nothin to do.
-        if server is self._server:
+        if server is self.server():
             return None
 
         self._server = server
@@ -358,6 +824,9 @@ class WorldWrapper(object):
         """
         Returns the name of the screen sessions that run the server of this
         world.
+
+        This is also the session name used by the other
+        :class:`ProcessBackend` implementations.
         """
         return WorldWrapper._SCREEN_PREFIX + self._name
 
@@ -372,71 +841,286 @@ class WorldWrapper(object):
         """
         return self._directory
 
+    def server_properties(self):
+        """
+        Returns a dictionary with the options in the world's
+        :file:`server.properties` file. If the file does not exist, an empty
+        dictionary is returned.
+        """
+        path = os.path.join(self._directory, "server.properties")
+
+        properties = dict()
+        try:
+            with open(path) as file:
+                for line in file:
+                    line = line.strip()
+                    if not line or line[0] in "#!":
+                        continue
+
+                    key, sep, value = line.partition("=")
+                    properties[key.strip()] = value.strip()
+        except (FileNotFoundError, IOError):
+            pass
+        return properties
+
+    def set_server_property(self, key, value):
+        """
+        Sets the option *key* in the world's :file:`server.properties` to
+        *value*. The other lines of the file are preserved. The minecraft
+        server only reads the file when it starts.
+
+        .. seealso::
+
+            * :meth:`server_properties`
+        """
+        path = os.path.join(self._directory, "server.properties")
+        try:
+            with open(path) as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            lines = list()
+
+        line = "{}={}\n".format(key, value)
+        for i, old_line in enumerate(lines):
+            stripped = old_line.strip()
+            if stripped and stripped[0] not in "#!" \
+               and stripped.partition("=")[0].strip() == key:
+                lines[i] = line
+                break
+        else:
+            if lines and not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+            lines.append(line)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.writelines(lines)
+        os.replace(tmp_path, path)
+        return None
+
+    def address(self):
+        """
+        Returns the network address *(host, port)* of the minecraft server
+        (*server-ip* and *server-port* in the :file:`server.properties`).
+        If no ip address is set, the server is reached on localhost.
+
+        .. seealso::
+
+            * :meth:`server_properties`
+        """
+        properties = self.server_properties()
+        host = properties.get("server-ip") or "127.0.0.1"
+        port = properties.get("server-port", "")
+        port = int(port) if port.isdecimal() else 25565
+        return (host, port)
+
+    @trace.traced()
+    def ping(self, timeout=3):
+        """
+        Sends a *Server List Ping* to the minecraft server and returns the
+        :class:`~emsm.ping.PingResponse`, which contains the latency and the
+        number of online players.
+
+        :raises emsm.ping.PingUnavailableError:
+            if the server is not reachable.
+        :raises emsm.ping.PingError:
+            if the server did not answer correctly.
+
+        .. seealso::
+
+            * :meth:`address`
+            * :func:`emsm.ping.ping`
+        """
+        host, port = self.address()
+        return ping.ping(host, port, timeout)
+
+    def rcon(self):
+        """
+        Returns the :class:`~emsm.rcon.RconPool` for the RCON server of this
+        world or ``None``, if RCON is not enabled in the
+        :file:`server.properties` (*enable-rcon*, *rcon.port* and
+        *rcon.password*).
+
+        .. seealso::
+
+            * :meth:`server_properties`
+            * :meth:`send_command_get_output`
+        """
+        properties = self.server_properties()
+        if properties.get("enable-rcon") != "true" \
+           or not properties.get("rcon.port", "").isdecimal() \
+           or not properties.get("rcon.password"):
+            self._close_rcon()
+            return None
+
+        host = properties.get("server-ip") or "127.0.0.1"
+        port = int(properties["rcon.port"])
+        password = properties["rcon.password"]
+
+        # Create a new pool, if the RCON configuration changed.
+        if self._rcon is None \
+           or self._rcon.address() != (host, port, password):
+            self._close_rcon()
+            self._rcon = rcon.RconPool(host, port, password)
+        return self._rcon
+
+    def _close_rcon(self):
+        """
+        Closes the connections to the RCON server.
+        """
+        if self._rcon is not None:
+            self._rcon.close()
+            self._rcon = None
+        return None
+
+    def log_path(self):
+        """
+        Returns the absolute path of the current server log file of the world.
+
+        .. seealso::
+
+            * :meth:`emsm.server.BaseServerWrapper.log_path`
+        """
+        return os.path.abspath(
+            os.path.join(self._directory, self.server().log_path())
+            )
+
+    def log_index(self):
+        """
+        Returns the updated index of the server start lines in the logfile.
+
+        The index is stored in the :meth:`~emsm.paths.Pathsystem.world_data_dir`
+        and updated incrementally, so that only the bytes appended since the
+        last call are read.
+
+        .. seealso::
+
+            * :class:`emsm.lib.logindex.LogIndex`
+            * :meth:`emsm.server.BaseServerWrapper.log_start_re`
+        """
+        log_path = self.log_path()
+        start_re = self.server().log_start_re()
+        if self._log_index is None \
+           or self._log_index.path() != log_path:
+            index_path = os.path.join(
+                self._app.paths().world_data_dir(self._name),
+                "{}.index".format(os.path.basename(log_path))
+                )
+            self._log_index = logindex.LogIndex(log_path, start_re, index_path)
+        self._log_index.update()
+        return self._log_index
+
+    def latest_log_offset(self):
+        """
+        Returns the byte offset of the last server start line in the
+        logfile. If there is no such line, ``0`` is returned.
+
+        .. seealso::
+
+            * :meth:`log_index`
+        """
+        return self.log_index().last_start()
+
+    def iter_latest_log(self, reverse=False):
+        """
+        Yields the lines of the log since the last start without reading the
+        whole log into memory. If *reverse* is true, the lines are yielded
+        in reverse order, starting with the last line.
+
+        .. seealso::
+
+            * :meth:`latest_log`
+            * :meth:`log_index`
+        """
+        index = self.log_index()
+        iter_lines = logtail.iter_lines_reverse if reverse \
+                     else logtail.iter_lines
+        try:
+            log = open(self.log_path(), "rb")
+        except (FileNotFoundError, IOError):
+            return None
+
+        with log:
+            for line in iter_lines(log, index.last_start(), index.size()):
+                yield line.decode(errors="replace")
+        return None
+
+    @trace.traced()
     def latest_log(self):
         """
         Returns the log of the world since the last start. If the
         logfile does not exist, an empty string will be returned.
-        """
-        # Matches all lines in the log, that signalize the start of
-        # a server.
-        re_start_line = self._server.log_start_re()
-        log_path = os.path.abspath(
-            os.path.join(self._directory, self._server.log_path())
-            )
 
+        .. seealso::
+
+            * :meth:`latest_log_offset`
+        """
         try:
-            last_log = io.StringIO()
-            with open(log_path) as log:
-                for line in log:
-                    if re.match(re_start_line, line):
-                        last_log = io.StringIO()
-                    last_log.write(line)
-            last_log = last_log.getvalue()
+            with open(self.log_path(), "rb") as log:
+                log.seek(self.latest_log_offset())
+                last_log = log.read().decode(errors="replace")
         except (FileNotFoundError, IOError) as err:
             last_log = str()
         return last_log
         
-    def pids(self):
+    @trace.traced()
+    def pids(self, cache=True):
         """
         Returns a list with the pids of the screen sessions with the name
         :meth:`screen_name`.
-        """
-        # Get sessions
-        # XXX: screen -ls seems to exit always with the exit code 1.
-        #   so it's convenient to use gestatusoutput.
-        status, output = subprocess.getstatusoutput("screen -ls")
 
-        # Example output (without the '>' char):
-        #
-        # > foo@bar:~$ screen -ls
-        # > There is a screen on:
-        # >        20405.minecraft_barz    (07/08/13 14:42:15)     (Detached)
-        # > 1 Socket in /var/run/screen/S-foo.
-        
-        # Filter the PIDs
-        re_pid = re.compile(
-            "^\s*(\d+?).{screen_name}".format(screen_name=self.screen_name()),
-            re.MULTILINE
+        :param bool cache:
+            If ``True``, the pids are looked up in the session table
+            snapshot of the :class:`WorldManager`. Otherwise, the session
+            table is reloaded first.
+
+        .. seealso::
+
+            * :meth:`WorldManager.sessions`
+        """
+        sessions = self._app.worlds().sessions(
+            cache=cache, backend=self._backend.name()
             )
-        pids = re.findall(re_pid, output)
-        pids = [int(pid) for pid in pids]
-        return pids
+        return list(sessions.get(self.screen_name(), ()))
     
-    def is_online(self):
+    @trace.traced()
+    def resource_usage(self, interval=0.5):
+        """
+        Returns the :class:`~emsm.lib.procfs.ResourceUsage` of the server
+        process or ``None``, if the world is offline.
+
+        .. seealso::
+
+            * :meth:`WorldManager.resource_usage`
+        """
+        usage = self._app.worlds().resource_usage([self], interval)
+        return usage[self.name()]
+
+    @trace.traced()
+    def is_online(self, cache=True):
         """
         Returns ``True`` if the world is currently running.
+
+        .. seealso::
+
+            * :meth:`pids`
         """
-        return bool(self.pids())
+        return bool(self.pids(cache=cache))
 
-    def is_offline(self):
+    def is_offline(self, cache=True):
         """
         Returns ``True`` if the world is currently **not** running.
+
+        .. seealso::
+
+            * :meth:`pids`
         """
-        return not self.is_online()
+        return not self.is_online(cache=cache)
 
+    @trace.traced()
     def send_command(self, server_cmd):
         """
-        Sends the given command to all screen sessions with the world's screen
+        Sends the given command to all sessions with the world's screen
         name.
 
         :raises WorldIsOfflineError:
@@ -453,69 +1137,133 @@ class WorldWrapper(object):
             raise WorldIsOfflineError(self)
 
         # Translate the server command for *cross-server* support.
-        server_cmd = self._server.translate_command(server_cmd)
-
-        # Quote the command.
-        # The '\n' simulates pressing the ENTER key in a screen session.
-        server_cmd += "\n\n"
-        server_cmd = shlex.quote(server_cmd)
+        server_cmd = self.server().translate_command(server_cmd)
 
         # Send the command to the server.
         for pid in pids:
-            sys_cmd = "screen -S {0}.{1} -p 0 -X stuff {2}"\
-                      .format(pid, self.screen_name(), server_cmd)
-            sys_cmd = shlex.split(sys_cmd)
-            subprocess.call(sys_cmd)
+            self._backend.send_command(self, pid, server_cmd)
         return None
     
+    @trace.traced()
     def send_command_get_output(self, server_cmd, timeout=10,
-                                poll_intervall=0.2):
+                                poll_intervall=0.2, output_re=None):
         """
-        Like :meth:`send_commmand` but checks every *poll_intervall*
-        seconds, if content has been added to the logfile and returns the
-        change. If no change could be detected after *timeout* seconds,
-        an error will be raised.
+        Like :meth:`send_commmand` but waits until content has been added to
+        the logfile and returns the change. If no change could be detected
+        after *timeout* seconds, an error will be raised.
+
+        If a completion matcher *output_re* is given or the server defines one
+        for the command (:meth:`~emsm.server.BaseServerWrapper.command_output_re`),
+        the output is collected until the matcher matches it. This makes sure,
+        that the server really processed the command and that an unrelated
+        log line is not mistaken for the reply.
+
+        The logfile is followed with a :class:`~emsm.lib.logtail.LogTail`,
+        which wakes up on inotify events. Only if inotify is not available,
+        the logfile is checked every *poll_intervall* seconds.
+
+        If RCON is enabled, the command is sent through a pooled RCON
+        connection and the exact response of the server is returned. If the
+        response does not satisfy the completion matcher, the output is
+        read from the console, but the command is not sent again.
+
+        If the :meth:`backend` can stream the console output, the output is
+        read from the stream instead of the logfile.
+
+        **Signals:**
+
+            * :attr:`world_command_done`
 
         :raises WorldIsOfflineError:
             if the world is offline.
         :raises WorldCommandTimeout:
             if the world did not react within *timeout* seconds.
         """
-        log_path = os.path.abspath(
-            os.path.join(self._directory, self._server.log_path())
-            )
-        
-        # Save the current size of the logfile to detect changes.
-        try:
-            with open(log_path) as log:
-                log.seek(0, 2)
-                offset = log.tell()
-        except (FileNotFoundError, IOError):
-            offset = 0
+        pids = self.pids()
 
-        # Send the command.
-        self.send_command(server_cmd)
+        # Break if the world is offline.
+        if not pids:
+            raise WorldIsOfflineError(self)
 
-        # Parse the logfile for a change.
-        start_time = time.time()
-        output = str()
-        while (not output) and time.time() - start_time < timeout:
-            time.sleep(poll_intervall)
+        if output_re is None:
+            output_re = self.server().command_output_re(server_cmd)
+
+        # The output is only read from the console, if RCON is not available
+        # or its reply does not satisfy the completion matcher. The reader is
+        # opened before the command is sent, so that no output is missed.
+        rcon_pool = self.rcon()
+        reader = None
+        if rcon_pool is None or output_re is not None:
+            stream = self._backend.open_stream(self, pids[0])
+            if stream is not None:
+                reader = _ConsoleStream(stream)
+            else:
+                reader = logtail.LogTail(
+                    self.log_path(), poll_intervall=poll_intervall
+                    )
 
-            try:
-                with open(log_path) as log:
-                    log.seek(offset, 0)
-                    output = log.read()
-            except (FileNotFoundError, IOError):
-                break
-        
-        if not output:
-            raise WorldCommandTimeout(self)
-        return output
+        try:
+            start_time = time.time()
+            transport = "console"
+            if rcon_pool is not None:
+                try:
+                    output = rcon_pool.command(
+                        self.server().translate_command(server_cmd), timeout
+                        )
+                except rcon.RconUnavailableError as err:
+                    log.warning("RCON of the world '{}' is not available: {}"\
+                                .format(self._name, err))
+                except rcon.RconError as err:
+                    raise WorldCommandTimeout(self)
+                else:
+                    transport = "rcon"
+                    if output_re is None or re.search(output_re, output):
+                        WorldWrapper.world_command_done.send(
+                            self, command=server_cmd, transport=transport,
+                            duration=time.time() - start_time
+                            )
+                        return output
+
+                    # The command has already been sent, so we only wait
+                    # for the reply on the console.
+                    log.debug("the RCON reply of '{}' does not match the "\
+                              "completion matcher.".format(self._name))
+
+            if transport == "console":
+                self.send_command(server_cmd)
+
+            output = str()
+            while True:
+                # Break if the server reacted on the command.
+                if output and (output_re is None \
+                               or re.search(output_re, output)):
+                    WorldWrapper.world_command_done.send(
+                        self, command=server_cmd, transport=transport,
+                        duration=time.time() - start_time
+                        )
+                    return output
+                
+                remaining = timeout - (time.time() - start_time)
+                if remaining <= 0:
+                    break
+                
+                reader.wait(remaining)
+                data = reader.read()
+
+                # The server has been stopped.
+                if data is None:
+                    break
+                output += data
+        finally:
+            if reader is not None:
+                reader.close()
+
+        raise WorldCommandTimeout(self)
 
+    @trace.traced()
     def open_console(self):
         """
-        Opens **all** screen sessions whichs pid is in :meth:`pids`.
+        Opens **all** sessions whichs pid is in :meth:`pids`.
 
         :raises WorldIsOfflineError:
             if the world is offline.
@@ -526,24 +1274,9 @@ class WorldWrapper(object):
         if not pids:
             raise WorldIsOfflineError(self)
 
-        # Open all world screen sessions (one for each found pid).
+        # Open all world sessions (one for each found pid).
         for pid in pids:
-            sys_cmd = "screen -x {pid}".format(pid=pid)
-            sys_cmd = shlex.split(sys_cmd)
-
-            try:
-                subprocess.check_call(sys_cmd)
-            except subprocess.CalledProcessError as error:
-                # It's probably not the terminal of the user,
-                # so try this one.
-                sys_cmd = "script -c {} /dev/null"\
-                          .format(shlex.quote(sys_cmd))
-                subprocess.check_call(
-                    shlex.split(sys_cmd),
-                    stdin = sys.stdin,
-                    stdout = sys.stdout,
-                    stderr = sys.stderr
-                    )
+            self._backend.open_console(self, pid)
         return None
 
 
@@ -561,6 +1294,7 @@ class WorldWrapper(object):
         return os.path.exists(self._directory) \
                and os.path.isdir(self._directory)
         
+    @trace.traced()
     def install(self):
         """
         Creates the directory of the world.
@@ -576,6 +1310,7 @@ class WorldWrapper(object):
             pass
         return None
 
+    @trace.traced()
     def uninstall(self):
         """
         Stops the world and removes the world directory.
@@ -605,11 +1340,14 @@ class WorldWrapper(object):
         return None
 
     
+    @trace.traced()
     def start(self):
         """
         Starts the world if the world is offline. If the world is already
         online, nothing happens.
 
+        If the :meth:`server` is not installed yet, it is installed first.
+
         **Signals:**
         
             * :attr:`world_about_to_start`
@@ -617,14 +1355,23 @@ class WorldWrapper(object):
             * :attr:`world_start_failed`
             
         :raises WorldStartFailed:
-            if the world could not be started.
-        """
-        global _SCREEN
+            if the world could not be started or the server could not be
+            installed.
 
+        .. seealso::
+
+            * :meth:`emsm.server.ServerManager.install`
+        """
         # Break if the world is already online.
         if self.is_online():
             return None
 
+        try:
+            self._app.server().install(self.server())
+        except ServerInstallationFailure as err:
+            WorldWrapper.world_start_failed.send(self)
+            raise WorldStartFailed(self) from err
+
         WorldWrapper.world_about_to_start.send(self)
 
         # We need to change the current working directory to the world's
@@ -633,13 +1380,7 @@ class WorldWrapper(object):
         os.chdir(self.directory())
         try:
             if os.path.samefile(os.getcwd(), self.directory()):
-                sys_cmd = "{screen} -dmS {screen_name} {start_cmd}".format(
-                    screen = _SCREEN,
-                    screen_name = self.screen_name(),
-                    start_cmd = self._server.start_cmd()
-                    )
-                sys_cmd = shlex.split(sys_cmd)
-                subprocess.call(sys_cmd)
+                self._backend.start(self)
         finally:
             # We may have not the rights to change back.
             try:
@@ -648,7 +1389,7 @@ class WorldWrapper(object):
                 pass
 
         # Check if the world is really online.
-        if not self.is_online():
+        if not self.is_online(cache=False):
             WorldWrapper.world_start_failed.send(self)
             raise WorldStartFailed(self)
         
@@ -656,6 +1397,7 @@ class WorldWrapper(object):
         return None
 
     
+    @trace.traced()
     def kill_processes(self):
         """
         Kills all processes with a pid in :meth:`pids`.
@@ -683,15 +1425,24 @@ class WorldWrapper(object):
         for pid in pids:
             os.kill(pid, signal.SIGTERM)
 
+        # The EMSM supervisor waits until the server exited.
+        start_time = time.time()
+        with trace.span("wait_offline"):
+            while self.is_online(cache=False) and time.time() - start_time \
+                  < supervisor.TERMINATE_TIMEOUT + 1:
+                time.sleep(0.25)
+
         # Check if the world is now offline.
-        if self.is_online():
+        if self.is_online(cache=False):
             WorldWrapper.world_stop_failed.send(self)
             raise WorldStopFailed(self)
 
+        self._close_rcon()
         WorldWrapper.world_stopped.send(self)
         return None
     
 
+    @trace.traced()
     def stop(self, force_stop=False, message=None, delay=None,
              timeout=None):
         """
@@ -745,26 +1496,31 @@ class WorldWrapper(object):
         # Save the world and wait delay seconds to make sure the
         # world is saved and the stop_message can be read.
         self.send_command("save-all")
-        time.sleep(delay)
+        with trace.span("stop_delay", delay=delay):
+            time.sleep(delay)
 
         # Stop the world.
         self.send_command("stop")
         start_time = time.time()
-        while self.is_online() and time.time() - start_time < timeout:
-            time.sleep(0.25)
+        with trace.span("wait_offline", timeout=timeout):
+            while self.is_online(cache=False) \
+                  and time.time() - start_time < timeout:
+                time.sleep(0.25)
 
         # Force the stop if necessairy.
         if force_stop:
             self.kill_processes()
 
         # Check if the world is offline.
-        if self.is_online():
+        if self.is_online(cache=False):
             WorldWrapper.world_stop_failed.send(self)
             raise WorldStopFailed(self)
 
+        self._close_rcon()
         WorldWrapper.world_stopped.send(self)
         return None
 
+    @trace.traced()
     def restart(self, force_restart=False, stop_args=None):
         """
         Restarts the server.
@@ -805,8 +1561,16 @@ class WorldWrapper(object):
 class WorldManager(object):
     """
     Works as a container for the :class:`WorldWrapper` instances.
+
+    The WorldManager also owns the :class:`ProcessBackend` instances and a
+    snapshot of the session table of each backend, so that the status of all
+    worlds can be queried without running ``screen -ls`` once per world.
     """
 
+    #: Time in seconds, after which the session table snapshot is
+    #: considered to be outdated.
+    SESSIONS_TTL = 1.0
+
     def __init__(self, app):
         self._app = app
 
@@ -814,7 +1578,27 @@ class WorldManager(object):
         # world.name() => world
         self._worlds = dict()
 
+        # Maps the name of the backend to the backend.
+        # backend.name() => backend
+        self._backends = dict()
+        for backend_type in (ScreenBackend, SupervisorBackend):
+            self._backends[backend_type.name()] = backend_type(app)
+
+        # The snapshot of the session table of each backend and the time,
+        # when it has been created.
+        # backend.name() => (time, {screen_name => [pid, ...]})
+        self._sessions = dict()
+
         WorldWrapper.world_uninstalled.connect(self._remove)
+
+        # The session table changes, when a world is started or stopped.
+        WorldWrapper.world_uninstalled.connect(self._invalidate_sessions)
+        WorldWrapper.world_about_to_start.connect(self._invalidate_sessions)
+        WorldWrapper.world_started.connect(self._invalidate_sessions)
+        WorldWrapper.world_start_failed.connect(self._invalidate_sessions)
+        WorldWrapper.world_about_to_stop.connect(self._invalidate_sessions)
+        WorldWrapper.world_stopped.connect(self._invalidate_sessions)
+        WorldWrapper.world_stop_failed.connect(self._invalidate_sessions)
         return None
 
     def load_worlds(self):
@@ -836,6 +1620,135 @@ class WorldManager(object):
                 world.install()
         return None
 
+    # sessions
+    # --------------------------------------------
+
+    def _invalidate_sessions(self, world=None):
+        """
+        Drops the current session table snapshot, so that it is reloaded
+        the next time, it is needed.
+        """
+        self._sessions.clear()
+        return None
+
+    def get_backend(self, name):
+        """
+        Returns the :class:`ProcessBackend` with the name *name* or ``None``,
+        if there is no backend with that name.
+        """
+        return self._backends.get(name)
+
+    def get_backend_names(self):
+        """
+        Returns a list with the names of all backends.
+        """
+        return list(self._backends.keys())
+
+    def sessions(self, cache=True, backend="screen"):
+        """
+        Returns a dictionary, that maps the name of each running session of
+        the *backend* to a list with the pids of the sessions with that name.
+
+        :param bool cache:
+            If ``True``, a snapshot of the session table is returned as long
+            as it is not older than :attr:`SESSIONS_TTL` seconds. Otherwise,
+            the session table is always reloaded. Reloading is cheap, if
+            the socket directory of the backend is accessible.
+        :param str backend:
+            The name of the :class:`ProcessBackend`.
+
+        The snapshot is also dropped, when a lifecycle signal like
+        :attr:`WorldWrapper.world_started` is emitted.
+
+        .. seealso::
+
+            * :meth:`WorldWrapper.pids`
+            * :meth:`ProcessBackend.read_sessions`
+        """
+        snapshot = self._sessions.get(backend)
+        if snapshot is None or not cache \
+           or time.time() - snapshot[0] > self.SESSIONS_TTL:
+            with trace.span("read_sessions", backend=backend):
+                sessions = self._backends[backend].read_sessions()
+            snapshot = self._sessions[backend] = (time.time(), sessions)
+        return snapshot[1]
+
+    # resources
+    # --------------------------------------------
+
+    def resource_usage(self, worlds=None, interval=0.5):
+        """
+        Samples the resource usage of the server processes of the *worlds*
+        (cpu, memory, threads, file descriptors, io rates and uptime).
+
+        All worlds are sampled together, so this method only waits
+        *interval* seconds once.
+
+        :param list worlds:
+            The :class:`WorldWrapper` instances. If ``None``, all worlds are
+            sampled.
+        :param float interval:
+            The time between the two snapshots, which are needed to compute
+            the cpu usage and the io rates.
+
+        :returns:
+            A dictionary, which maps the name of each world to a
+            :class:`emsm.lib.procfs.ResourceUsage` or ``None``, if the world
+            is offline or the */proc* filesystem is not available.
+
+        .. seealso::
+
+            * :class:`emsm.lib.procfs.Sampler`
+            * :meth:`WorldWrapper.resource_usage`
+        """
+        if worlds is None:
+            worlds = self.get_all()
+
+        usage = dict.fromkeys(world.name() for world in worlds)
+        if not procfs.available():
+            log.warning("/proc is not available, resource usage unknown.")
+            return usage
+
+        usage.update(
+            procfs.Sampler().sample(self._session_pids(worlds), interval)
+            )
+        return usage
+
+    def resource_snapshots(self, worlds=None):
+        """
+        Like :meth:`resource_usage`, but returns one
+        :class:`emsm.lib.procfs.ProcessSnapshot` with the cumulative counters
+        (cpu time, io bytes) of each server process and does not wait.
+
+        .. seealso::
+
+            * :meth:`emsm.lib.procfs.Sampler.snapshots`
+        """
+        if worlds is None:
+            worlds = self.get_all()
+
+        snapshots = dict.fromkeys(world.name() for world in worlds)
+        if not procfs.available():
+            log.warning("/proc is not available, resource usage unknown.")
+            return snapshots
+
+        snapshots.update(
+            procfs.Sampler().snapshots(self._session_pids(worlds))
+            )
+        return snapshots
+
+    def _session_pids(self, worlds):
+        """
+        Returns a dictionary, which maps the name of each online world in
+        *worlds* to the pid of its session process.
+        """
+        session_pids = dict()
+        for world in worlds:
+            pids = world.pids()
+            if pids:
+                session_pids[world.name()] = pids[0]
+        return session_pids
+
     # container
     # --------------------------------------------
 
@@ -141,6 +141,9 @@ import tempfile
 import logging
 import json
 
+# third party
+import blinker
+
 # local
 import emsm
 from emsm.base_plugin import BasePlugin
@@ -186,6 +189,11 @@ class BackupManager(object):
     Manages the backups of one world.
     """
 
+    #: Signal, that is emitted when a backup has been created. The keyword
+    #: arguments *path*, *size* (bytes) and *duration* (seconds) describe
+    #: the backup archive.
+    backup_created = blinker.signal("backup_created")
+
     def __init__(self, app, world, max_storage_size, backup_dir):
         """
         """
@@ -303,6 +311,7 @@ class BackupManager(object):
         else:
             return (None, None)
 
+    @emsm.trace.traced("backup.clean_backup_dir")
     def clean_backup_dir(self):
         """
         Removes old backups that are no longer needed.
@@ -331,6 +340,7 @@ class BackupManager(object):
                     pass
         return None
 
+    @emsm.trace.traced("backup.save_world")
     def _save_world(self, backup_dir):
         """
         Copies the world directory (world data) into the backup directory:
@@ -356,6 +366,7 @@ class BackupManager(object):
                 self._world.send_command("save-all")
         return None
 
+    @emsm.trace.traced("backup.restore_world")
     def _restore_world(self, backup_dir):
         """
         Copies the world directory from the backup in *backup_dir* into the
@@ -389,6 +400,7 @@ class BackupManager(object):
             )
         return None
 
+    @emsm.trace.traced("backup.save_world_conf")
     def _save_world_conf(self, backup_dir):
         """
         Saves the configuration of the world in *backup_dir/conf/world.json*.
@@ -399,6 +411,7 @@ class BackupManager(object):
             json.dump([self._world.name(), conf], file)
         return None                
 
+    @emsm.trace.traced("backup.restore_world_conf")
     def _restore_world_conf(self, backup_dir):
         """
         If the backup at *backup_dir* includes the world configuration, it
@@ -419,6 +432,7 @@ class BackupManager(object):
         conf.update(backup_conf)
         return None
 
+    @emsm.trace.traced("backup.create")
     def create(self, archive_format):
         """
         Creates a backup of the world and returns the name of the created
@@ -429,9 +443,13 @@ class BackupManager(object):
                 A string in shutil.get_archive_formats() that defines the
                 compression type.
                 
+        Signals:
+            * backup_created
+
         Exceptions:
             * ...
         """
+        start_time = time.time()
         with tempfile.TemporaryDirectory() as tmp_data_dir:
 
             # Copy all stuff that should be included into the backup in the
@@ -445,12 +463,16 @@ class BackupManager(object):
                 
                 # *make_archive* returns the **complete** path to the crated
                 # archive.
-                backup_path = shutil.make_archive(
-                    base_name = os.path.join(tmp_archive_dir, backup_filename),
-                    format = archive_format,
-                    root_dir = tmp_data_dir,
-                    base_dir = "./"
-                    )
+                with emsm.trace.span("backup.make_archive",
+                                     format=archive_format):
+                    backup_path = shutil.make_archive(
+                        base_name = os.path.join(
+                            tmp_archive_dir, backup_filename
+                            ),
+                        format = archive_format,
+                        root_dir = tmp_data_dir,
+                        base_dir = "./"
+                        )
 
                 # Move the backup to our folder in *plugins_data_dir*:
                 #   EMSM_ROOT/plugins_data/backups/foo/
@@ -462,12 +484,18 @@ class BackupManager(object):
                 dst = os.path.join(
                     self._backup_dir, os.path.basename(backup_path)
                     )
-                shutil.move(src=backup_path, dst=dst + ".tmp")
-                os.rename(dst + ".tmp", dst)
+                with emsm.trace.span("backup.move"):
+                    shutil.move(src=backup_path, dst=dst + ".tmp")
+                    os.rename(dst + ".tmp", dst)
 
+        BackupManager.backup_created.send(
+            self._world, path=dst, size=os.path.getsize(dst),
+            duration=time.time() - start_time
+            )
         self.clean_backup_dir()
         return None
 
+    @emsm.trace.traced("backup.restore")
     def restore(self, backup_file, message=str(), delay=0):
         """
         Restores the backup of the world from the given *backup_file*. If
@@ -482,16 +510,18 @@ class BackupManager(object):
         # Extract the backup in a temporary directory and copy then all things
         # into the EMSM directories.
         with tempfile.TemporaryDirectory() as temp_dir:
-            shutil.unpack_archive(
-                filename = backup_file,
-                extract_dir = temp_dir
-                )
+            with emsm.trace.span("backup.unpack_archive"):
+                shutil.unpack_archive(
+                    filename = backup_file,
+                    extract_dir = temp_dir
+                    )
 
             # Stop the world.
             was_online = self._world.is_online()
             if was_online:
                 self._world.send_command("say {}".format(message))
-                time.sleep(delay)
+                with emsm.trace.span("backup.restore_delay", delay=delay):
+                    time.sleep(delay)
                 self._world.kill_processes()
 
             # Restore the world.
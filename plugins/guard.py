@@ -22,12 +22,24 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-"""
+r"""
 About
 -----
 
 Monitors selected worlds (*--world*, *-w*, *-W*) and reacts on issues.
 
+A world is considered to be in trouble, if
+
+* it is offline,
+* it does not answer the *Server List Ping* (the request, the minecraft
+  client sends to show the server in the server list) within
+  *ping_timeout* seconds after *ping_attempts* attempts,
+* the round trip time of the ping exceeds *latency_error*,
+* or a new line in its log file matches the *error_regex*.
+
+Independent of these checks, the guard detects worlds, which run behind
+(*Can't keep up!*).
+
 Download
 --------
 
@@ -44,7 +56,20 @@ main.conf
 
     [guard]
     error_action = none
-    error_regex = (\[SEVERE\])
+    error_regex = .*\[SEVERE\].*
+    daemon_interval = 60
+    ping_timeout = 1
+    ping_attempts = 5
+    latency_warning = 0
+    latency_error = 0
+    lag_threshold = 200
+    lag_window = 300
+    lag_action = warn
+    lag_min_view_distance = 4
+    restart_backoff = 60
+    restart_backoff_max = 3600
+    crash_loop_restarts = 5
+    crash_loop_window = 3600
    
 **error_action**
 
@@ -57,14 +82,109 @@ main.conf
     
 **error_regex**
 
-    If this regex matches the log file, the world is considered to be in
-    trouble.
+    If this regex matches a new line in the log file, the world is
+    considered to be in trouble.
+
+    The guard remembers the position in the log file, up to which it has
+    been checked, in its data directory. So each run only scans the lines,
+    that have been written since the last run, and every error is only
+    reported once.
+
+**ping_timeout**
+
+    The time in seconds waited for the answer to the *Server List Ping*.
+
+**ping_attempts**
+
+    The number of pings sent, until a world is considered to be
+    unreachable.
+
+**latency_warning**
+
+    If the round trip time of the ping exceeds this value in milliseconds,
+    a warning is logged. *0* disables this check.
+
+**latency_error**
+
+    If the round trip time of the ping exceeds this value in milliseconds,
+    the world is considered to be in trouble. *0* disables this check.
+
+**lag_threshold**
+
+    The server logs *Can't keep up! ... Running 2500ms or 50 ticks behind*
+    when it runs behind. If the number of skipped ticks per minute in the
+    last *lag_window* seconds exceeds this value, the *lag_action* is
+    performed. *0* disables the lag detection.
+
+**lag_window**
+
+    The length of the sliding window in seconds, which is used to compute
+    the rate of skipped ticks.
+
+**lag_action**
+
+    Defines the reaction on a lagging world.
+
+    * *warn*           Print a message to stderr
+    * *restart*        Restart the world
+    * *view-distance*  Reduce the *view-distance* in the
+      :file:`server.properties` by one and restart the world
+      (the view distance can only be changed while the server is offline).
+
+**lag_min_view_distance**
+
+    The *view-distance* is not reduced below this value. If it is already
+    reached, the *lag_action* falls back to *warn*.
+
+**restart_backoff**
+
+    The guard waits at least this many seconds before it restarts a world
+    again. The delay doubles with each restart in the *crash_loop_window*.
+
+**restart_backoff_max**
+
+    The maximum delay in seconds between two restarts.
+
+**crash_loop_restarts**
+
+    If the guard restarted a world this many times in the last
+    *crash_loop_window* seconds, the world is marked as *crash-looping*.
+    The guard does not restart a crash-looping world anymore, until the
+    history is reset with ``--reset``.
+
+**crash_loop_window**
+
+    The time window in seconds for the crash loop detection.
+
+**daemon_interval**
+
+    The time in seconds between two checks of a world in the ``--daemon``
+    mode.
 
 Arguments
 ---------
 
-The guard has no arguments. When invoked all worlds selected with the global
-EMSM commands *-W* or *-w* are checked.
+When invoked all worlds selected with the global EMSM commands *-W* or *-w*
+are checked.
+
+.. option:: --status
+
+    Prints the restart history of the selected worlds: the recent restarts
+    and failures, the end of the backoff delay and whether the world is
+    crash-looping.
+
+.. option:: --reset
+
+    Clears the restart history of the selected worlds, so that the guard
+    acts on crash-looping worlds again.
+
+.. option:: --daemon
+
+    Runs the guard until it receives *SIGTERM* (or *SIGINT*) and checks each
+    world every *daemon_interval* seconds. The worlds are checked
+    concurrently, so a slow world does not delay the checks of the other
+    worlds. The EMSM file lock is only held while an error or lag action is
+    performed.
 
 Please not, that the **guard** does not produce much output to ``stdout``, but
 it writes a lot to the log files.
@@ -83,6 +203,12 @@ This plugin is made for cron (therefore it does not print much):
     # Runs the guard every 5 minutes for the world *foo*.
     */5 * *   *   *   root minecraft -w foo guard
 
+Instead of a cron job, the guard can also run as a daemon:
+
+.. code-block:: bash
+
+    $ minecraft -W guard --daemon
+
 Changelog
 ---------
 
@@ -104,15 +230,28 @@ Todo
 # ------------------------------------------------
 
 # std 
+import os
 import re
 import sys
 import time
-import socket
+import json
+import copy
+import random
+import datetime
+import functools
+import signal
+import asyncio
 import logging
+import threading
+import concurrent.futures
+
+# third party
+import blinker
 
 # local
 import emsm
 from emsm.base_plugin import BasePlugin
+from emsm.lib import logtail
 
 
 # Data
@@ -122,52 +261,133 @@ PLUGIN = "Guard"
 
 log = logging.getLogger(__file__)
 
+#: Matches the message of a server, which can not keep up with the ticks.
+LAG_RE = re.compile(
+    r"Can't keep up!.*?Running (?P<ms>\d+)ms or (?P<ticks>\d+) ticks behind"
+    )
+
+#: Matches the timestamp at the beginning of a log line, e.g.
+#: *[13:37:00]* or *2014-05-20 13:37:00*.
+TIMESTAMP_RE = re.compile(
+    r"^(?:(?P<date>\d{4}-\d{2}-\d{2}) |\[)"
+    r"(?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})"
+    )
+
 
 # Functions
 # ------------------------------------------------
 
-def check_port(adr, timeout=1, attempts=1):
+def _line_timestamp(line, now):
     """
-    Returns `true` if the tcp address *ip*:*port* is reachable.
-
-    Parameters:
-        * adr
-            The network address tuple of the target.
-        * timeout
-            Time in seconds waited until a connection attempt is
-            considered to be failed.
-        * attempts
-            Number of port checks done until the *adr* is considered
-            to be unreachable.
+    Returns the unix timestamp of the log *line*. If the line only contains
+    the time, it is assumed to be from the last 24 hours before *now*. If
+    the line has no timestamp, *now* is returned.
     """
-    for i in range(attempts):
-        s = socket.socket()
-        s.settimeout(timeout)
-        try:
-            s.connect(adr)
-        except Exception as err:
-            pass
+    match = TIMESTAMP_RE.match(line)
+    if match is None:
+        return now.timestamp()
+
+    try:
+        if match.group("date"):
+            date = datetime.datetime.strptime(match.group("date"), "%Y-%m-%d")
         else:
-            return True
-        finally:
-            s.close()
-    return False
+            date = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        timestamp = date.replace(
+            hour = int(match.group("hour")),
+            minute = int(match.group("minute")),
+            second = int(match.group("second"))
+            )
+    except ValueError:
+        return now.timestamp()
+
+    if not match.group("date") and timestamp > now:
+        timestamp -= datetime.timedelta(days=1)
+    return timestamp.timestamp()
 
 
 # Classes
 # ------------------------------------------------
 
+class SharedLock(object):
+    """
+    Holds the EMSM file *lock* as long as at least one user needs it.
+
+    The file lock is always acquired and released in the same thread, since
+    it may be bound to a thread.
+    """
+
+    def __init__(self, lock):
+        """
+        """
+        self._lock = lock
+        self._users = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        # Serialises the acquisition and release of the file lock.
+        self._mutex = asyncio.Lock()
+        return None
+
+    async def acquire(self):
+        """
+        Waits until the file lock is held.
+        """
+        async with self._mutex:
+            if self._users == 0:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, self._lock.acquire)
+            self._users += 1
+        return None
+
+    async def release(self):
+        """
+        Releases the file lock, if this has been the last user.
+        """
+        async with self._mutex:
+            self._users -= 1
+            if self._users == 0:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, self._lock.release)
+        return None
+
+    def close(self):
+        """
+        Stops the thread, that holds the file lock.
+        """
+        self._executor.shutdown(wait=True)
+        return None
+
+
 class Guard(BasePlugin):
     
     VERSION = "3.0.0-beta"
 
     DESCRIPTION = __doc__
+
+    #: Signal, that is emitted when the guard performed an action on a
+    #: world. The keyword arguments are the *action* (e.g. ``"restart"``)
+    #: and the *reason* (``"error"`` or ``"lag"``).
+    guard_action = blinker.signal("guard_action")
         
     def __init__(self, app, name):
         """
         """
         BasePlugin.__init__(self, app, name)
 
+        # Maps the name of a world to the position in its log file, up to
+        # which the log has been checked.
+        self._cursors = None
+
+        # Maps the name of a world to a list with the recent lag events
+        # *[timestamp, skipped ticks]*.
+        self._lag = None
+
+        # Maps the name of a world to its restart history.
+        self._restarts = None
+
+        # Protects the states above. The daemon checks the worlds in
+        # worker threads and saves the states in the event loop.
+        self._state_lock = threading.RLock()
+
         self._setup_conf()
         self._setup_argparser()
         return None
@@ -183,11 +403,63 @@ class Guard(BasePlugin):
         if self._error_action not in ("none", "restart", "stop", "stderr"):
             self._error_action = "stderr"
 
-        self._error_regex = conf.get("error_regex", ".*\[SEVERE\].*")
+        self._error_regex = conf.get("error_regex", r".*\[SEVERE\].*")
+        self._daemon_interval = conf.getint("daemon_interval", 60)
+        if self._daemon_interval <= 0:
+            self._daemon_interval = 60
+
+        self._ping_timeout = conf.getfloat("ping_timeout", 1)
+        if self._ping_timeout <= 0:
+            self._ping_timeout = 1
+        self._ping_attempts = max(1, conf.getint("ping_attempts", 5))
+        self._latency_warning = max(0, conf.getint("latency_warning", 0))
+        self._latency_error = max(0, conf.getint("latency_error", 0))
+        try:
+            self._error_re = re.compile(self._error_regex)
+        except re.error as err:
+            log.warning("invalid error_regex '{}': {}"\
+                        .format(self._error_regex, err))
+            self._error_regex = r".*\[SEVERE\].*"
+            self._error_re = re.compile(self._error_regex)
 
         # Save the used configuration options and intialise the configuration.
         conf["error_action"] = self._error_action
         conf["error_regex"] = self._error_regex
+        conf["daemon_interval"] = str(self._daemon_interval)
+        conf["ping_timeout"] = str(self._ping_timeout)
+        conf["ping_attempts"] = str(self._ping_attempts)
+        conf["latency_warning"] = str(self._latency_warning)
+        conf["latency_error"] = str(self._latency_error)
+
+        self._lag_threshold = max(0, conf.getint("lag_threshold", 200))
+        self._lag_window = conf.getint("lag_window", 300)
+        if self._lag_window <= 0:
+            self._lag_window = 300
+        self._lag_action = conf.get("lag_action", "warn")
+        if self._lag_action not in ("warn", "restart", "view-distance"):
+            self._lag_action = "warn"
+        self._lag_min_view_distance = max(
+            1, conf.getint("lag_min_view_distance", 4)
+            )
+
+        conf["lag_threshold"] = str(self._lag_threshold)
+        conf["lag_window"] = str(self._lag_window)
+        conf["lag_action"] = self._lag_action
+        conf["lag_min_view_distance"] = str(self._lag_min_view_distance)
+
+        self._restart_backoff = max(0, conf.getint("restart_backoff", 60))
+        self._restart_backoff_max = max(
+            self._restart_backoff, conf.getint("restart_backoff_max", 3600)
+            )
+        self._crash_loop_restarts = max(
+            1, conf.getint("crash_loop_restarts", 5)
+            )
+        self._crash_loop_window = max(1, conf.getint("crash_loop_window", 3600))
+
+        conf["restart_backoff"] = str(self._restart_backoff)
+        conf["restart_backoff_max"] = str(self._restart_backoff_max)
+        conf["crash_loop_restarts"] = str(self._crash_loop_restarts)
+        conf["crash_loop_window"] = str(self._crash_loop_window)
         return None
 
     def _setup_argparser(self):
@@ -197,6 +469,218 @@ class Guard(BasePlugin):
         parser = self.argparser()
 
         parser.description = "Monitors the worlds and reacts on issues."
+
+        parser.add_argument(
+            "--status",
+            action = "count",
+            dest = "status",
+            help = "Prints the restart history of the worlds."
+            )
+        parser.add_argument(
+            "--reset",
+            action = "count",
+            dest = "reset",
+            help = "Clears the restart history of the worlds."
+            )
+        parser.add_argument(
+            "--daemon",
+            action = "count",
+            dest = "daemon",
+            help = "Runs the guard until SIGTERM and checks the worlds "\
+            "periodically."
+            )
+        return None
+
+    def _load_state(self, name):
+        """
+        Loads the persistent state *name* (e.g. the log cursors) from the
+        data directory.
+        """
+        path = os.path.join(self.data_dir(), "{}.json".format(name))
+        try:
+            with open(path) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            state = dict()
+        return state if isinstance(state, dict) else dict()
+
+    def _save_state(self, name, state):
+        """
+        Saves the persistent *state* with the name *name* atomically.
+        """
+        path = os.path.join(self.data_dir(), "{}.json".format(name))
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(state, file)
+            os.replace(tmp_path, path)
+        except Exception as err:
+            log.exception("could not save the state '{}':".format(name))
+        return None
+
+    def _load_states(self):
+        """
+        Loads all persistent states, if they have not been loaded yet.
+        """
+        with self._state_lock:
+            if self._cursors is None:
+                self._cursors = self._load_state("cursors")
+            if self._lag is None:
+                self._lag = self._load_state("lag")
+            if self._restarts is None:
+                self._restarts = self._load_state("restarts")
+        return None
+
+    def _save_states(self):
+        """
+        Saves all loaded persistent states.
+
+        The states are copied while the state lock is held, so that the
+        worker threads of the daemon can go on while the files are written.
+        """
+        with self._state_lock:
+            states = {
+                name: copy.deepcopy(state) for name, state in (
+                    ("cursors", self._cursors),
+                    ("lag", self._lag),
+                    ("restarts", self._restarts)
+                    )
+                if state is not None
+                }
+
+        for name, state in states.items():
+            self._save_state(name, state)
+        return None
+
+    def _scan_new_log(self, world):
+        """
+        Returns the lines, that match the *error_regex* and the lag events
+        *(timestamp, skipped ticks)*, that have been written to the log of
+        the *world* since the last check.
+
+        Only the bytes after the cursor of the world are read. If the log
+        file has been rotated or truncated, the new file is checked from
+        the beginning. When the world is checked the first time, the check
+        starts at the last server start.
+
+        The lag events are not reported, when the world is checked the first
+        time. The log lines only contain the time of the day, so the lag of
+        the previous days of a long running server could not be told apart
+        from the current lag.
+        """
+        self._load_states()
+
+        try:
+            file = open(world.log_path(), "rb")
+        except OSError:
+            return (list(), list())
+
+        errors = list()
+        lags = list()
+        now = datetime.datetime.now()
+        with file:
+            stat = os.fstat(file.fileno())
+            with self._state_lock:
+                cursor = copy.deepcopy(self._cursors.get(world.name()))
+            first_scan = cursor is None
+            if first_scan:
+                offset = world.latest_log_offset()
+            elif cursor["dev"] != stat.st_dev \
+                 or cursor["inode"] != stat.st_ino \
+                 or cursor["offset"] > stat.st_size:
+                offset = 0
+            else:
+                offset = cursor["offset"]
+
+            # Only complete lines are checked, the last incomplete line is
+            # checked with the next run.
+            file.seek(offset)
+            rest = bytes()
+            while True:
+                block = file.read(logtail.BLOCK_SIZE)
+                if not block:
+                    break
+                block = rest + block
+                i = block.rfind(b"\n")
+                rest = block[i + 1:]
+                text = block[:i + 1].decode(errors="replace")
+
+                # Each line is reported only once, even if the regex matches
+                # more than once.
+                last_start = -1
+                for match in self._error_re.finditer(text):
+                    start = text.rfind("\n", 0, match.start()) + 1
+                    if start == last_start:
+                        continue
+                    last_start = start
+                    end = text.find("\n", start)
+                    errors.append(text[start:end])
+
+                if self._lag_threshold and not first_scan:
+                    for match in LAG_RE.finditer(text):
+                        start = text.rfind("\n", 0, match.start()) + 1
+                        timestamp = _line_timestamp(text[start:match.start()], now)
+                        lags.append((timestamp, int(match.group("ticks"))))
+            offset = file.tell() - len(rest)
+
+        with self._state_lock:
+            self._cursors[world.name()] = {
+                "dev": stat.st_dev,
+                "inode": stat.st_ino,
+                "offset": offset
+                }
+        return (errors, lags)
+
+    def _record_lag(self, world, lags):
+        """
+        Adds the new *lags* to the sliding window of the *world* and returns
+        the number of skipped ticks per minute in the window.
+        """
+        self._load_states()
+
+        now = time.time()
+        with self._state_lock:
+            window = self._lag.get(world.name(), list()) \
+                     + [list(lag) for lag in lags]
+            window = [lag for lag in window if now - lag[0] <= self._lag_window]
+            if window:
+                self._lag[world.name()] = window
+            else:
+                self._lag.pop(world.name(), None)
+
+        skipped = sum(ticks for timestamp, ticks in window)
+        return skipped*60/self._lag_window
+
+    def _ping(self, world):
+        """
+        Pings the *world* up to *ping_attempts* times and returns the first
+        :class:`~emsm.ping.PingResponse` or ``None``, if the world did not
+        answer.
+        """
+        for i in range(self._ping_attempts):
+            try:
+                return world.ping(timeout=self._ping_timeout)
+            except emsm.ping.PingError as err:
+                log.debug("ping of '{}' failed: {}".format(world.name(), err))
+        return None
+
+    def diagnose(self, world):
+        """
+        Checks the *world* and returns
+
+        * ``"error"``, if the world is not running smooth,
+        * ``"lag"``, if the world runs behind,
+        * ``None``, if everything is fine.
+        """
+        if self._world_in_trouble(world):
+            return "error"
+
+        if self._lag_threshold:
+            rate = self._record_lag(world, ())
+            if rate > self._lag_threshold:
+                log.warning("the world '{}' skips {:.0f} ticks per minute."\
+                            .format(world.name(), rate))
+                return "lag"
         return None
 
     def _world_in_trouble(self, world):
@@ -206,45 +690,249 @@ class Guard(BasePlugin):
         # 1. Check if the world is online.
         error = world.is_offline()
 
-        # 2. Check if the world's network address is reachable.
+        # 2. Check if the server answers the Server List Ping in time.
         if not error:
-            error = not bool(check_port(world.address(), timeout=1, attempts=5))
+            response = self._ping(world)
+            if response is None:
+                log.warning("the world '{}' did not answer the ping."\
+                            .format(world.name()))
+                error = True
+            else:
+                latency = response.latency()*1000
+                log.info("ping of '{}': {:.1f}ms, {}/{} players"\
+                         .format(world.name(), latency,
+                                 response.online_players(),
+                                 response.max_players()))
+                if self._latency_error and latency > self._latency_error:
+                    log.warning("the latency of '{}' is too high: {:.1f}ms"\
+                                .format(world.name(), latency))
+                    error = True
+                elif self._latency_warning \
+                     and latency > self._latency_warning:
+                    log.warning("the latency of '{}' is high: {:.1f}ms"\
+                                .format(world.name(), latency))
 
-        # 3. Check the log file for errors.
+        # 3. Check the new lines in the log file for errors.
         if not error:
-            log = world.latest_log()
-            error = bool(re.search(self._error_regex, log))
+            errors, lags = self._scan_new_log(world)
+            if lags:
+                self._record_lag(world, lags)
+            for line in errors:
+                log.warning("error in the log of '{}': {}"\
+                            .format(world.name(), line))
+            error = bool(errors)
         return error
             
     def guard(self, world):
         """
         Checks if the world is running *smooth* and reacts on issues.
         """
-        # Break if we have nothing to do.
-        if not self._world_in_trouble(world):
+        self.react(world, self.diagnose(world))
+        return None
+
+    def react(self, world, diagnosis):
+        """
+        Performs the *error_action* or the *lag_action* for the *diagnosis*
+        of the *world*.
+
+        .. seealso::
+
+            * :meth:`diagnose`
+        """
+        if diagnosis == "error":
+            self.handle_trouble(world)
+        elif diagnosis == "lag":
+            self.handle_lag(world)
+        return None
+
+    def handle_lag(self, world):
+        """
+        Performs the *lag_action* for the *world*, which runs behind.
+        """
+        action = self._lag_action
+        if action in ("restart", "view-distance") \
+           and self.restart_delay(world) != 0:
+            log.info("the lagging world '{}' can not be restarted now."\
+                     .format(world.name()))
+            action = "warn"
+
+        if action == "view-distance":
+            try:
+                view_distance = int(
+                    world.server_properties().get("view-distance", 10)
+                    )
+            except ValueError:
+                view_distance = 10
+            if view_distance <= self._lag_min_view_distance:
+                log.info("the view distance of '{}' can not be reduced "\
+                         "anymore.".format(world.name()))
+                action = "warn"
+
+        # Warn
+        if action == "warn":
+            print("guard - {}:".format(world.name()), file=sys.stderr)
+            print("\t", "runs behind", file=sys.stderr)
+            Guard.guard_action.send(world, action="warn", reason="lag")
             return None
-    
+
+        # Reduce the view distance
+        if action == "view-distance":
+            log.info("reducing the view distance of '{}' to {} ..."\
+                     .format(world.name(), view_distance - 1))
+            world.set_server_property("view-distance", str(view_distance - 1))
+            Guard.guard_action.send(
+                world, action="view-distance", reason="lag"
+                )
+
+        self.restart(world, "lag")
+
+        # The lag of the old server process is not relevant anymore.
+        with self._state_lock:
+            self._lag.pop(world.name(), None)
+        return None
+
+    def _restart_history(self, world):
+        """
+        Returns the restart history of the *world* without the restarts,
+        which are older than the *crash_loop_window*.
+
+        The history must only be modified while the state lock is held.
+        """
+        self._load_states()
+
+        with self._state_lock:
+            history = self._restarts.setdefault(world.name(), dict())
+            history.setdefault("restarts", list())
+            history.setdefault("crash_loop", False)
+
+            now = time.time()
+            history["restarts"] = [
+                restart for restart in history["restarts"]
+                if now - restart["time"] <= self._crash_loop_window
+                ]
+        return history
+
+    def restart_delay(self, world):
+        """
+        Returns the time in seconds, until the guard may restart the *world*
+        again, or ``None``, if the world is crash-looping.
+        """
+        with self._state_lock:
+            history = self._restart_history(world)
+            if history["crash_loop"]:
+                return None
+            if not history["restarts"]:
+                return 0
+
+            restarts = len(history["restarts"])
+            last_restart = history["restarts"][-1]["time"]
+
+        backoff = self._restart_backoff*2**(restarts - 1)
+        backoff = min(backoff, self._restart_backoff_max)
+        return max(0, last_restart + backoff - time.time())
+
+    def restart(self, world, reason):
+        """
+        Restarts the *world* because of *reason* (``"error"`` or ``"lag"``),
+        unless the backoff delay has not passed yet or the world is
+        crash-looping. The restart is recorded in the restart history.
+
+        Returns ``True`` if the world has been restarted.
+        """
+        delay = self.restart_delay(world)
+        if delay is None:
+            log.warning("the world '{}' is crash-looping, the guard does not "\
+                        "restart it.".format(world.name()))
+            return False
+        if delay > 0:
+            log.info("the restart of '{}' is delayed for {:.0f}s (backoff)."\
+                     .format(world.name(), delay))
+            return False
+
+        log.info("trying to restart the world '{}' ...".format(world.name()))
+        error = None
+        try:
+            world.restart(force_restart=True)
+        except (emsm.worlds.WorldStopFailed, emsm.worlds.WorldStartFailed) \
+               as err:
+            error = str(err) or type(err).__name__
+            log.warning("restart of '{}' failed: '{}'"\
+                        .format(world.name(), err))
+        else:
+            log.info("restarted the world '{}'.".format(world.name()))
+        Guard.guard_action.send(
+            world, action="restart" if error is None else "restart-failed",
+            reason=reason
+            )
+
+        with self._state_lock:
+            history = self._restart_history(world)
+            history["restarts"].append({
+                "time": time.time(),
+                "reason": reason,
+                "error": error
+                })
+            restarts = len(history["restarts"])
+            crash_loop = restarts >= self._crash_loop_restarts
+            if crash_loop:
+                history["crash_loop"] = True
+        if crash_loop:
+            log.error("the world '{}' has been restarted {} times in {}s "\
+                      "and is marked as crash-looping."\
+                      .format(world.name(), restarts,
+                              self._crash_loop_window))
+            Guard.guard_action.send(world, action="crash-loop", reason=reason)
+            print("guard - {}:".format(world.name()), file=sys.stderr)
+            print("\t", "is crash-looping, use 'guard --reset' after fixing "\
+                  "it", file=sys.stderr)
+        return error is None
+
+    def reset(self, world):
+        """
+        Clears the restart history of the *world*.
+        """
+        self._load_states()
+        with self._state_lock:
+            self._restarts.pop(world.name(), None)
+        return None
+
+    def print_status(self, world):
+        """
+        Prints the restart history of the *world*.
+        """
+        history = self._restart_history(world)
+        delay = self.restart_delay(world)
+
+        print("guard - {}:".format(world.name()))
+        if history["crash_loop"]:
+            print("\t", "status:", "crash-looping")
+        elif delay:
+            print("\t", "status:", "backoff ({:.0f}s left)".format(delay))
+        else:
+            print("\t", "status:", "ok")
+
+        print("\t", "restarts in the last {}s: {}"\
+              .format(self._crash_loop_window, len(history["restarts"])))
+        for restart in history["restarts"]:
+            date = datetime.datetime.fromtimestamp(restart["time"])
+            print("\t\t", date.strftime("%Y-%m-%d %H:%M:%S"),
+                  restart["reason"],
+                  "failed: {}".format(restart["error"]) if restart["error"]\
+                  else "ok")
+        return None
+
+    def handle_trouble(self, world):
+        """
+        Performs the *error_action* for the *world*, which is not running
+        smooth.
+        """
         log.warning("the world '{}' is not running correct."\
                     .format(world.name())
                     )
 
         # Restart
         if self._error_action == "restart":
-            log.info("trying to restart the world '{}' ..."\
-                     .format(world.name())
-                     )
-            try:
-                world.restart(force_restart=True)
-            except emsm.worlds.WorldStopFailed as err:
-                log.warning("restart of '{}' failed: '{}'"\
-                            .format(world.name(), err)
-                            )
-            except emsm.worlds.WorldStartFailed as err:
-                log.warning("restart of '{}' failed: '{}'"\
-                            .format(world.name(), err)
-                            )
-            else:
-                log.info("restarted the world '{}'.".format(world.name()))
+            self.restart(world, "error")
 
         # Stop
         elif self._error_action == "stop":
@@ -259,18 +947,187 @@ class Guard(BasePlugin):
                             )
             else:
                 log.info("stopped the world '{}'.".format(world.name()))
+            Guard.guard_action.send(world, action="stop", reason="error")
 
         # Stderr
         elif self._error_action == "stderr":
             print("guard - {}:".format(world.name()), file=sys.stderr)
             print("\t", "has issues", file=sys.stderr)
+            Guard.guard_action.send(world, action="stderr", reason="error")
+        return None
+
+    def _daemon_call(self, func, world):
+        """
+        Calls *func* with the *world* in a worker thread of the daemon.
+        Errors are logged, so that the daemon keeps running.
+        """
+        try:
+            return func(world)
+        except Exception as err:
+            log.exception("guard check of '{}' failed:".format(world.name()))
+        return None
+
+    def _daemon_save_states(self):
+        """
+        Saves the states in the daemon. Errors are logged, so that the daemon
+        keeps running.
+        """
+        try:
+            self._save_states()
+        except Exception as err:
+            log.exception("could not save the guard states:")
+        return None
+
+    def _world_state(self, world):
+        """
+        Returns a snapshot of the *world*, which changes when the world is
+        started, stopped or restarted: the pids of the server and the offset
+        of the last server start in the log.
+        """
+        pids = tuple(sorted(world.pids(cache=False)))
+        return (pids, world.latest_log_offset())
+
+    def _daemon_check(self, world):
+        """
+        Returns the state of the *world* (:meth:`_world_state`) and its
+        diagnosis.
+        """
+        state = self._world_state(world)
+        return (state, self.diagnose(world))
+
+    def _daemon_react(self, world, state, diagnosis):
+        """
+        Performs the reaction on the *diagnosis* of the *world*, which
+        has been made in the *state*.
+
+        The daemon checks the world without holding the file lock, so
+        another EMSM command may have stopped or restarted the world until
+        the lock has been acquired. In this case, the diagnosis is outdated
+        and the world is checked again in the next interval.
+        """
+        if self._world_state(world) != state:
+            log.info("the world '{}' has been started or stopped since the "\
+                     "check, the guard does not react.".format(world.name()))
+            return None
+        self.react(world, diagnosis)
+        return None
+
+    async def _watch_world(self, world, stop, app_lock, executor):
+        """
+        Checks the *world* every *daemon_interval* seconds until *stop*
+        is set. A running check is always completed.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Spread the checks of the worlds over the interval.
+        delay = random.uniform(0, self._daemon_interval)
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                break
+
+            start = loop.time()
+            check = await loop.run_in_executor(
+                executor, self._daemon_call, self._daemon_check, world
+                )
+            self._daemon_save_states()
+
+            # The check only reads the state of the world, but the
+            # reaction changes it, so the file lock is needed.
+            if check is not None and check[1] is not None:
+                state, diagnosis = check
+                react = functools.partial(
+                    self._daemon_react, state=state, diagnosis=diagnosis
+                    )
+                await app_lock.acquire()
+                try:
+                    await loop.run_in_executor(
+                        executor, self._daemon_call, react, world
+                        )
+                finally:
+                    await app_lock.release()
+                self._daemon_save_states()
+            delay = max(0, self._daemon_interval - (loop.time() - start))
+        return None
+
+    async def _daemon(self, worlds):
+        """
+        Runs the checks of the *worlds* until SIGTERM or SIGINT is received.
+        """
+        loop = asyncio.get_running_loop()
+        app_lock = SharedLock(self.app().lock())
+
+        stop = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+
+        # Each world gets its own worker, so that a slow check or action does
+        # not delay the other worlds.
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, len(worlds))
+            )
+        try:
+            await asyncio.gather(*[
+                self._watch_world(world, stop, app_lock, executor)
+                for world in worlds
+                ])
+        finally:
+            executor.shutdown(wait=True)
+            app_lock.close()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(signum)
+        return None
+
+    def daemon(self, worlds):
+        """
+        Checks the *worlds* periodically until SIGTERM or SIGINT is received.
+
+        The EMSM file lock is only held while an error or lag action is
+        performed, so that other EMSM commands can run in the meantime.
+        """
+        log.info("starting the guard daemon for {} worlds ..."\
+                 .format(len(worlds)))
+
+        self._load_states()
+
+        lock = self.app().lock()
+        lock.release()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._daemon(worlds))
+        finally:
+            loop.close()
+            # The application expects the lock to be held.
+            lock.acquire()
+
+        log.info("stopped the guard daemon.")
         return None
 
     def run(self, args):
         """
         """
-        # Run the guard for all selected worlds.
         worlds = self.app().worlds().get_selected()
-        for world in worlds:
-            self.guard(world)
+
+        if args.reset or args.status:
+            for world in worlds:
+                if args.reset:
+                    self.reset(world)
+                if args.status:
+                    self.print_status(world)
+            self._save_states()
+            return None
+
+        if args.daemon:
+            self.daemon(worlds)
+            return None
+
+        # Run the guard for all selected worlds.
+        try:
+            for world in worlds:
+                self.guard(world)
+        finally:
+            self._save_states()
         return None
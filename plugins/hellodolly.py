@@ -153,6 +153,11 @@ class HelloDolly(BasePlugin):
     # *FINISH_PRIORITY* is called earlier.
     FINISH_PRIORITY = 0
 
+    # Our plugin does not listen to signals and does nothing in *finish*,
+    # so it only needs to be loaded, when it is selected on the command
+    # line. Otherwise, set *SUBSCRIBER* to True.
+    SUBSCRIBER = False
+
     # At the moment, there is no direct url to the latest version of this
     # plugin.
     # In the future, the plugin manager could use this url to detect new
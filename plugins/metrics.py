@@ -0,0 +1,714 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+About
+-----
+
+Exports metrics about the worlds, the backups and the EMSM runs in the
+`Prometheus <https://prometheus.io>`_ text format.
+
+Each invocation of this plugin writes the metrics to a file, which can be
+collected by the *textfile collector* of the Prometheus node exporter.
+With ``--serve``, the metrics are also served over HTTP. All other EMSM runs
+only update the counters of this plugin, so they do not pay for sampling the
+worlds.
+
+The counters are only saved, if a signal changed them. So the duration and
+the lock wait time are only recorded for the runs, which changed something
+(e.g. started a world or created a backup) or invoked this plugin. Read-only
+runs like ``worlds --status`` do not write anything.
+
+The metrics are gathered from the signals emitted by the EMSM and its
+plugins (world started or stopped, backup created, guard action, command
+answered) and from the */proc* filesystem. The servers are never polled for
+the metrics.
+
+Download
+--------
+
+You can find the latest version of this plugin in the EMSM
+`GitHub repository <https://github.com/benediktschmitt/emsm>`_.
+
+Configuration
+-------------
+
+main.conf
+^^^^^^^^^
+
+.. code-block:: ini
+
+    [metrics]
+    textfile =
+    address = 127.0.0.1
+    port = 9437
+
+**textfile**
+
+    The path of the file, the metrics are written to by this plugin.
+    The default is :file:`emsm.prom` in the data directory of this plugin.
+    Point it to the textfile directory of the node exporter, e.g.
+    :file:`/var/lib/node_exporter/textfile/emsm.prom`.
+
+**address**
+
+    The address, the ``--serve`` mode listens on.
+
+**port**
+
+    The port, the ``--serve`` mode listens on.
+
+Arguments
+---------
+
+.. option:: --print
+
+    Prints the current metrics.
+
+.. option:: --serve
+
+    Serves the metrics at ``http://address:port/metrics`` until *SIGTERM*
+    (or *SIGINT*) is received. The metrics are collected on each request.
+    The EMSM file lock is not held while serving.
+
+Metrics
+-------
+
+=========================================== ===================================
+Name                                        Description
+=========================================== ===================================
+emsm_world_up                               1 if the world is online
+emsm_world_start_time_seconds               Start time of the server process
+emsm_world_uptime_seconds                   Uptime of the server process
+emsm_world_cpu_seconds_total                Cpu time used by the server
+emsm_world_resident_memory_bytes            Resident set size of the server
+emsm_world_threads                          Threads of the server
+emsm_world_open_fds                         Open file descriptors of the server
+emsm_world_read_bytes_total                 Bytes read by the server
+emsm_world_written_bytes_total              Bytes written by the server
+emsm_world_events_total                     Starts, stops and failures
+emsm_world_command_duration_seconds         Time until a command was answered
+emsm_backup_last_timestamp_seconds          Time of the last backup
+emsm_backup_last_size_bytes                 Size of the last backup
+emsm_backup_last_duration_seconds           Duration of the last backup
+emsm_backups_total                          Number of created backups
+emsm_guard_actions_total                    Actions performed by the guard
+emsm_run_duration_seconds                   Duration of the EMSM runs
+emsm_run_last_timestamp_seconds             End of the last EMSM run
+emsm_lock_wait_seconds                      Time waited for the file lock
+emsm_lock_last_wait_seconds                 Wait time of the last EMSM run
+=========================================== ===================================
+
+Cron
+----
+
+When the node exporter is used, a cron job keeps the textfile up to date:
+
+.. code-block:: text
+
+    # m h dom mon dow user command
+    */1 * *   *   *   root minecraft metrics
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import time
+import json
+import signal
+import logging
+import tempfile
+import threading
+import http.server
+
+# third party
+import blinker
+import filelock
+
+# local
+import emsm
+from emsm.base_plugin import BasePlugin
+
+
+# Data
+# ------------------------------------------------
+
+PLUGIN = "Metrics"
+
+log = logging.getLogger(__file__)
+
+#: The content type of the Prometheus text format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Functions
+# ------------------------------------------------
+
+def _escape(value):
+    """
+    Escapes the label *value* for the Prometheus text format.
+    """
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n")\
+           .replace("\"", "\\\"")
+
+
+def format_metric(name, type_, help_, samples):
+    """
+    Returns the lines of the metric family *name* in the Prometheus text
+    format.
+
+    Parameters:
+        * name
+            The name of the metric.
+        * type_
+            *gauge*, *counter* or *summary*
+        * help_
+            The description of the metric.
+        * samples
+            A list of tuples *(suffix, labels, value)*. The *suffix* is
+            appended to the name (e.g. *_sum* for summaries) and *labels*
+            is a dictionary. Samples with the value ``None`` are skipped.
+    """
+    lines = list()
+    for suffix, labels, value in samples:
+        if value is None:
+            continue
+        labels = ",".join(
+            "{}=\"{}\"".format(key, _escape(labels[key]))
+            for key in sorted(labels)
+            )
+        lines.append("{}{}{} {}".format(
+            name, suffix, "{" + labels + "}" if labels else "", repr(value)
+            ))
+
+    if lines:
+        lines.insert(0, "# HELP {} {}".format(name, help_))
+        lines.insert(1, "# TYPE {} {}".format(name, type_))
+    return lines
+
+
+# Classes
+# ------------------------------------------------
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves the metrics collected by the *metrics* plugin of the server.
+    """
+
+    def do_GET(self):
+        """
+        """
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return None
+
+        try:
+            body = self.server.metrics.collect().encode()
+        except Exception as err:
+            log.exception("could not collect the metrics:")
+            self.send_error(500)
+            return None
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return None
+
+    def log_message(self, format, *args):
+        """
+        Writes the request to the EMSM log instead of stderr.
+        """
+        log.debug("{} - {}".format(self.address_string(), format % args))
+        return None
+
+
+class Metrics(BasePlugin):
+
+    VERSION = "3.0.0-beta"
+
+    DESCRIPTION = __doc__
+
+    # The run is measured until all other plugins are finished.
+    FINISH_PRIORITY = 100
+
+    # The signals must be received in every run.
+    SUBSCRIBER = True
+
+    def __init__(self, app, name):
+        """
+        """
+        BasePlugin.__init__(self, app, name)
+
+        self._start_time = time.monotonic()
+
+        # True, if this plugin has been invoked and the textfile must be
+        # updated.
+        self._invoked = False
+
+        # True, if the state has been modified by a signal in this run.
+        self._modified = False
+
+        # Serialises the updates of the state within this process. The file
+        # lock of the state serialises them with the other EMSM runs.
+        self._state_lock = threading.Lock()
+        self._state_file_lock = None
+
+        self._setup_conf()
+        self._setup_argparser()
+
+        emsm.worlds.WorldWrapper.world_started.connect(self._on_world_started)
+        emsm.worlds.WorldWrapper.world_start_failed.connect(
+            self._on_world_start_failed
+            )
+        emsm.worlds.WorldWrapper.world_stopped.connect(self._on_world_stopped)
+        emsm.worlds.WorldWrapper.world_stop_failed.connect(
+            self._on_world_stop_failed
+            )
+        emsm.worlds.WorldWrapper.world_uninstalled.connect(
+            self._on_world_uninstalled
+            )
+        emsm.worlds.WorldWrapper.world_command_done.connect(
+            self._on_world_command_done
+            )
+
+        # These signals are defined by other plugins, which may not be
+        # loaded.
+        blinker.signal("backup_created").connect(self._on_backup_created)
+        blinker.signal("guard_action").connect(self._on_guard_action)
+        return None
+
+    def _setup_conf(self):
+        """
+        Loads the configuration.
+        """
+        conf = self.conf()
+
+        self._textfile = conf.get("textfile", "")
+        self._address = conf.get("address", "127.0.0.1")
+        self._port = conf.getint("port", 9437)
+        if not 0 < self._port < 65536:
+            self._port = 9437
+
+        conf["textfile"] = self._textfile
+        conf["address"] = self._address
+        conf["port"] = str(self._port)
+        return None
+
+    def _setup_argparser(self):
+        """
+        Sets the argument parser up.
+        """
+        parser = self.argparser()
+
+        parser.description = "Exports metrics in the Prometheus text format."
+
+        parser.add_argument(
+            "--print",
+            action = "count",
+            dest = "print",
+            help = "Prints the current metrics."
+            )
+        parser.add_argument(
+            "--serve",
+            action = "count",
+            dest = "serve",
+            help = "Serves the metrics over HTTP until SIGTERM."
+            )
+        return None
+
+    def textfile(self):
+        """
+        Returns the path of the file, the metrics are written to.
+        """
+        if self._textfile:
+            return os.path.expanduser(self._textfile)
+        return os.path.join(self.data_dir(), "emsm.prom")
+
+    # state
+    # --------------------------------------------
+
+    def _state_path(self):
+        return os.path.join(self.data_dir(), "state.json")
+
+    def _load_state(self):
+        """
+        Loads the counters, which have been recorded by the previous EMSM
+        runs.
+        """
+        try:
+            with open(self._state_path()) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            state = dict()
+        return state if isinstance(state, dict) else dict()
+
+    def _update_state(self, func):
+        """
+        Calls *func* with the persistent state and saves the state
+        atomically afterwards.
+
+        The state is read again for each update, since a long running
+        EMSM process (e.g. the guard daemon) must not overwrite the changes
+        of other EMSM runs. The whole update holds a lock on the state
+        file.
+        """
+        path = self._state_path()
+        with self._state_lock:
+            self._modified = True
+            if self._state_file_lock is None:
+                self._state_file_lock = filelock.FileLock(path + ".lock")
+
+            with self._state_file_lock:
+                state = self._load_state()
+                func(state)
+
+                tmp_path = None
+                try:
+                    fd, tmp_path = tempfile.mkstemp(
+                        prefix="state.", suffix=".tmp",
+                        dir=os.path.dirname(path)
+                        )
+                    with os.fdopen(fd, "w") as file:
+                        json.dump(state, file)
+                    os.replace(tmp_path, path)
+                except OSError as err:
+                    log.warning("could not save the metrics state: {}"\
+                                .format(err))
+                    if tmp_path is not None and os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+        return None
+
+    def _increment(self, key, world, label, value=1):
+        """
+        Increments the counter *state[key][world][label]* by *value*.
+        """
+        def update(state):
+            counters = state.setdefault(key, dict()).setdefault(world, dict())
+            counters[label] = counters.get(label, 0) + value
+            return None
+        self._update_state(update)
+        return None
+
+    # signals
+    # --------------------------------------------
+
+    def _on_world_started(self, world):
+        self._increment("world_events", world.name(), "started")
+        return None
+
+    def _on_world_start_failed(self, world):
+        self._increment("world_events", world.name(), "start_failed")
+        return None
+
+    def _on_world_stopped(self, world):
+        self._increment("world_events", world.name(), "stopped")
+        return None
+
+    def _on_world_stop_failed(self, world):
+        self._increment("world_events", world.name(), "stop_failed")
+        return None
+
+    def _on_world_uninstalled(self, world):
+        """
+        Removes the metrics of the uninstalled *world*.
+        """
+        def update(state):
+            for key in ("world_events", "commands", "backups",
+                        "guard_actions"):
+                state.get(key, dict()).pop(world.name(), None)
+            return None
+        self._update_state(update)
+        return None
+
+    def _on_world_command_done(self, world, command, transport, duration):
+        """
+        Records the time, the *world* needed to answer a command.
+        """
+        def update(state):
+            commands = state.setdefault("commands", dict())\
+                       .setdefault(world.name(), dict())\
+                       .setdefault(transport, {"count": 0, "sum": 0})
+            commands["count"] += 1
+            commands["sum"] += duration
+            return None
+        self._update_state(update)
+        return None
+
+    def _on_backup_created(self, world, path, size, duration):
+        """
+        Records the last backup of the *world*.
+        """
+        def update(state):
+            backup = state.setdefault("backups", dict())\
+                     .setdefault(world.name(), {"count": 0})
+            backup["count"] += 1
+            backup["time"] = time.time()
+            backup["size"] = size
+            backup["duration"] = duration
+            return None
+        self._update_state(update)
+        return None
+
+    def _on_guard_action(self, world, action, reason):
+        self._increment("guard_actions", world.name(), action)
+        return None
+
+    # collect
+    # --------------------------------------------
+
+    def collect(self):
+        """
+        Returns the current metrics in the Prometheus text format.
+        """
+        state = self._load_state()
+        worlds = sorted(self.app().worlds().get_all(), key=lambda w: w.name())
+        snapshots = self.app().worlds().resource_snapshots(worlds)
+        now = time.time()
+
+        lines = list()
+        def add(name, type_, help_, samples):
+            lines.extend(format_metric(name, type_, help_, samples))
+            return None
+
+        # worlds
+        add("emsm_world_up", "gauge", "1 if the world is online.", [
+            ("", {"world": world.name()}, int(world.is_online()))
+            for world in worlds
+            ])
+
+        processes = [
+            ({"world": name}, snapshot)
+            for name, snapshot in sorted(snapshots.items())
+            if snapshot is not None
+            ]
+        add("emsm_world_start_time_seconds", "gauge",
+            "Start time of the server process since unix epoch in seconds.",
+            [("", labels, p.start_time()) for labels, p in processes])
+        add("emsm_world_uptime_seconds", "gauge",
+            "Uptime of the server process in seconds.",
+            [("", labels, max(0, now - p.start_time()))
+             for labels, p in processes])
+        add("emsm_world_cpu_seconds_total", "counter",
+            "User and system cpu time of the server process in seconds.",
+            [("", labels, p.cpu_time()) for labels, p in processes])
+        add("emsm_world_resident_memory_bytes", "gauge",
+            "Resident memory size of the server process in bytes.",
+            [("", labels, p.rss()) for labels, p in processes])
+        add("emsm_world_threads", "gauge",
+            "Number of threads of the server process.",
+            [("", labels, p.threads()) for labels, p in processes])
+        add("emsm_world_open_fds", "gauge",
+            "Number of open file descriptors of the server process.",
+            [("", labels, p.fds()) for labels, p in processes])
+        add("emsm_world_read_bytes_total", "counter",
+            "Bytes read by the server process from the storage layer.",
+            [("", labels, p.read_bytes()) for labels, p in processes])
+        add("emsm_world_written_bytes_total", "counter",
+            "Bytes written by the server process to the storage layer.",
+            [("", labels, p.write_bytes()) for labels, p in processes])
+
+        add("emsm_world_events_total", "counter",
+            "Number of starts, stops and failed starts or stops of the world.",
+            [("", {"world": world, "event": event}, count)
+             for world, events in sorted(state.get("world_events", {}).items())
+             for event, count in sorted(events.items())])
+
+        commands = [
+            ({"world": world, "transport": transport}, summary)
+            for world, transports in sorted(state.get("commands", {}).items())
+            for transport, summary in sorted(transports.items())
+            ]
+        add("emsm_world_command_duration_seconds", "summary",
+            "Time until the world answered a command in seconds.",
+            [(suffix, labels, summary[key])
+             for labels, summary in commands
+             for suffix, key in (("_sum", "sum"), ("_count", "count"))])
+
+        # backups
+        backups = [
+            ({"world": world}, backup)
+            for world, backup in sorted(state.get("backups", {}).items())
+            ]
+        add("emsm_backup_last_timestamp_seconds", "gauge",
+            "Time of the last backup since unix epoch in seconds.",
+            [("", labels, backup.get("time")) for labels, backup in backups])
+        add("emsm_backup_last_size_bytes", "gauge",
+            "Size of the last backup archive in bytes.",
+            [("", labels, backup.get("size")) for labels, backup in backups])
+        add("emsm_backup_last_duration_seconds", "gauge",
+            "Time needed to create the last backup in seconds.",
+            [("", labels, backup.get("duration"))
+             for labels, backup in backups])
+        add("emsm_backups_total", "counter",
+            "Number of created backups.",
+            [("", labels, backup.get("count")) for labels, backup in backups])
+
+        # guard
+        add("emsm_guard_actions_total", "counter",
+            "Number of actions performed by the guard.",
+            [("", {"world": world, "action": action}, count)
+             for world, actions in sorted(state.get("guard_actions", {}).items())
+             for action, count in sorted(actions.items())])
+
+        # EMSM runs
+        runs = sorted(state.get("runs", {}).items())
+        add("emsm_run_duration_seconds", "summary",
+            "Duration of the EMSM runs in seconds.",
+            [(suffix, {"plugin": plugin}, run[key])
+             for plugin, run in runs
+             for suffix, key in (("_sum", "sum"), ("_count", "count"))])
+        add("emsm_run_last_timestamp_seconds", "gauge",
+            "End of the last EMSM run since unix epoch in seconds.",
+            [("", {"plugin": plugin}, run.get("last")) for plugin, run in runs])
+
+        lock_wait = state.get("lock_wait", {})
+        add("emsm_lock_wait_seconds", "summary",
+            "Time the EMSM runs waited for the file lock in seconds.",
+            [(suffix, {}, lock_wait.get(key))
+             for suffix, key in (("_sum", "sum"), ("_count", "count"))])
+        add("emsm_lock_last_wait_seconds", "gauge",
+            "Time the last EMSM run waited for the file lock in seconds.",
+            [("", {}, lock_wait.get("last"))])
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self):
+        """
+        Writes the metrics atomically to the :meth:`textfile`, so that the
+        collector never reads an incomplete file.
+        """
+        path = self.textfile()
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=".emsm.", suffix=".tmp", dir=os.path.dirname(path)
+                )
+            with os.fdopen(fd, "w") as file:
+                file.write(self.collect())
+
+            # The collector usually runs as another user.
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except OSError as err:
+            log.warning("could not write the metrics to '{}': {}"\
+                        .format(path, err))
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return None
+
+    # run
+    # --------------------------------------------
+
+    def _record_run(self):
+        """
+        Records the duration and the lock wait time of this EMSM run.
+        """
+        plugin = self.app().argparser().args().plugin or "none"
+        duration = time.monotonic() - self._start_time
+        lock_wait_time = self.app().lock_wait_time()
+
+        def update(state):
+            run = state.setdefault("runs", dict())\
+                  .setdefault(plugin, {"count": 0, "sum": 0})
+            run["count"] += 1
+            run["sum"] += duration
+            run["last"] = time.time()
+
+            if lock_wait_time is not None:
+                lock_wait = state.setdefault(
+                    "lock_wait", {"count": 0, "sum": 0}
+                    )
+                lock_wait["count"] += 1
+                lock_wait["sum"] += lock_wait_time
+                lock_wait["last"] = lock_wait_time
+            return None
+        self._update_state(update)
+        return None
+
+    def serve(self):
+        """
+        Serves the metrics over HTTP until SIGTERM or SIGINT is received.
+
+        The EMSM file lock is released while serving, so that other EMSM
+        commands can run in the meantime.
+        """
+        server = http.server.HTTPServer(
+            (self._address, self._port), MetricsRequestHandler
+            )
+        server.metrics = self
+        server.timeout = 0.5
+
+        stop = list()
+        def handle_signal(signum, frame):
+            stop.append(signum)
+            return None
+
+        old_handlers = {
+            signum: signal.signal(signum, handle_signal)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+            }
+
+        log.info("serving the metrics at 'http://{}:{}/metrics' ..."\
+                 .format(self._address, self._port))
+
+        lock = self.app().lock()
+        lock.release()
+        try:
+            while not stop:
+                server.handle_request()
+        finally:
+            server.server_close()
+            for signum, handler in old_handlers.items():
+                signal.signal(signum, handler)
+            # The application expects the lock to be held.
+            lock.acquire()
+
+        log.info("stopped serving the metrics.")
+        return None
+
+    def run(self, args):
+        """
+        """
+        self._invoked = True
+        if args.print:
+            print(self.collect(), end="")
+        if args.serve:
+            self.serve()
+        return None
+
+    def finish(self):
+        """
+        Records this EMSM run, if it modified the state or invoked this
+        plugin. The :meth:`textfile` is only updated, if this plugin has been
+        invoked, since the worlds and the processes are sampled for it.
+        """
+        if self._modified or self._invoked:
+            self._record_run()
+        if self._invoked:
+            self.write_textfile()
+        return None
@@ -45,6 +45,19 @@ Arguments
 .. option:: --list
 
     Prints the names of all server supported by the EMSM.
+
+.. option:: --install
+
+    Installs the selected server, if they are not installed yet. The server
+    are otherwise installed, when a world powered by them is started for the
+    first time.
+
+    The downloads are fetched concurrently and stored in the artifact cache
+    in :file:`server/.artifacts`, so that a server is never downloaded twice.
+    Set ``download_mirror`` in the ``[emsm]`` section of the
+    :file:`main.conf` to fetch the files from a mirror (``file://`` URLs
+    are supported). The files are only fetched from the mirror, if their
+    ``checksum`` is set in the :file:`server.conf`.
 """
 
 
@@ -57,6 +70,7 @@ import os
 # local
 import emsm
 from emsm.base_plugin import BasePlugin
+from emsm.server import ServerInstallationFailure
 
 
 # Data
@@ -103,12 +117,22 @@ class Server(BasePlugin):
             dest = "list",
             help = "Prints the names of all server supported by the EMSM."
             )
+
+        parser.add_argument(
+            "--install",
+            action = "count",
+            dest = "install",
+            help = "Installs the selected server, if they are not installed."
+            )
         return None
 
     def run(self, args):
         """
         ...
         """
+        if args.install:
+            self._install(self.app().server().get_selected())
+            
         for server in self.app().server().get_selected():            
             if args.usage:
                 self._print_usage(server)
@@ -117,6 +141,23 @@ class Server(BasePlugin):
             self._print_list()
         return None
 
+    def _install(self, servers):
+        """
+        Installs all *servers*, which are not installed yet.
+        """
+        results = self.app().server().install_all(servers)
+        for server in servers:
+            result = results[server]
+            
+            print("server - {} - install:".format(server.name()))
+            if isinstance(result, ServerInstallationFailure):
+                print("\t", "failure:", result)
+            elif result:
+                print("\t", "installed.")
+            else:
+                print("\t", "already installed.")
+        return None
+
     def _print_usage(self, server):
         """
         Prints all worlds that are powered by the *server*.
@@ -147,10 +188,14 @@ class Server(BasePlugin):
         """
         Prints a list with the names of all available server.
         """
-        names = self.app().server().get_names()
+        server_manager = self.app().server()
+        names = server_manager.get_names()
         names.sort()
 
         print("server - list:")
         for name in names:
-            print("\t", name)
+            if server_manager.get(name).is_installed():
+                print("\t", name, "(installed)")
+            else:
+                print("\t", name)
         return None
@@ -89,6 +89,33 @@ Arguments
 
     Limits the number of printed lines.
    
+.. option:: --follow
+
+    Follows the logs of all selected worlds and prints new lines prefixed
+    with the name of the world, until the command is interrupted with
+    *Ctrl+C*. Rotated logs are followed too.
+
+.. option:: --follow-filter REGEX
+
+    Only lines matching the regular expression are printed by
+    ``--follow``.
+
+.. option:: --search REGEX
+
+    Searches the current and the rotated (gzipped) logs of the selected
+    worlds and prints the matching lines. The files are searched in
+    parallel.
+
+.. option:: --since DATE
+
+    Only logs, which may contain lines after *DATE*, are searched by
+    ``--search``. *DATE* has the format ``YYYY-MM-DD[ HH:MM[:SS]]``.
+
+.. option:: --until DATE
+
+    Only logs, which may contain lines before *DATE*, are searched by
+    ``--search``.
+
 .. option:: --pid
 
     Prints the PID of the screen session that runs the server.
@@ -96,6 +123,11 @@ Arguments
 .. option:: --status
 
     Prints the status of the world (online or offline).
+
+.. option:: --stats
+
+    Prints the resource usage of the server process: cpu usage, memory
+    (rss), threads, open file descriptors, io rates and uptime.
    
 .. option:: --send CMD
 
@@ -173,6 +205,12 @@ Examples
     $ minecraft -w foo worlds --log-start '"-20"'
     $ minecraft -w foo worlds --log-limit '"5"'
     $ minecraft -w foo worlds --log-start '"-50'" --log-limit 10
+
+    # Follow the logs of all worlds and only print warnings:
+    $ minecraft -W worlds --follow --follow-filter WARN
+
+    # Search the logs of all worlds since the 20th May:
+    $ minecraft -W worlds --search "Can't keep up" --since 2014-05-20
    
     # Open the console of a running world
     $ minecraft -w bar worlds --console
@@ -187,11 +225,17 @@ Examples
 # std
 import os
 import sys
+import re
 import time
+import datetime
+import argparse
+import itertools
 
 # emsm
 import emsm
 from emsm.base_plugin import BasePlugin
+from emsm.lib import logtail
+from emsm.lib import logsearch
 
 
 # Data
@@ -268,16 +312,13 @@ class MyWorld(object):
             >>> ...
 
         See also:
-            * WorldWrapper.latest_log()
+            * WorldWrapper.iter_latest_log()
         """
-        log = self._world.latest_log()
-        log = log.split("\n")
-        
+        num_lines = self._world.log_index().num_lines()
+
         # Make sure that the limits are valid.
         # 0 <= start <= size
         # limit <= size - start
-        num_lines = len(log)
-        
         if start_line >= 0:
             start_line = min(start_line, num_lines)
         else:
@@ -290,11 +331,22 @@ class MyWorld(object):
         else:
             end_line = num_lines
 
+        # Only the requested lines are read. If they are closer to the end
+        # of the log, the log is read backwards.
+        if start_line <= num_lines - end_line:
+            log = self._world.iter_latest_log()
+            log = itertools.islice(log, start_line, end_line)
+        else:
+            log = self._world.iter_latest_log(reverse=True)
+            log = itertools.islice(log, num_lines - end_line,
+                                   num_lines - start_line)
+            log = reversed(list(log))
+
         # Print the log section.
         print("{} - latest-log - line {}-{}/{}:"\
               .format(self._world.name(), start_line, end_line, num_lines))
-        for line in range(start_line, end_line):
-            print("\t", log[line])
+        for line in log:
+            print("\t", line)
         return None
 
     def print_pids(self):
@@ -326,6 +378,33 @@ class MyWorld(object):
             print("\t", "offline")
         return None
 
+    def print_stats(self, usage):
+        """
+        Prints the resource *usage* of the server process.
+
+        See also:
+            * WorldManager.resource_usage()
+        """
+        print("{} - stats:".format(self._world.name()))
+        if usage is None:
+            print("\t", "offline")
+            return None
+
+        def rate(value):
+            return "-" if value is None else "{:.1f} KiB/s".format(value/1024)
+
+        uptime = int(usage.uptime())
+        print("\t", "pid:    ", usage.pid())
+        print("\t", "cpu:    ", "{:.1f}%".format(usage.cpu_percent()))
+        print("\t", "rss:    ", "{:.1f} MiB".format(usage.rss()/2**20))
+        print("\t", "threads:", usage.threads())
+        print("\t", "fds:    ", "-" if usage.fds() is None else usage.fds())
+        print("\t", "read:   ", rate(usage.read_rate()))
+        print("\t", "write:  ", rate(usage.write_rate()))
+        print("\t", "uptime: ", "{}d {:02}:{:02}:{:02}".format(
+            uptime//86400, uptime//3600%24, uptime//60%60, uptime%60))
+        return None
+
     def send_command(self, cmd):
         """
         Sends the command *cmd* to the server.
@@ -390,7 +469,7 @@ class MyWorld(object):
         """
         if self._world.is_online():
             print("{} - console:".format(self._world.name()))
-            print("\t", "NOTE: Press [ctrl + a + d] to detach from the console.")
+            print("\t", self._world.backend().DETACH_HINT)
             print("\t", "WARNING: When you stop the server in the session, "\
                         "EMSM may behave not as expected.")
             time.sleep(delay)
@@ -594,6 +673,46 @@ class Worlds(BasePlugin):
             help = "The number of lines that will be printed."
             )
 
+        parser.add_argument(
+            "--follow",
+            action = "count",
+            dest = "follow",
+            help = "Follows the logs of all selected worlds."
+            )
+        parser.add_argument(
+            "--follow-filter",
+            action = "store",
+            dest = "follow_filter",
+            metavar = "REGEX",
+            type = self._regex,
+            help = "Only lines matching the regex are printed by --follow."
+            )
+
+        parser.add_argument(
+            "--search",
+            action = "store",
+            dest = "search",
+            metavar = "REGEX",
+            type = self._regex,
+            help = "Searches the current and the rotated logs."
+            )
+        parser.add_argument(
+            "--since",
+            action = "store",
+            dest = "since",
+            metavar = "DATE",
+            type = self._date,
+            help = "Only searches logs after DATE (YYYY-MM-DD[ HH:MM[:SS]])."
+            )
+        parser.add_argument(
+            "--until",
+            action = "store",
+            dest = "until",
+            metavar = "DATE",
+            type = self._date,
+            help = "Only searches logs before DATE (YYYY-MM-DD[ HH:MM[:SS]])."
+            )
+
         parser.add_argument(
             "--pid",
             action = "count",
@@ -606,6 +725,12 @@ class Worlds(BasePlugin):
             dest = "status",
             help = "Prints the status of the world."
             )
+        parser.add_argument(
+            "--stats",
+            action = "count",
+            dest = "stats",
+            help = "Prints the resource usage of the server process."
+            )
         
         # XXX: I need a name for those group
         # of arguments.
@@ -684,10 +809,100 @@ class Worlds(BasePlugin):
             )
         return None    
 
+    @staticmethod
+    def _regex(pattern):
+        """
+        Compiles the regex *pattern* for the argparser.
+        """
+        try:
+            return re.compile(pattern)
+        except re.error as err:
+            raise argparse.ArgumentTypeError(
+                "invalid regex '{}': {}".format(pattern, err)
+                )
+
+    @staticmethod
+    def _date(value):
+        """
+        Parses the date *value* for the argparser.
+        """
+        for date_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+            try:
+                return datetime.datetime.strptime(value, date_format)
+            except ValueError:
+                pass
+        raise argparse.ArgumentTypeError(
+            "invalid date '{}', expected YYYY-MM-DD[ HH:MM[:SS]]".format(value)
+            )
+
+    def search_logs(self, worlds, regex, since=None, until=None):
+        """
+        Prints the lines in the current and the rotated logs of the *worlds*,
+        that match the *regex*. If *until* is a date without time, the whole
+        day is included.
+
+        See also:
+            * emsm.lib.logsearch.search()
+        """
+        if until is not None and until.time() == datetime.time():
+            until += datetime.timedelta(days=1)
+
+        logs = [
+            (world.name(), logsearch.select_logs(world.log_path(), since, until))
+            for world in worlds
+            ]
+        matches = logsearch.search(
+            logs, regex.pattern, regex.flags, since, until
+            )
+        try:
+            for name, path, lineno, line in matches:
+                print("{} - {}:{}: {}"\
+                      .format(name, os.path.basename(path), lineno, line))
+        except KeyboardInterrupt:
+            pass
+        return None
+
+    def follow_logs(self, worlds, filter_re=None):
+        """
+        Prints the lines, that are appended to the logs of the *worlds*,
+        prefixed with the name of the world, until the user interrupts it.
+
+        All logs are followed with one inotify instance, so that the
+        process sleeps until one of the logs changes.
+
+        See also:
+            * emsm.lib.logtail.MultiTail
+        """
+        # The last, incomplete line of each log.
+        rest = dict()
+        with logtail.MultiTail() as tail:
+            for world in worlds:
+                tail.add(world.name(), world.log_path())
+                rest[world.name()] = str()
+
+            try:
+                while True:
+                    tail.wait()
+                    for name, data in tail.read():
+                        lines = (rest[name] + data).split("\n")
+                        rest[name] = lines.pop()
+                        for line in lines:
+                            if filter_re is None or filter_re.search(line):
+                                print(name, "-", line)
+                    sys.stdout.flush()
+            except KeyboardInterrupt:
+                pass
+        return None
+
     def run(self, args):
         """
         """
         worlds = self.app().worlds().get_selected()
+
+        # The resource usage of all worlds is sampled at once.
+        if args.stats:
+            usage = self.app().worlds().resource_usage(worlds)
+
         for world in worlds:
             world = MyWorld(self.app, world)
 
@@ -716,6 +931,9 @@ class Worlds(BasePlugin):
             if args.status:
                 world.print_status()
 
+            if args.stats:
+                world.print_stats(usage[world.world().name()])
+
             # send / screen / ...
             if args.send:
                 world.send_command(args.send)
@@ -742,4 +960,9 @@ class Worlds(BasePlugin):
             # Setup
             if args.uninstall:
                 world.uninstall()
+
+        if args.search is not None:
+            self.search_logs(worlds, args.search, args.since, args.until)
+        if args.follow or args.follow_filter is not None:
+            self.follow_logs(worlds, args.follow_filter)
         return None
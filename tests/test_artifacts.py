@@ -0,0 +1,255 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Tests for :mod:`emsm.lib.artifacts` with a ``file://`` mirror and a local
+HTTP server, so that no network access is needed.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import http.server
+import urllib.request
+
+# local
+from emsm.lib import artifacts
+
+
+# Data
+# ------------------------------------------------
+
+#: The original location of the test file. It is never contacted, since the
+#: file is always fetched from the mirror.
+URL = "https://example.invalid/versions/server.jar"
+
+CONTENT = b"minecraft server " * 10000
+
+
+# Classes
+# ------------------------------------------------
+
+class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves :data:`CONTENT` for all paths and answers range requests with
+    *206 Partial Content*. The received range headers are recorded in the
+    *ranges* list of the server.
+    """
+
+    def do_GET(self):
+        offset = 0
+        header = self.headers.get("Range")
+        self.server.ranges.append(header)
+        if header is not None:
+            offset = int(header[len("bytes="):].rstrip("-"))
+
+        self.send_response(206 if offset else 200)
+        self.send_header("Content-Length", str(len(CONTENT) - offset))
+        self.end_headers()
+        self.wfile.write(CONTENT[offset:])
+        return None
+
+    def log_message(self, *args):
+        return None
+
+
+class ArtifactCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self._tmp.name, "cache")
+
+        # The mirror serves the file by its name.
+        self.mirror_dir = os.path.join(self._tmp.name, "mirror")
+        os.makedirs(self.mirror_dir)
+        with open(os.path.join(self.mirror_dir, "server.jar"), "wb") as file:
+            file.write(CONTENT)
+        self.mirror = "file://" + self.mirror_dir
+
+        self.sha1 = "sha1:" + hashlib.sha1(CONTENT).hexdigest()
+        self.sha256 = hashlib.sha256(CONTENT).hexdigest()
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _cache(self, mirror=None):
+        return artifacts.ArtifactCache(self.cache_dir, mirror or self.mirror)
+
+    def _read(self, path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    def test_checksum_match(self):
+        cache = self._cache()
+        path = cache.fetch(URL, self.sha1)
+        self.assertEqual(path, cache.object_path(self.sha256))
+        self.assertEqual(self._read(path), CONTENT)
+
+        # The second fetch is served by the cache.
+        os.remove(os.path.join(self.mirror_dir, "server.jar"))
+        self.assertEqual(self._cache().fetch(URL, self.sha1), path)
+        return None
+
+    def test_checksum_mismatch(self):
+        cache = self._cache()
+        checksum = "sha1:" + "0"*40
+        with self.assertRaises(artifacts.ChecksumError):
+            cache.fetch(URL, checksum)
+
+        # The bad file is discarded and not added to the index.
+        self.assertEqual(os.listdir(os.path.join(self.cache_dir, "objects")), [])
+        self.assertEqual(os.listdir(os.path.join(self.cache_dir, "partial")), [])
+        self.assertIsNone(cache.lookup(URL))
+        return None
+
+    def test_missing_checksum(self):
+        cache = self._cache()
+        with self.assertRaises(artifacts.MissingChecksumError):
+            cache.fetch(URL)
+        self.assertFalse(os.path.exists(self.cache_dir))
+        return None
+
+    def test_checksum_url(self):
+        # The checksum file is fetched from its original location and not
+        # from the mirror.
+        sha1_path = os.path.join(self._tmp.name, "server.jar.sha1")
+        with open(sha1_path, "w") as file:
+            file.write(self.sha1[len("sha1:"):] + "  server.jar\n")
+
+        cache = self._cache()
+        path = cache.fetch(URL, "file://" + sha1_path)
+        self.assertEqual(self._read(path), CONTENT)
+
+        with open(sha1_path, "w") as file:
+            file.write("0"*40)
+        with self.assertRaises(artifacts.ChecksumError):
+            self._cache().fetch(
+                "https://example.invalid/v2/server.jar", "file://" + sha1_path
+                )
+        return None
+
+    def test_resume(self):
+        server = http.server.HTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+        server.ranges = list()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            mirror = "http://127.0.0.1:{}/".format(server.server_port)
+            cache = self._cache(mirror)
+
+            # Simulate an interrupted download.
+            part_path = cache._partial_path(URL)
+            os.makedirs(os.path.dirname(part_path))
+            with open(part_path, "wb") as file:
+                file.write(CONTENT[:1000])
+
+            path = cache.fetch(URL, self.sha1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(server.ranges, ["bytes=1000-"])
+        self.assertEqual(self._read(path), CONTENT)
+        self.assertFalse(os.path.exists(part_path))
+        return None
+
+    def test_restart_without_range_support(self):
+        # file:// URLs always deliver the whole file, so the partial
+        # download is overwritten.
+        cache = self._cache()
+        part_path = cache._partial_path(URL)
+        os.makedirs(os.path.dirname(part_path))
+        with open(part_path, "wb") as file:
+            file.write(b"garbage")
+
+        path = cache.fetch(URL, self.sha1)
+        self.assertEqual(self._read(path), CONTENT)
+        return None
+
+    def test_index_is_replaced_atomically(self):
+        cache = self._cache()
+        cache.fetch(URL, self.sha1)
+
+        index_path = os.path.join(self.cache_dir, "index.json")
+        with open(index_path) as file:
+            index = json.load(file)
+        self.assertEqual(index[URL]["sha256"], self.sha256)
+
+        # A failed write does not touch the index and leaves no temporary
+        # file behind.
+        other = CONTENT + b"other"
+        with open(os.path.join(self.mirror_dir, "other.jar"), "wb") as file:
+            file.write(other)
+        with unittest.mock.patch.object(
+            artifacts.json, "dump", side_effect=OSError("disk full")
+            ):
+            with self.assertRaises(OSError):
+                cache.fetch(
+                    "https://example.invalid/other.jar",
+                    "sha1:" + hashlib.sha1(other).hexdigest()
+                    )
+
+        with open(index_path) as file:
+            self.assertEqual(json.load(file), index)
+        self.assertEqual(
+            sorted(os.listdir(self.cache_dir)),
+            ["index.json", "objects", "partial"]
+            )
+        return None
+
+    def test_unique_index_tmp_file(self):
+        cache = self._cache()
+        cache._load_index()
+        os.makedirs(self.cache_dir)
+
+        tmp_paths = list()
+        mkstemp = tempfile.mkstemp
+        def record_mkstemp(*args, **kargs):
+            fd, path = mkstemp(*args, **kargs)
+            tmp_paths.append(path)
+            return (fd, path)
+
+        with unittest.mock.patch.object(
+            artifacts.tempfile, "mkstemp", side_effect=record_mkstemp
+            ):
+            cache._save_index()
+            cache._save_index()
+
+        self.assertEqual(len(set(tmp_paths)), 2)
+        for path in tmp_paths:
+            self.assertEqual(os.path.dirname(path), self.cache_dir)
+            self.assertFalse(os.path.exists(path))
+        return None
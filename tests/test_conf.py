@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+Tests for :mod:`emsm.conf`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import tempfile
+import configparser
+import unittest
+import unittest.mock
+
+# local
+from emsm import conf
+
+
+# Classes
+# ------------------------------------------------
+
+class DirtyTrackingTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "main.conf")
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _conf(self):
+        main = conf.MainConfiguration(self.path)
+        main.read()
+        return main
+
+    def _write_file(self, data):
+        with open(self.path, "w") as file:
+            file.write(data)
+        return None
+
+    def test_missing_file(self):
+        main = self._conf()
+        self.assertTrue(main.is_dirty())
+        self.assertTrue(main.write())
+        self.assertFalse(main.is_dirty())
+        self.assertTrue(os.path.exists(self.path))
+        return None
+
+    def test_no_write_when_unchanged(self):
+        self._conf().write()
+        mtime = os.stat(self.path).st_mtime_ns
+
+        main = self._conf()
+        self.assertFalse(main.is_dirty())
+
+        # Setting the same value does not modify the configuration.
+        main["emsm"]["user"] = "minecraft"
+        self.assertFalse(main.is_dirty())
+
+        with unittest.mock.patch("os.replace") as replace:
+            self.assertFalse(main.write())
+        replace.assert_not_called()
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+        return None
+
+    def test_write_after_set(self):
+        self._conf().write()
+
+        main = self._conf()
+        main["emsm"]["user"] = "foo"
+        self.assertTrue(main.is_dirty())
+        self.assertTrue(main.write())
+        self.assertFalse(main.is_dirty())
+
+        self.assertEqual(self._conf()["emsm"]["user"], "foo")
+        return None
+
+    def test_write_after_section_changes(self):
+        self._conf().write()
+
+        main = self._conf()
+        main.add_section("foo")
+        self.assertTrue(main.write())
+
+        main = self._conf()
+        self.assertFalse(main.remove_option("foo", "bar"))
+        self.assertFalse(main.is_dirty())
+        self.assertTrue(main.remove_section("foo"))
+        self.assertTrue(main.is_dirty())
+        return None
+
+    def test_restore_missing_defaults(self):
+        # The file of an older version without the *download_mirror* option.
+        self._write_file("[emsm]\nuser = foo\ntimeout = 0\n")
+
+        main = self._conf()
+        self.assertEqual(main["emsm"]["user"], "foo")
+        self.assertEqual(main["emsm"]["download_mirror"], "")
+        self.assertTrue(main.is_dirty())
+        self.assertTrue(main.write())
+
+        with open(self.path) as file:
+            self.assertIn("download_mirror", file.read())
+        self.assertFalse(self._conf().is_dirty())
+        return None
+
+    def test_skip_read_when_unchanged(self):
+        self._conf().write()
+        main = self._conf()
+        main["emsm"]["user"] = "foo"
+
+        # The file has not been modified, so it's not read again and the
+        # modification is kept.
+        with unittest.mock.patch.object(
+            configparser.ConfigParser, "read_file"
+            ) as read_file:
+            main.read()
+        read_file.assert_not_called()
+        self.assertEqual(main["emsm"]["user"], "foo")
+
+        # The file has been modified by the user.
+        self._write_file("[emsm]\nuser = bar\ntimeout = 0\n")
+        main.read()
+        self.assertEqual(main["emsm"]["user"], "bar")
+        return None
+
+    def test_interrupted_write(self):
+        main = self._conf()
+        with unittest.mock.patch("os.replace", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                main.write()
+
+        # The temporary file is removed and the configuration is still
+        # marked as modified.
+        self.assertEqual(os.listdir(self._tmp.name), [])
+        self.assertTrue(main.is_dirty())
+        return None
@@ -0,0 +1,431 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Tests the lag detection, the restart backoff and the daemon of the guard in
+:mod:`plugins.guard`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import re
+import time
+import asyncio
+import datetime
+import tempfile
+import threading
+import unittest
+import importlib.util
+import contextlib
+import io
+import concurrent.futures
+
+# local
+import emsm
+
+
+# Data
+# ------------------------------------------------
+
+GUARD_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "plugins", "guard.py"
+    )
+
+
+# Functions
+# ------------------------------------------------
+
+def _import_guard():
+    """
+    Imports the guard plugin, which is not part of a package.
+    """
+    spec = importlib.util.spec_from_file_location("guard", GUARD_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+guard = _import_guard()
+
+
+def _new_guard():
+    """
+    Returns a guard, which is not initialised with an application. Only the
+    attributes used in the tests are set, the states are not saved.
+    """
+    plugin = guard.Guard.__new__(guard.Guard)
+    plugin._state_lock = threading.RLock()
+    plugin._cursors = dict()
+    plugin._lag = dict()
+    plugin._restarts = dict()
+    plugin._error_re = re.compile(r".*\[SEVERE\].*")
+    plugin._lag_threshold = 200
+    plugin._lag_window = 300
+    plugin._restart_backoff = 60
+    plugin._restart_backoff_max = 3600
+    plugin._crash_loop_restarts = 3
+    plugin._crash_loop_window = 3600
+    return plugin
+
+
+# Classes
+# ------------------------------------------------
+
+class FakeWorld(object):
+    """
+    A world, which is online with the pid *1234*.
+    """
+
+    def __init__(self):
+        self._pids = [1234]
+        return None
+
+    def name(self):
+        return "foo"
+
+    def pids(self, cache=True):
+        return list(self._pids)
+
+    def latest_log_offset(self):
+        return 0
+
+
+class FakeLock(object):
+    """
+    An application lock, which calls *on_acquire* before it is acquired,
+    like an EMSM command, which held the lock in the meantime.
+    """
+
+    def __init__(self, on_acquire):
+        self._on_acquire = on_acquire
+        return None
+
+    async def acquire(self):
+        self._on_acquire()
+        return None
+
+    async def release(self):
+        return None
+
+
+class LogWorld(FakeWorld):
+    """
+    A world with a log file.
+    """
+
+    def __init__(self, log_path):
+        FakeWorld.__init__(self)
+        self._log_path = log_path
+        return None
+
+    def log_path(self):
+        return self._log_path
+
+
+class LagTest(unittest.TestCase):
+    """
+    Tests the detection of the "Can't keep up!" messages.
+    """
+
+    LINE = "[13:37:00] [Server thread/WARN]: Can't keep up! Is the server "\
+           "overloaded? Running 5000ms or 100 ticks behind"
+
+    OLD_LINE = "2014-05-20 13:37:00 [WARNING] Can't keep up! Did the system "\
+               "time change, or is the server overloaded? Running 2500ms or "\
+               "50 ticks behind"
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.world = LogWorld(os.path.join(self._tmp.name, "latest.log"))
+        self.guard = _new_guard()
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _append(self, *lines):
+        with open(self.world.log_path(), "a") as file:
+            for line in lines:
+                file.write(line + "\n")
+        return None
+
+    def test_lag_re(self):
+        match = guard.LAG_RE.search(self.OLD_LINE)
+        self.assertEqual(match.group("ms"), "2500")
+        self.assertEqual(match.group("ticks"), "50")
+        self.assertIsNone(guard.LAG_RE.search("[13:37:00] Can't keep up!"))
+        return None
+
+    def test_line_timestamp(self):
+        now = datetime.datetime(2014, 5, 20, 14, 0, 0)
+
+        # Only the time: the line is from the last 24 hours.
+        self.assertEqual(
+            guard._line_timestamp("[13:37:00] foo", now),
+            datetime.datetime(2014, 5, 20, 13, 37, 0).timestamp()
+            )
+        self.assertEqual(
+            guard._line_timestamp("[15:00:00] foo", now),
+            datetime.datetime(2014, 5, 19, 15, 0, 0).timestamp()
+            )
+
+        # Date and time.
+        self.assertEqual(
+            guard._line_timestamp("2014-05-18 13:37:00 [INFO] foo", now),
+            datetime.datetime(2014, 5, 18, 13, 37, 0).timestamp()
+            )
+
+        # No or an invalid timestamp.
+        self.assertEqual(guard._line_timestamp("foo", now), now.timestamp())
+        self.assertEqual(
+            guard._line_timestamp("[25:00:00] foo", now), now.timestamp()
+            )
+        return None
+
+    def test_record_lag_window(self):
+        now = time.time()
+        self.guard._lag[self.world.name()] = [[now - 400, 1000]]
+
+        # The old lag event is outside of the window.
+        rate = self.guard._record_lag(self.world, [(now - 10, 500)])
+        self.assertEqual(rate, 500*60/300)
+        self.assertEqual(self.guard._lag[self.world.name()], [[now - 10, 500]])
+
+        # The window is removed, when all events expired.
+        self.guard._lag_window = 5
+        self.assertEqual(self.guard._record_lag(self.world, []), 0)
+        self.assertNotIn(self.world.name(), self.guard._lag)
+        return None
+
+    def test_diagnose_threshold(self):
+        self.guard._world_in_trouble = lambda world: False
+        now = time.time()
+
+        # 200 ticks per minute are not above the threshold.
+        self.guard._lag[self.world.name()] = [[now, 1000]]
+        self.assertIsNone(self.guard.diagnose(self.world))
+
+        self.guard._lag[self.world.name()] = [[now, 1001]]
+        self.assertEqual(self.guard.diagnose(self.world), "lag")
+        return None
+
+    def test_first_scan_ignores_lag(self):
+        # The lag of a long running session is in the log, when the world is
+        # checked the first time.
+        self._append(self.LINE, self.LINE)
+        errors, lags = self.guard._scan_new_log(self.world)
+        self.assertEqual(lags, [])
+
+        # Only the new lines are checked with the next scan.
+        self._append(self.LINE, "[13:37:01] [SEVERE] foo")
+        errors, lags = self.guard._scan_new_log(self.world)
+        self.assertEqual(len(lags), 1)
+        self.assertEqual(lags[0][1], 100)
+        self.assertEqual(errors, ["[13:37:01] [SEVERE] foo"])
+
+        errors, lags = self.guard._scan_new_log(self.world)
+        self.assertEqual((errors, lags), ([], []))
+        return None
+
+
+class RestartWorld(FakeWorld):
+    """
+    A world, which records its restarts. If *fail* is true, the restart
+    fails.
+    """
+
+    def __init__(self, fail=False):
+        FakeWorld.__init__(self)
+        self.fail = fail
+        self.restarts = 0
+        return None
+
+    def restart(self, force_restart=False):
+        self.restarts += 1
+        if self.fail:
+            raise emsm.worlds.WorldStartFailed(self)
+        return None
+
+
+class RestartTest(unittest.TestCase):
+    """
+    Tests the restart backoff and the crash loop detection.
+    """
+
+    def setUp(self):
+        self.guard = _new_guard()
+        self.world = RestartWorld()
+        return None
+
+    def _history(self, *ages):
+        """
+        Sets the restart history of the world to restarts, which are *ages*
+        seconds old.
+        """
+        now = time.time()
+        self.guard._restarts[self.world.name()] = {
+            "restarts": [
+                {"time": now - age, "reason": "error", "error": None}
+                for age in ages
+                ],
+            "crash_loop": False
+            }
+        return None
+
+    def test_backoff(self):
+        self.assertEqual(self.guard.restart_delay(self.world), 0)
+        self.assertTrue(self.guard.restart(self.world, "error"))
+        self.assertEqual(self.world.restarts, 1)
+
+        # The next restart is delayed.
+        self.assertAlmostEqual(
+            self.guard.restart_delay(self.world), 60, delta=1
+            )
+        self.assertFalse(self.guard.restart(self.world, "error"))
+        self.assertEqual(self.world.restarts, 1)
+        return None
+
+    def test_exponential_backoff(self):
+        # The delay doubles with each restart in the window.
+        self._history(100, 90)
+        self.assertAlmostEqual(
+            self.guard.restart_delay(self.world), 120 - 90, delta=1
+            )
+
+        # ... but does not exceed the maximum.
+        self.guard._crash_loop_restarts = 20
+        self._history(*range(10, 0, -1))
+        self.assertAlmostEqual(
+            self.guard.restart_delay(self.world), 3600 - 1, delta=1
+            )
+
+        # Restarts, which are older than the window, are forgotten.
+        self._history(4000, 3900)
+        self.assertEqual(self.guard.restart_delay(self.world), 0)
+        self.assertEqual(
+            self.guard._restarts[self.world.name()]["restarts"], []
+            )
+        return None
+
+    def test_crash_loop(self):
+        self._history(1000, 500)
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.assertTrue(self.guard.restart(self.world, "error"))
+        self.assertIn("crash-looping", stderr.getvalue())
+
+        history = self.guard._restarts[self.world.name()]
+        self.assertTrue(history["crash_loop"])
+        self.assertIsNone(self.guard.restart_delay(self.world))
+
+        # The world is not restarted anymore.
+        self.assertFalse(self.guard.restart(self.world, "error"))
+        self.assertEqual(self.world.restarts, 1)
+        return None
+
+    def test_failed_restart(self):
+        self.world.fail = True
+        self.assertFalse(self.guard.restart(self.world, "lag"))
+        restart, = self.guard._restarts[self.world.name()]["restarts"]
+        self.assertEqual(restart["reason"], "lag")
+        self.assertTrue(restart["error"])
+        return None
+
+    def test_reset(self):
+        self._history(1000, 500, 10)
+        self.guard._restarts[self.world.name()]["crash_loop"] = True
+        self.guard.reset(self.world)
+
+        self.assertEqual(self.guard.restart_delay(self.world), 0)
+        self.assertTrue(self.guard.restart(self.world, "error"))
+        return None
+
+
+class DaemonTest(unittest.TestCase):
+    """
+    Tests :meth:`guard.Guard._watch_world`.
+    """
+
+    def setUp(self):
+        # The plugin is not initialised with an application, only the
+        # attributes used by the daemon are set.
+        self.guard = guard.Guard.__new__(guard.Guard)
+        self.guard._daemon_interval = 0.01
+        self.guard._state_lock = threading.RLock()
+        self.guard._save_states = lambda: None
+        self.guard.diagnose = lambda world: "error"
+
+        self.reactions = list()
+        self.guard.react = lambda world, diagnosis: \
+                           self.reactions.append(diagnosis)
+
+        self.world = FakeWorld()
+        return None
+
+    def _watch(self, on_acquire):
+        """
+        Runs one check of the world. *on_acquire* is called, when the daemon
+        acquires the application lock for the reaction.
+        """
+        async def watch():
+            stop = asyncio.Event()
+            def acquired():
+                on_acquire()
+                stop.set()
+            lock = FakeLock(acquired)
+            with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                await self.guard._watch_world(
+                    self.world, stop, lock, executor
+                    )
+            return None
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(asyncio.wait_for(watch(), 5))
+        finally:
+            loop.close()
+        return None
+
+    def test_react(self):
+        self._watch(lambda: None)
+        self.assertEqual(self.reactions, ["error"])
+        return None
+
+    def test_stopped_before_reaction(self):
+        # The world is stopped by another command between the check and the
+        # reaction.
+        self._watch(lambda: self.world._pids.clear())
+        self.assertEqual(self.reactions, [])
+        return None
+
+    def test_restarted_before_reaction(self):
+        self._watch(lambda: self.world._pids.__setitem__(0, 5678))
+        self.assertEqual(self.reactions, [])
+        return None
+
@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+Tests for :mod:`emsm.lib.logindex`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+# local
+from emsm.lib import logindex
+
+
+# Data
+# ------------------------------------------------
+
+START_RE = r"\[[\d:]+\] \[Server thread/INFO\]: Starting minecraft server"
+
+START = "[12:00:00] [Server thread/INFO]: Starting minecraft server\n"
+LINE = "[12:00:01] [Server thread/INFO]: Done\n"
+
+
+# Classes
+# ------------------------------------------------
+
+class LogIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self._tmp.name, "logs", "latest.log")
+        self.index_path = os.path.join(
+            self._tmp.name, "data", "foo", "latest.log.index"
+            )
+        os.makedirs(os.path.dirname(self.log_path))
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _write(self, data, mode="a"):
+        with open(self.log_path, mode) as file:
+            file.write(data)
+        return None
+
+    def _index(self):
+        return logindex.LogIndex(self.log_path, START_RE, self.index_path)
+
+    def _update(self, index):
+        """
+        Updates the *index* and returns ``True``, if it has been rebuilt.
+        """
+        with unittest.mock.patch.object(
+            index, "_rebuild", wraps=index._rebuild
+            ) as rebuild:
+            index.update()
+        return rebuild.called
+
+    def test_sidecar_path(self):
+        self._write(START)
+        index = self._index()
+        index.update()
+
+        # The sidecar is not stored in the log directory of the server.
+        self.assertTrue(os.path.isfile(self.index_path))
+        self.assertEqual(
+            os.listdir(os.path.dirname(self.log_path)), ["latest.log"]
+            )
+        return None
+
+    def test_incremental(self):
+        self._write(LINE + START + LINE)
+        index = self._index()
+        self.assertTrue(self._update(index))
+        self.assertEqual(index.starts(), [len(LINE)])
+        self.assertEqual(index.num_lines(), 2)
+
+        # Only the appended bytes are scanned.
+        size = os.path.getsize(self.log_path)
+        self._write(LINE + START + LINE)
+        with unittest.mock.patch.object(
+            index, "_scan", wraps=index._scan
+            ) as scan:
+            self.assertFalse(self._update(index))
+        self.assertEqual(scan.call_args[0][1], size)
+        self.assertEqual(index.starts(), [len(LINE), size + len(LINE)])
+        self.assertEqual(index.last_start(), size + len(LINE))
+        self.assertEqual(index.num_lines(), 2)
+
+        # An incomplete last line is scanned, when it is completed.
+        self._write("[12:00:02] [Server")
+        self.assertFalse(self._update(index))
+        self.assertEqual(index.num_lines(), 3)
+        self.assertEqual(index.scanned(), size*2)
+        self._write(" thread/INFO]: foo\n")
+        self.assertFalse(self._update(index))
+        self.assertEqual(index.num_lines(), 3)
+        self.assertEqual(index.scanned(), os.path.getsize(self.log_path))
+
+        # A new instance continues with the saved index.
+        index = self._index()
+        self._write(LINE)
+        self.assertFalse(self._update(index))
+        self.assertEqual(index.starts(), [len(LINE), size + len(LINE)])
+        self.assertEqual(index.num_lines(), 4)
+        return None
+
+    def test_truncation(self):
+        self._write(START + LINE*10)
+        index = self._index()
+        index.update()
+
+        self._write(LINE + START, mode="w")
+        self.assertTrue(self._update(index))
+        self.assertEqual(index.starts(), [len(LINE)])
+        self.assertEqual(index.num_lines(), 1)
+        return None
+
+    def test_rotation(self):
+        self._write(START + LINE)
+        index = self._index()
+        index.update()
+
+        os.rename(self.log_path, self.log_path + ".1")
+        self._write(LINE*3 + START + LINE*5)
+        self.assertTrue(self._update(index))
+        self.assertEqual(index.starts(), [len(LINE)*3])
+        self.assertEqual(index.num_lines(), 6)
+        return None
+
+    def test_checksum_mismatch(self):
+        self._write(START + LINE)
+        index = self._index()
+        index.update()
+
+        # The file is truncated and rewritten with more content in place
+        # (same inode), so only the checksum of the scanned bytes differs.
+        data = LINE.replace("Done", "Gone") + LINE + START
+        with open(self.log_path, "r+") as file:
+            file.write(data)
+        self.assertTrue(self._update(index))
+        self.assertEqual(index.starts(), [len(LINE)*2])
+        self.assertEqual(index.num_lines(), 1)
+        return None
+
+    def test_invalid_sidecar(self):
+        self._write(START + LINE)
+        os.makedirs(os.path.dirname(self.index_path))
+        with open(self.index_path, "w") as file:
+            file.write("{not json")
+
+        index = self._index()
+        self.assertTrue(self._update(index))
+        self.assertEqual(index.starts(), [0])
+        return None
+
+    def test_missing_log(self):
+        index = self._index()
+        index.update()
+        self.assertEqual(index.starts(), [])
+        self.assertEqual(index.last_start(), 0)
+        self.assertEqual(index.num_lines(), 0)
+        return None
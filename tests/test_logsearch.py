@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Tests for :mod:`emsm.lib.logsearch`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import gzip
+import datetime
+import tempfile
+import unittest
+
+# local
+from emsm.lib import logsearch
+
+
+# Classes
+# ------------------------------------------------
+
+class SelectLogsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.log_dir = self._tmp.name
+        self.log_path = os.path.join(self.log_dir, "latest.log")
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _create(self, name, mtime):
+        path = os.path.join(self.log_dir, name)
+        with open(path, "w") as file:
+            file.write("[12:00:00] [Server thread/INFO]: Done\n")
+        os.utime(path, (mtime.timestamp(), mtime.timestamp()))
+        return path
+
+    def test_rotated_logs_by_date(self):
+        old = self._create(
+            "2026-10-13-1.log", datetime.datetime(2026, 10, 13, 23, 0)
+            )
+        new = self._create(
+            "2026-10-15-1.log", datetime.datetime(2026, 10, 15, 20, 0)
+            )
+        latest = self._create("latest.log", datetime.datetime(2026, 10, 16))
+
+        # The whole 14th: the file of the 15th must be skipped.
+        selected = logsearch.select_logs(
+            self.log_path, until=datetime.datetime(2026, 10, 15)
+            )
+        self.assertEqual(selected, [old])
+
+        selected = logsearch.select_logs(
+            self.log_path, since=datetime.datetime(2026, 10, 14)
+            )
+        self.assertEqual(selected, [new, latest])
+        return None
+
+
+class SearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _create(self, name, lines, compress=False):
+        path = os.path.join(self._tmp.name, name)
+        opener = gzip.open if compress else open
+        with opener(path, "wt") as file:
+            for line in lines:
+                file.write(line + "\n")
+        return path
+
+    def test_order_and_chunks(self):
+        # More matches than fit into the bounded queue of a file.
+        count = logsearch.CHUNK_SIZE*(logsearch.MAX_CHUNKS + 2) + 1
+        first = self._create(
+            "2026-10-14-1.log.gz", ["match {}".format(i) for i in range(count)],
+            compress=True
+            )
+        second = self._create("latest.log", ["foo", "match last", "bar"])
+
+        results = list(logsearch.search(
+            [("world", [first, second])], "match", max_workers=2
+            ))
+        self.assertEqual(len(results), count + 1)
+        self.assertEqual(results[0], ("world", first, 1, "match 0"))
+        self.assertEqual(results[-1], ("world", second, 2, "match last"))
+        self.assertEqual(
+            [lineno for key, path, lineno, line in results[:-1]],
+            list(range(1, count + 1))
+            )
+        return None
+
+    def test_early_close(self):
+        paths = [
+            self._create(
+                "{}.log".format(i),
+                ["match"]*logsearch.CHUNK_SIZE*(logsearch.MAX_CHUNKS + 2)
+                )
+            for i in range(3)
+            ]
+        results = logsearch.search([("world", paths)], "match", max_workers=2)
+        self.assertEqual(next(results)[2], 1)
+        results.close()
+        return None
@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+Tests for :mod:`emsm.lib.logtail`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+# local
+from emsm.lib import logtail
+
+
+# Classes
+# ------------------------------------------------
+
+class LogTailTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "latest.log")
+        with open(self.path, "w") as file:
+            file.write("old line\n")
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _append(self, data, path=None):
+        with open(path or self.path, "a") as file:
+            file.write(data)
+        return None
+
+    def test_append(self):
+        with logtail.LogTail(self.path) as tail:
+            # Only content, which is appended from now on, is read.
+            self.assertEqual(tail.read(), "")
+
+            self._append("foo\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "foo\n")
+
+            self._append("bar\n")
+            self._append("baz\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "bar\nbaz\n")
+        return None
+
+    def test_offset(self):
+        with logtail.LogTail(self.path, offset=0) as tail:
+            self.assertEqual(tail.read(), "old line\n")
+        return None
+
+    def test_rotate(self):
+        with logtail.LogTail(self.path) as tail:
+            tail.read()
+            rotated = os.path.join(self._tmp.name, "2026-10-16-1.log")
+            os.rename(self.path, rotated)
+
+            # The rest of the old file is read before the new one.
+            self._append("rest\n", rotated)
+            self._append("new\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "rest\nnew\n")
+
+            self._append("more\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "more\n")
+        return None
+
+    def test_truncate(self):
+        with logtail.LogTail(self.path) as tail:
+            tail.read()
+            with open(self.path, "w") as file:
+                file.write("new\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "new\n")
+        return None
+
+    def test_created_later(self):
+        os.remove(self.path)
+        with logtail.LogTail(self.path) as tail:
+            self.assertEqual(tail.read(), "")
+            self._append("first\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "first\n")
+        return None
+
+    def test_inotify(self):
+        if not logtail.inotify_available():
+            self.skipTest("inotify is not available")
+
+        with logtail.LogTail(self.path) as tail:
+            self.assertTrue(tail.uses_inotify())
+            tail.read()
+
+            # Nothing changed, so the tail sleeps until the timeout.
+            self.assertFalse(tail.wait(timeout=0.1))
+
+            self._append("foo\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "foo\n")
+        return None
+
+    def test_polling(self):
+        with unittest.mock.patch.object(
+            logtail.Inotify, "_load_libc", side_effect=AttributeError
+            ), logtail.LogTail(self.path, poll_intervall=0.01) as tail:
+            self.assertFalse(tail.uses_inotify())
+            tail.read()
+
+            self._append("foo\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "foo\n")
+
+            # The polling fallback reports a possible change after each
+            # intervall.
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "")
+
+            os.rename(self.path, self.path + ".1")
+            self._append("new\n")
+            self.assertTrue(tail.wait(timeout=5))
+            self.assertEqual(tail.read(), "new\n")
+        return None
+
+
+class MultiTailTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.paths = dict()
+        for key in ("foo", "bar"):
+            log_dir = os.path.join(self._tmp.name, key, "logs")
+            os.makedirs(log_dir)
+            self.paths[key] = os.path.join(log_dir, "latest.log")
+            open(self.paths[key], "w").close()
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _append(self, key, data):
+        with open(self.paths[key], "a") as file:
+            file.write(data)
+        return None
+
+    def _test_read(self, tail):
+        for key, path in self.paths.items():
+            tail.add(key, path)
+        self.assertEqual(tail.keys(), ["foo", "bar"])
+        tail.read()
+
+        self._append("bar", "bar 1\n")
+        self.assertTrue(tail.wait(timeout=5))
+        self.assertEqual(tail.read(), [("bar", "bar 1\n")])
+
+        self._append("foo", "foo 1\n")
+        self._append("bar", "bar 2\n")
+        data = list()
+        while len(data) < 2 and tail.wait(timeout=5):
+            data.extend(tail.read())
+        self.assertEqual(sorted(data), [("bar", "bar 2\n"), ("foo", "foo 1\n")])
+        return None
+
+    def test_inotify(self):
+        if not logtail.inotify_available():
+            self.skipTest("inotify is not available")
+
+        with logtail.MultiTail() as tail:
+            self.assertTrue(tail.uses_inotify())
+            self._test_read(tail)
+        return None
+
+    def test_polling(self):
+        with unittest.mock.patch.object(
+            logtail.Inotify, "_load_libc", side_effect=AttributeError
+            ), logtail.MultiTail(poll_intervall=0.01) as tail:
+            self.assertFalse(tail.uses_inotify())
+            self._test_read(tail)
+        return None
+
+
+class RfindLineTest(unittest.TestCase):
+
+    def _file(self, data):
+        file = tempfile.TemporaryFile()
+        file.write(data)
+        self.addCleanup(file.close)
+        return file
+
+    def test_block_boundary(self):
+        # Each line is 9 bytes long, so most of the block sizes split the
+        # lines at the block boundaries.
+        lines = [b"line %03d\n" % i for i in range(50)]
+        lines[7] = b"match 07\n"
+        data = b"".join(lines)
+        file = self._file(data)
+
+        for block_size in (1, 4, 9, 10, 16, 64, 4096):
+            offset = logtail.rfind_line(file, "match", block_size=block_size)
+            self.assertEqual(offset, data.index(b"match"))
+        return None
+
+    def test_last_match(self):
+        data = b"match 1\nfoo\nmatch 2\nbar\n"
+        file = self._file(data)
+        for block_size in (3, 8, 1024):
+            self.assertEqual(
+                logtail.rfind_line(file, "match", block_size=block_size),
+                data.index(b"match 2")
+                )
+        return None
+
+    def test_match_is_anchored(self):
+        # A match in the middle of a line, which is split by the block
+        # boundary, must not be reported.
+        data = b"match\n" + b"x"*20 + b" match\n"
+        file = self._file(data)
+        self.assertEqual(logtail.rfind_line(file, "match", block_size=8), 0)
+        return None
+
+    def test_range(self):
+        data = b"match 1\nfoo\nmatch 2\nbar\n"
+        file = self._file(data)
+        start = data.index(b"foo")
+        end = data.index(b"match 2")
+        self.assertIsNone(
+            logtail.rfind_line(file, "match", start=start, end=end,
+                               block_size=4)
+            )
+        self.assertEqual(
+            logtail.rfind_line(file, "match", end=end, block_size=4), 0
+            )
+        return None
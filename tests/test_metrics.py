@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Tests the Prometheus exporter in :mod:`plugins.metrics`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import time
+import argparse
+import tempfile
+import threading
+import unittest
+import importlib.util
+
+
+# Data
+# ------------------------------------------------
+
+METRICS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "plugins", "metrics.py"
+    )
+
+
+# Functions
+# ------------------------------------------------
+
+def _import_metrics():
+    """
+    Imports the metrics plugin, which is not part of a package.
+    """
+    spec = importlib.util.spec_from_file_location("metrics", METRICS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+metrics = _import_metrics()
+
+
+# Classes
+# ------------------------------------------------
+
+class FakeWorld(object):
+
+    def __init__(self, name, online):
+        self._name = name
+        self._online = online
+        return None
+
+    def name(self):
+        return self._name
+
+    def is_online(self):
+        return self._online
+
+
+class FakeSnapshot(object):
+    """
+    The resource usage of a server process.
+    """
+
+    def start_time(self):
+        return time.time() - 60
+
+    def cpu_time(self):
+        return 1.5
+
+    def rss(self):
+        return 1024
+
+    def threads(self):
+        return 20
+
+    def fds(self):
+        return 30
+
+    def read_bytes(self):
+        return 100
+
+    def write_bytes(self):
+        return 200
+
+
+class FakeWorldManager(object):
+
+    def __init__(self, worlds):
+        self._worlds = worlds
+        self.sampled = 0
+        return None
+
+    def get_all(self):
+        return list(self._worlds)
+
+    def resource_snapshots(self, worlds):
+        self.sampled += 1
+        return {world.name(): FakeSnapshot() if world.is_online() else None
+                for world in worlds}
+
+
+class FakeArgParser(object):
+
+    def __init__(self, plugin):
+        self._args = argparse.Namespace(plugin=plugin)
+        return None
+
+    def args(self):
+        return self._args
+
+
+class FakeApp(object):
+
+    def __init__(self, worlds, plugin="worlds"):
+        self._worlds = FakeWorldManager(worlds)
+        self._argparser = FakeArgParser(plugin)
+        return None
+
+    def worlds(self):
+        return self._worlds
+
+    def argparser(self):
+        return self._argparser
+
+    def lock_wait_time(self):
+        return 0.25
+
+
+class FormatMetricTest(unittest.TestCase):
+
+    def test_samples(self):
+        lines = metrics.format_metric(
+            "emsm_test", "summary", "A test.", [
+                ("_sum", {"world": "foo", "a": "1"}, 2.5),
+                ("_count", {"world": "foo", "a": "1"}, 3),
+                ("_sum", {"world": "bar"}, None)
+                ])
+        self.assertEqual(lines, [
+            "# HELP emsm_test A test.",
+            "# TYPE emsm_test summary",
+            "emsm_test_sum{a=\"1\",world=\"foo\"} 2.5",
+            "emsm_test_count{a=\"1\",world=\"foo\"} 3"
+            ])
+        return None
+
+    def test_escape(self):
+        lines = metrics.format_metric(
+            "emsm_test", "gauge", "A test.", [("", {"world": "a\"b\\c\nd"}, 1)]
+            )
+        self.assertEqual(lines[2], "emsm_test{world=\"a\\\"b\\\\c\\nd\"} 1")
+        return None
+
+    def test_without_labels(self):
+        lines = metrics.format_metric("emsm_test", "gauge", "A test.",
+                                      [("", {}, 1)])
+        self.assertEqual(lines[2], "emsm_test 1")
+        return None
+
+    def test_empty(self):
+        self.assertEqual(
+            metrics.format_metric("emsm_test", "gauge", "A test.",
+                                  [("", {}, None)]),
+            []
+            )
+        return None
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+        self.worlds = [FakeWorld("foo", True), FakeWorld("bar", False)]
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _metrics(self, plugin="worlds"):
+        """
+        Returns a Metrics plugin, which is not connected to the signals.
+        Only the attributes used in the tests are set.
+        """
+        app = FakeApp(self.worlds, plugin)
+        plugin = metrics.Metrics.__new__(metrics.Metrics)
+        plugin._start_time = time.monotonic()
+        plugin._invoked = False
+        plugin._modified = False
+        plugin._state_lock = threading.Lock()
+        plugin._state_file_lock = None
+        plugin._textfile = os.path.join(self.data_dir, "emsm.prom")
+        plugin.app = lambda: app
+        plugin.data_dir = lambda: self.data_dir
+        return plugin
+
+    def test_collect(self):
+        plugin = self._metrics()
+        plugin._on_world_started(self.worlds[0])
+        plugin._on_backup_created(self.worlds[1], "/backup.tar", 4096, 2.0)
+
+        text = plugin.collect()
+        self.assertIn("emsm_world_up{world=\"foo\"} 1\n", text)
+        self.assertIn("emsm_world_up{world=\"bar\"} 0\n", text)
+        self.assertIn("emsm_world_resident_memory_bytes{world=\"foo\"} 1024\n",
+                      text)
+        self.assertNotIn("emsm_world_resident_memory_bytes{world=\"bar\"}",
+                         text)
+        self.assertIn(
+            "emsm_world_events_total{event=\"started\",world=\"foo\"} 1\n",
+            text
+            )
+        self.assertIn("emsm_backup_last_size_bytes{world=\"bar\"} 4096\n", text)
+        self.assertIn("emsm_backups_total{world=\"bar\"} 1\n", text)
+        return None
+
+    def test_state_merge(self):
+        # Two EMSM runs update the state alternately. Each update is applied
+        # to the latest state on the disk.
+        first = self._metrics()
+        second = self._metrics()
+        first._on_world_started(self.worlds[0])
+        second._on_world_started(self.worlds[0])
+        first._on_world_stopped(self.worlds[0])
+        second._on_guard_action(self.worlds[1], "restart", "error")
+
+        state = first._load_state()
+        self.assertEqual(
+            state["world_events"], {"foo": {"started": 2, "stopped": 1}}
+            )
+        self.assertEqual(state["guard_actions"], {"bar": {"restart": 1}})
+
+        first._on_world_uninstalled(self.worlds[0])
+        self.assertEqual(second._load_state()["world_events"], {})
+        return None
+
+    def test_read_only_run(self):
+        plugin = self._metrics()
+        plugin.finish()
+
+        # Nothing has been written and the worlds have not been sampled.
+        self.assertEqual(os.listdir(self.data_dir), [])
+        self.assertEqual(plugin.app().worlds().sampled, 0)
+        return None
+
+    def test_modifying_run(self):
+        plugin = self._metrics()
+        plugin._on_world_started(self.worlds[0])
+        plugin.finish()
+
+        state = plugin._load_state()
+        self.assertEqual(state["runs"]["worlds"]["count"], 1)
+        self.assertEqual(state["lock_wait"]["last"], 0.25)
+        self.assertFalse(os.path.exists(plugin.textfile()))
+        self.assertEqual(plugin.app().worlds().sampled, 0)
+        return None
+
+    def test_invoked_run(self):
+        plugin = self._metrics("metrics")
+        plugin.run(argparse.Namespace(print=None, serve=None))
+        plugin.finish()
+
+        with open(plugin.textfile()) as file:
+            text = file.read()
+        self.assertIn(
+            "emsm_run_duration_seconds_count{plugin=\"metrics\"} 1\n", text
+            )
+        self.assertEqual(plugin.app().worlds().sampled, 1)
+        return None
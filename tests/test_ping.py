@@ -0,0 +1,301 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Tests for :mod:`emsm.ping` against a minimal server on localhost, which
+answers the modern and the legacy *Server List Ping*.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import json
+import socket
+import struct
+import threading
+import unittest
+
+# local
+from emsm import ping
+
+
+# Functions
+# ------------------------------------------------
+
+def _varint(value):
+    """
+    Returns the *VarInt* encoding of the positive integer *value*.
+    """
+    data = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+
+def _recv_exactly(conn, size):
+    """
+    Receives exactly *size* bytes or returns ``None``, if the client closed
+    the connection.
+    """
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def _recv_packet(conn):
+    """
+    Receives a length prefixed packet and returns its content (packet id
+    and data) or ``None``, if the client closed the connection.
+    """
+    size = 0
+    for i in range(5):
+        byte = _recv_exactly(conn, 1)
+        if byte is None:
+            return None
+        size |= (byte[0] & 0x7F) << (7*i)
+        if not byte[0] & 0x80:
+            break
+    return _recv_exactly(conn, size)
+
+
+def _status_packet(status):
+    """
+    Returns the status response packet for the *status* (a dictionary or
+    a string).
+    """
+    if not isinstance(status, str):
+        status = json.dumps(status)
+    status = status.encode("utf-8")
+    data = b"\x00" + _varint(len(status)) + status
+    return _varint(len(data)) + data
+
+
+def _legacy_packet(text):
+    """
+    Returns the legacy kick packet with the *text*.
+    """
+    return b"\xff" + struct.pack(">H", len(text)) + text.encode("utf-16-be")
+
+
+# Classes
+# ------------------------------------------------
+
+class FakePingServer(object):
+    """
+    A minimal server on localhost, which passes each connection to the
+    function *handler*.
+    """
+
+    def __init__(self, handler):
+        """
+        """
+        self.handler = handler
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(8)
+        self.port = self._socket.getsockname()[1]
+
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return None
+
+    def close(self):
+        """
+        Stops the server.
+        """
+        self._socket.close()
+        return None
+
+    def _serve(self):
+        """
+        Accepts the connections.
+        """
+        while True:
+            try:
+                conn, addr = self._socket.accept()
+            except OSError:
+                return None
+            with conn:
+                try:
+                    self.handler(conn)
+                except OSError:
+                    pass
+        return None
+
+
+class PingTest(unittest.TestCase):
+    """
+    Tests the modern and the legacy *Server List Ping*.
+    """
+
+    STATUS = {
+        "version": {"name": "1.8", "protocol": 47},
+        "players": {"max": 20, "online": 3},
+        "description": {"text": "A ", "extra": [{"text": "server"}]}
+        }
+
+    def setUp(self):
+        self.server = None
+        return None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.close()
+        return None
+
+    def _ping(self, handler, func=ping.ping):
+        self.server = FakePingServer(handler)
+        return func("127.0.0.1", self.server.port, timeout=2)
+
+    def _modern_handler(self, response, pong=True):
+        """
+        Returns a handler, which answers the handshake and the status
+        request with *response* and the ping packet with a pong.
+        """
+        def handler(conn):
+            handshake = _recv_packet(conn)
+            request = _recv_packet(conn)
+            if handshake is None or request != b"\x00":
+                return None
+            conn.sendall(response)
+
+            packet = _recv_packet(conn)
+            if pong and packet is not None:
+                conn.sendall(_varint(len(packet)) + packet)
+            return None
+        return handler
+
+    def _legacy_handler(self, response):
+        """
+        Returns a handler, which answers the legacy ping with *response*
+        and closes the connection on all other requests, like servers
+        before minecraft 1.7.
+        """
+        def handler(conn):
+            if _recv_exactly(conn, 2) == b"\xfe\x01":
+                conn.sendall(response)
+            return None
+        return handler
+
+    def test_modern(self):
+        response = self._ping(
+            self._modern_handler(_status_packet(self.STATUS))
+            )
+        self.assertFalse(response.legacy())
+        self.assertEqual(response.online_players(), 3)
+        self.assertEqual(response.max_players(), 20)
+        self.assertEqual(response.version(), "1.8")
+        self.assertEqual(response.protocol(), 47)
+        self.assertEqual(response.motd(), "A server")
+        self.assertGreaterEqual(response.latency(), 0)
+        return None
+
+    def test_modern_without_pong(self):
+        response = self._ping(
+            self._modern_handler(_status_packet(self.STATUS), pong=False)
+            )
+        self.assertEqual(response.online_players(), 3)
+        return None
+
+    def test_modern_truncated(self):
+        # The packet announces more bytes, than are sent.
+        packet = _status_packet(self.STATUS)
+        with self.assertRaises(ping.PingError):
+            self._ping(self._modern_handler(packet[:20]), ping.ping_modern)
+        return None
+
+    def test_modern_malformed(self):
+        with self.assertRaises(ping.PingError):
+            self._ping(
+                self._modern_handler(_status_packet("{\"players\": ")),
+                ping.ping_modern
+                )
+        with self.assertRaises(ping.PingError):
+            self._ping(
+                self._modern_handler(_status_packet({"players": []})),
+                ping.ping_modern
+                )
+        return None
+
+    def test_legacy(self):
+        response = self._ping(self._legacy_handler(
+            _legacy_packet("§1\x0061\x001.5.2\x00A server\x005\x0010")
+            ))
+        self.assertTrue(response.legacy())
+        self.assertEqual(response.online_players(), 5)
+        self.assertEqual(response.max_players(), 10)
+        self.assertEqual(response.version(), "1.5.2")
+        self.assertEqual(response.protocol(), 61)
+        self.assertEqual(response.motd(), "A server")
+        return None
+
+    def test_legacy_beta(self):
+        response = self._ping(
+            self._legacy_handler(_legacy_packet("A server§5§10"))
+            )
+        self.assertTrue(response.legacy())
+        self.assertEqual(response.online_players(), 5)
+        self.assertEqual(response.max_players(), 10)
+        self.assertEqual(response.motd(), "A server")
+        return None
+
+    def test_legacy_truncated(self):
+        packet = _legacy_packet("§1\x0061\x001.5.2\x00A server\x005\x0010")
+        with self.assertRaises(ping.PingError):
+            self._ping(self._legacy_handler(packet[:15]), ping.ping_legacy)
+        return None
+
+    def test_legacy_malformed(self):
+        with self.assertRaises(ping.PingError):
+            self._ping(
+                self._legacy_handler(_legacy_packet("§1\x0061\x001.5.2")),
+                ping.ping_legacy
+                )
+        with self.assertRaises(ping.PingError):
+            self._ping(
+                self._legacy_handler(b"\x00\x00"), ping.ping_legacy
+                )
+        return None
+
+    def test_unavailable(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        with self.assertRaises(ping.PingUnavailableError):
+            ping.ping("127.0.0.1", port, timeout=2)
+        return None
@@ -0,0 +1,263 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Tests the plugin manifest and the lazy loading of the plugins in
+:mod:`emsm.plugins`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import sys
+import json
+import tempfile
+import unittest
+import unittest.mock
+
+# local
+from emsm import argparse_
+from emsm import conf
+from emsm import plugins
+
+
+# Data
+# ------------------------------------------------
+
+#: A plugin, which creates a configuration section and has an argument.
+PLUGIN_SOURCE = """
+from emsm.base_plugin import BasePlugin
+
+PLUGIN = "Plugin"
+
+class Plugin(BasePlugin):
+
+    VERSION = "3.0.0"
+
+    SUBSCRIBER = {subscriber}
+
+    def __init__(self, app, name):
+        BasePlugin.__init__(self, app, name)
+        self.conf()["rows"] = self.conf().get("rows", "{rows}")
+        self.argparser().description = "Prints rows."
+        self.argparser().add_argument(
+            "--rows", dest="rows", type=int, help="The number of rows."
+            )
+        return None
+"""
+
+
+# Classes
+# ------------------------------------------------
+
+class FakePaths(object):
+
+    def __init__(self, root):
+        self._root = root
+        return None
+
+    def plugins_dir(self):
+        return os.path.join(self._root, "plugins")
+
+    def plugins_data_dir(self):
+        return os.path.join(self._root, "plugins_data")
+
+
+class FakeConf(object):
+
+    def __init__(self, path):
+        self._main = conf.MainConfiguration(path)
+        return None
+
+    def main(self):
+        return self._main
+
+
+class FakeApp(object):
+    """
+    Provides the paths, the configuration and the argument parser needed by
+    the PluginManager.
+    """
+
+    def __init__(self, root):
+        self._paths = FakePaths(root)
+        self._conf = FakeConf(os.path.join(root, "main.conf"))
+        self._argparser = argparse_.ArgumentParser(self)
+        self._plugins = plugins.PluginManager(self)
+        return None
+
+    def paths(self):
+        return self._paths
+
+    def conf(self):
+        return self._conf
+
+    def argparser(self):
+        return self._argparser
+
+    def plugins(self):
+        return self._plugins
+
+
+class PluginManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        os.makedirs(os.path.join(self.root, "plugins"))
+        os.makedirs(os.path.join(self.root, "plugins_data"))
+
+        self.lazy_path = self._write_plugin("emsmtest_lazy", False, 1)
+        self.subscriber_path = self._write_plugin("emsmtest_subscriber", True, 2)
+        self.manifest_path = os.path.join(
+            self.root, "plugins_data", ".manifest.json"
+            )
+
+        # No plugin is selected on the command line.
+        self._argv = unittest.mock.patch.object(sys, "argv", ["minecraft"])
+        self._argv.start()
+        return None
+
+    def tearDown(self):
+        self._argv.stop()
+        for name in ("emsmtest_lazy", "emsmtest_subscriber"):
+            sys.modules.pop(name, None)
+        self._tmp.cleanup()
+        return None
+
+    def _write_plugin(self, name, subscriber, rows):
+        path = os.path.join(self.root, "plugins", name + ".py")
+        with open(path, "w") as file:
+            file.write(PLUGIN_SOURCE.format(subscriber=subscriber, rows=rows))
+        return path
+
+    def _setup(self):
+        """
+        Sets the plugins of a new application up, like an EMSM run, and
+        returns the application and the paths of the imported plugins.
+        """
+        app = FakeApp(self.root)
+        imported = list()
+        import_plugin = plugins.PluginManager.import_plugin
+        def record_import(manager, path):
+            imported.append(path)
+            return import_plugin(manager, path)
+
+        with unittest.mock.patch.object(
+            plugins.PluginManager, "import_plugin", record_import
+            ):
+            app.plugins().setup()
+            app.plugins().init_plugins()
+        return (app, imported)
+
+    def _manifest(self):
+        with open(self.manifest_path) as file:
+            return json.load(file)["plugins"]
+
+    def test_unchanged(self):
+        self._setup()
+        mtime = os.stat(self.manifest_path).st_mtime_ns
+
+        app, imported = self._setup()
+        self.assertEqual(imported, [self.subscriber_path])
+        self.assertEqual(os.stat(self.manifest_path).st_mtime_ns, mtime)
+        return None
+
+    def test_touch(self):
+        self._setup()
+        stat = os.stat(self.lazy_path)
+        os.utime(self.lazy_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        # The content did not change, so the plugin is not imported again,
+        # but the new modification time is cached.
+        app, imported = self._setup()
+        self.assertNotIn(self.lazy_path, imported)
+        self.assertEqual(
+            self._manifest()["emsmtest_lazy.py"]["mtime"],
+            stat.st_mtime_ns + 10**9
+            )
+
+        # So the file is not hashed anymore.
+        with unittest.mock.patch.object(plugins.hashlib, "sha1") as sha1:
+            self._setup()
+        self.assertFalse(sha1.called)
+        return None
+
+    def test_edit(self):
+        self._setup()
+        self._write_plugin("emsmtest_lazy", False, 10)
+
+        app, imported = self._setup()
+        self.assertIn(self.lazy_path, imported)
+        self.assertIn("emsmtest_lazy", [p.name() for p in app.plugins().get_all_plugins()])
+        entry = self._manifest()["emsmtest_lazy.py"]
+        self.assertEqual(entry["mtime"], os.stat(self.lazy_path).st_mtime_ns)
+        self.assertIsNotNone(entry["arguments"])
+        return None
+
+    def test_lazy_loading(self):
+        # The first run initialises all plugins to record their metadata.
+        app, imported = self._setup()
+        self.assertEqual(
+            sorted(p.name() for p in app.plugins().get_all_plugins()),
+            ["emsmtest_lazy", "emsmtest_subscriber"]
+            )
+
+        # A new run only initialises the subscriber.
+        app, imported = self._setup()
+        self.assertEqual(
+            [p.name() for p in app.plugins().get_all_plugins()],
+            ["emsmtest_subscriber"]
+            )
+        self.assertIn("emsmtest_lazy", app.plugins().get_plugin_names())
+
+        # The configuration and the arguments of the other plugin are
+        # restored from the manifest.
+        main_conf = app.conf().main()
+        self.assertEqual(main_conf.get("emsmtest_lazy", "rows"), "1")
+        help_parser = app.argparser()._plugin_subparsers.choices["emsmtest_lazy"]
+        self.assertEqual(help_parser.description, "Prints rows.")
+        self.assertIn("--rows", help_parser.format_help())
+
+        # The plugin is loaded, when it is needed, and gets a new parser.
+        plugin = app.plugins().get_plugin("emsmtest_lazy")
+        self.assertEqual(plugin.name(), "emsmtest_lazy")
+        self.assertIsNot(plugin.argparser(), help_parser)
+        self.assertIn("--rows", plugin.argparser().format_help())
+        return None
+
+    def test_user_conf_is_kept(self):
+        self._setup()
+
+        app = FakeApp(self.root)
+        app.conf().main().add_section("emsmtest_lazy")
+        app.conf().main().set("emsmtest_lazy", "rows", "5")
+        app.plugins().setup()
+        app.plugins().init_plugins()
+        self.assertEqual(app.conf().main().get("emsmtest_lazy", "rows"), "5")
+        return None
@@ -0,0 +1,231 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+Tests for :mod:`emsm.lib.procfs`. The tests sample the test process and
+spawned children.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import unittest
+import unittest.mock
+
+# local
+from emsm.lib import procfs
+
+
+# Data
+# ------------------------------------------------
+
+# Starts a grandchild and prints its pid.
+SESSION_SCRIPT = """
+import subprocess, sys
+server = subprocess.Popen(["sleep", "60"])
+print(server.pid, flush=True)
+server.wait()
+"""
+
+# Keeps one core busy.
+BUSY_SCRIPT = """
+while True:
+    pass
+"""
+
+# Writes and syncs 1 MiB into the file *argv[1]* for each line on stdin.
+WRITER_SCRIPT = """
+import os, sys
+with open(sys.argv[1], "wb") as file:
+    for line in sys.stdin:
+        file.write(b"x"*1024*1024)
+        file.flush()
+        os.fsync(file.fileno())
+        print("ok", flush=True)
+"""
+
+
+# Classes
+# ------------------------------------------------
+
+@unittest.skipUnless(procfs.available(), "/proc is not available")
+class SamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sampler = procfs.Sampler()
+        return None
+
+    def _spawn(self, script, *args):
+        proc = subprocess.Popen(
+            [sys.executable, "-c", script] + list(args),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True
+            )
+        self.addCleanup(self._kill, proc)
+        return proc
+
+    def _kill(self, proc):
+        proc.kill()
+        proc.wait()
+        proc.stdin.close()
+        proc.stdout.close()
+        return None
+
+    def test_read_stat(self):
+        # The command name may contain spaces and parentheses.
+        proc = self._spawn(
+            "import sys\n"
+            "open('/proc/self/comm', 'w').write('a (b) c')\n"
+            "print('ok', flush=True)\n"
+            "sys.stdin.read()\n"
+            )
+        self.assertEqual(proc.stdout.readline(), "ok\n")
+
+        stat = procfs._read_stat(proc.pid)
+        self.assertEqual(stat[0], "a (b) c")
+        self.assertEqual(int(stat[2]), os.getpid())
+        return None
+
+    def test_find_server(self):
+        proc = self._spawn(SESSION_SCRIPT)
+        server_pid = int(proc.stdout.readline())
+
+        tree = self.sampler.process_tree()
+        self.assertIn(proc.pid, [pid for pid, comm in tree[os.getpid()]])
+        self.assertEqual(self.sampler.find_server(proc.pid, tree), server_pid)
+        self.assertEqual(
+            self.sampler.server_pids({"foo": proc.pid}), {"foo": server_pid}
+            )
+
+        # A process without children is the server itself.
+        self.assertEqual(
+            self.sampler.find_server(server_pid, tree), server_pid
+            )
+        return None
+
+    def test_find_server_prefers_java(self):
+        tree = {
+            1: [(2, "sh"), (3, "java")],
+            2: [(4, "sh")],
+            4: [(5, "sleep")]
+            }
+        self.assertEqual(self.sampler.find_server(1, tree), 3)
+        with unittest.mock.patch.object(procfs, "SERVER_COMMANDS", ()):
+            self.assertEqual(self.sampler.find_server(1, tree), 5)
+        return None
+
+    def test_snapshot_self(self):
+        snapshot = self.sampler.snapshot(os.getpid())
+        self.assertEqual(snapshot.pid(), os.getpid())
+        self.assertGreater(snapshot.rss(), 0)
+        self.assertGreaterEqual(snapshot.threads(), 1)
+        self.assertGreaterEqual(snapshot.fds(), 3)
+        self.assertGreaterEqual(snapshot.cpu_time(), 0)
+        self.assertLessEqual(snapshot.start_time(), time.time())
+        return None
+
+    def test_snapshot_missing(self):
+        proc = self._spawn("")
+        proc.wait()
+        self.assertIsNone(self.sampler.snapshot(proc.pid))
+        self.assertEqual(
+            self.sampler.sample({"foo": proc.pid}, interval=0.1),
+            {"foo": None}
+            )
+        return None
+
+    def test_cpu_percent(self):
+        busy = self._spawn(BUSY_SCRIPT)
+        idle = self._spawn("import sys\nsys.stdin.read()\n")
+
+        usage = self.sampler.sample(
+            {"busy": busy.pid, "idle": idle.pid}, interval=0.5
+            )
+        self.assertGreater(usage["busy"].cpu_percent(), 25)
+        self.assertLess(usage["idle"].cpu_percent(), 25)
+        self.assertEqual(usage["busy"].pid(), busy.pid)
+        self.assertGreaterEqual(usage["busy"].uptime(), 0)
+        return None
+
+    def test_io_counters(self):
+        if self.sampler.snapshot(os.getpid()).write_bytes() is None:
+            self.skipTest("/proc/<pid>/io is not readable")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            proc = self._spawn(WRITER_SCRIPT, os.path.join(tmp_dir, "foo"))
+
+            first = self.sampler.snapshot(proc.pid)
+            proc.stdin.write("\n")
+            proc.stdin.flush()
+            self.assertEqual(proc.stdout.readline(), "ok\n")
+            second = self.sampler.snapshot(proc.pid)
+
+        written = second.write_bytes() - first.write_bytes()
+        if written == 0:
+            self.skipTest("the file system does not account written bytes")
+        self.assertGreaterEqual(written, 1024*1024)
+
+        usage = procfs.ResourceUsage(first, second)
+        self.assertGreater(usage.write_rate(), 0)
+        self.assertGreaterEqual(usage.read_rate(), 0)
+        return None
+
+
+class ResourceUsageTest(unittest.TestCase):
+
+    def _snapshot(self, timestamp, cpu_time, read_bytes, write_bytes):
+        return procfs.ProcessSnapshot(
+            pid=1, timestamp=timestamp, cpu_time=cpu_time, rss=4096,
+            threads=2, fds=8, read_bytes=read_bytes, write_bytes=write_bytes,
+            start_time=0
+            )
+
+    def test_rates(self):
+        usage = procfs.ResourceUsage(
+            self._snapshot(10, 1.0, 100, 0),
+            self._snapshot(12, 4.0, 300, 1000)
+            )
+        self.assertEqual(usage.cpu_percent(), 150)
+        self.assertEqual(usage.read_rate(), 100)
+        self.assertEqual(usage.write_rate(), 500)
+        return None
+
+    def test_missing_io(self):
+        usage = procfs.ResourceUsage(
+            self._snapshot(10, 1.0, None, None),
+            self._snapshot(12, 1.0, None, None)
+            )
+        self.assertEqual(usage.cpu_percent(), 0)
+        self.assertIsNone(usage.read_rate())
+        self.assertIsNone(usage.write_rate())
+        return None
@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+"""
+Tests for :mod:`emsm.rcon` against a fake RCON server.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import time
+import socket
+import struct
+import threading
+import unittest
+
+# local
+from emsm import rcon
+
+
+# Classes
+# ------------------------------------------------
+
+class FakeRconServer(object):
+    """
+    A minimal RCON server on localhost, which answers each command with
+    ``"ok <command>"`` and records the executed commands.
+
+    :param int close_after:
+        The server closes each connection after this number of commands.
+    :param dict delays:
+        Maps a command to the time in seconds, the server waits before it
+        answers the command.
+    """
+
+    def __init__(self, password="secret", close_after=None, delays=None):
+        """
+        """
+        self.password = password
+        self.close_after = close_after
+        self.delays = delays or dict()
+
+        self.executed = list()
+        self.connections = 0
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(8)
+        self.port = self._socket.getsockname()[1]
+
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return None
+
+    def close(self):
+        """
+        Stops the server.
+        """
+        self._socket.close()
+        return None
+
+    def _serve(self):
+        """
+        Accepts the connections.
+        """
+        while True:
+            try:
+                conn, addr = self._socket.accept()
+            except OSError:
+                return None
+            self.connections += 1
+            threading.Thread(
+                target=self._handle, args=(conn,), daemon=True
+                ).start()
+        return None
+
+    def _recv_packet(self, conn, buf):
+        """
+        Returns the tuple *(request_id, packet_type, body)* or ``None``, if
+        the client closed the connection. *buf* contains the received bytes,
+        which have not been processed yet.
+        """
+        while len(buf) < 4 or len(buf) < 4 + struct.unpack("<i", buf[:4])[0]:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return None
+            buf += chunk
+        size, request_id, packet_type = struct.unpack("<iii", buf[:12])
+        body = bytes(buf[12:4 + size - 2]).decode()
+        del buf[:4 + size]
+        return (request_id, packet_type, body)
+
+    def _send_packet(self, conn, request_id, body):
+        """
+        Sends a response packet.
+        """
+        body = body.encode() + b"\x00\x00"
+        conn.sendall(struct.pack("<iii", 8 + len(body), request_id, 0) + body)
+        return None
+
+    def _handle(self, conn):
+        """
+        Handles a client connection.
+        """
+        commands = 0
+        buf = bytearray()
+        with conn:
+            while True:
+                try:
+                    packet = self._recv_packet(conn, buf)
+                except OSError:
+                    return None
+                if packet is None:
+                    return None
+
+                request_id, packet_type, body = packet
+                if packet_type == 3:
+                    if body != self.password:
+                        request_id = -1
+                    self._send_packet(conn, request_id, "")
+                elif packet_type == 2:
+                    self.executed.append(body)
+                    time.sleep(self.delays.get(body, 0))
+                    try:
+                        self._send_packet(conn, request_id, "ok " + body)
+                    except OSError:
+                        return None
+                else:
+                    # The end marker of the command.
+                    try:
+                        self._send_packet(conn, request_id, "")
+                    except OSError:
+                        return None
+                    commands += 1
+                    if self.close_after and commands >= self.close_after:
+                        conn.shutdown(socket.SHUT_RDWR)
+                        return None
+        return None
+
+
+class RconPoolTest(unittest.TestCase):
+    """
+    Tests the reuse of the connections in :class:`emsm.rcon.RconPool`.
+    """
+
+    def setUp(self):
+        self.server = None
+        self.pool = None
+        return None
+
+    def tearDown(self):
+        if self.pool is not None:
+            self.pool.close()
+        if self.server is not None:
+            self.server.close()
+        return None
+
+    def test_command(self):
+        self.server = FakeRconServer()
+        self.pool = rcon.RconPool("127.0.0.1", self.server.port, "secret")
+
+        self.assertEqual(self.pool.command("list"), "ok list")
+        self.assertEqual(self.pool.command("list"), "ok list")
+        self.assertEqual(self.server.connections, 1)
+        return None
+
+    def test_wrong_password(self):
+        self.server = FakeRconServer()
+        self.pool = rcon.RconPool("127.0.0.1", self.server.port, "wrong")
+
+        with self.assertRaises(rcon.RconAuthError):
+            self.pool.command("list")
+        self.assertEqual(self.server.executed, [])
+        return None
+
+    def test_stale_connection_is_retried(self):
+        # The server closes the connection after each command, so the
+        # idle connection in the pool is stale.
+        self.server = FakeRconServer(close_after=1)
+        self.pool = rcon.RconPool("127.0.0.1", self.server.port, "secret")
+
+        self.assertEqual(self.pool.command("save-all"), "ok save-all")
+        time.sleep(0.1)
+        self.assertEqual(self.pool.command("say hi"), "ok say hi")
+
+        self.assertEqual(self.server.executed, ["save-all", "say hi"])
+        self.assertEqual(self.server.connections, 2)
+        return None
+
+    def test_no_retry_after_send(self):
+        # The command reaches the server, but the answer is too late.
+        self.server = FakeRconServer(delays={"save-all": 1.0})
+        self.pool = rcon.RconPool("127.0.0.1", self.server.port, "secret")
+
+        self.assertEqual(self.pool.command("list"), "ok list")
+
+        # The reused connection must use the new, shorter timeout.
+        start = time.monotonic()
+        with self.assertRaises(rcon.RconError) as context:
+            self.pool.command("save-all", timeout=0.2)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertNotIsInstance(
+            context.exception, rcon.RconUnavailableError
+            )
+
+        time.sleep(1.2)
+        self.assertEqual(self.server.executed, ["list", "save-all"])
+        return None
+
+    def test_unavailable(self):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        self.pool = rcon.RconPool("127.0.0.1", port, "secret")
+        with self.assertRaises(rcon.RconUnavailableError):
+            self.pool.command("list", timeout=1)
+        return None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Tests the server catalog in :mod:`emsm.server`.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import re
+import tempfile
+import unittest
+import configparser
+
+# local
+from emsm import server
+from emsm.lib import artifacts
+
+
+# Classes
+# ------------------------------------------------
+
+class FakePaths(object):
+
+    def __init__(self, server_dir):
+        self._server_dir = server_dir
+        return None
+
+    def server_dir(self):
+        return self._server_dir
+
+
+class FakeConf(object):
+
+    def __init__(self, server_conf):
+        self._server_conf = server_conf
+        return None
+
+    def server(self):
+        return self._server_conf
+
+
+class FakeApp(object):
+    """
+    Provides the paths and the *server.conf* needed by the ServerManager.
+    """
+
+    def __init__(self, server_dir, server_conf=""):
+        conf = configparser.ConfigParser()
+        conf.read_string(server_conf)
+        self._paths = FakePaths(server_dir)
+        self._conf = FakeConf(conf)
+        return None
+
+    def paths(self):
+        return self._paths
+
+    def conf(self):
+        return self._conf
+
+
+class CatalogTest(unittest.TestCase):
+
+    #: The built-in server, which can not be verified, since only the
+    #: latest version is available.
+    UNVERIFIED = ("bungeecord",)
+
+    def test_entries(self):
+        for name, entry in server.CATALOG.items():
+            entry = dict(server.DEFAULT_ENTRY, **entry)
+            self.assertIn(entry["type"], server.ServerManager.SERVER_TYPES)
+            self.assertTrue(entry["url"], name)
+            self.assertIn("{", entry["start_cmd"], name)
+            self.assertTrue(entry["log_path"], name)
+            re.compile(entry["log_start_re"])
+            if entry["type"] == "forge":
+                re.compile(entry["jar_re"])
+
+            if name in self.UNVERIFIED:
+                continue
+            self.assertTrue(entry["checksum"], name)
+            if not artifacts.is_checksum_url(entry["checksum"]):
+                artifacts.parse_checksum(entry["checksum"])
+        return None
+
+
+class ServerManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _manager(self, server_conf=""):
+        return server.ServerManager(FakeApp(self._tmp.name, server_conf))
+
+    def test_lazy_get(self):
+        manager = self._manager()
+        self.assertEqual(manager._server, {})
+
+        forge = manager.get("minecraft forge 1.7")
+        self.assertIs(type(forge), server.MinecraftForgeServerWrapper)
+        self.assertIs(manager.get("minecraft forge 1.7"), forge)
+
+        bungeecord = manager.get("bungeecord")
+        self.assertIs(type(bungeecord), server.BungeeCordServerWrapper)
+
+        # Only the requested wrappers have been created.
+        self.assertEqual(
+            sorted(manager._server), ["bungeecord", "minecraft forge 1.7"]
+            )
+        self.assertIsNone(manager.get("foo"))
+        return None
+
+    def test_server_conf(self):
+        manager = self._manager(
+            "[vanilla 1.8]\n"
+            "start_cmd = java -Xmx2G -jar {server} nogui\n"
+            "[spigot 1.8]\n"
+            "url = file:///srv/mirror/spigot-1.8.jar\n"
+            "log_start_re = ^.*Done$\n"
+            "[foo]\n"
+            "type = unknown\n"
+            )
+
+        vanilla = manager.get("vanilla 1.8")
+        self.assertIs(type(vanilla), server.VanillaServerWrapper)
+        self.assertTrue(vanilla.start_cmd().startswith("java -Xmx2G -jar "))
+        self.assertEqual(
+            vanilla.checksum(), server.CATALOG["vanilla 1.8"]["checksum"]
+            )
+
+        spigot = manager.get("spigot 1.8")
+        self.assertIs(type(spigot), server.VanillaServerWrapper)
+        self.assertIsNone(spigot.checksum())
+        self.assertEqual(spigot.log_start_re().pattern, "^.*Done$")
+
+        self.assertIsNone(manager.get("foo"))
+        return None
@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Tests :mod:`emsm.supervisor` with ``/bin/cat`` as supervised process.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import sys
+import time
+import signal
+import socket
+import tempfile
+import threading
+import subprocess
+import unittest
+import unittest.mock
+
+# local
+from emsm import supervisor
+
+
+# Data
+# ------------------------------------------------
+
+SUPERVISOR_PATH = supervisor.__file__
+
+
+# Functions
+# ------------------------------------------------
+
+def _connect(path, request):
+    """
+    Connects to the control socket at *path* and sends the *request* line.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(5)
+    client.connect(path)
+    client.sendall(request + b"\n")
+    return client
+
+
+def _recv_until(client, data):
+    """
+    Receives from the *client* until *data* has been received and returns
+    everything received.
+    """
+    received = bytes()
+    while data not in received:
+        chunk = client.recv(4096)
+        if not chunk:
+            break
+        received += chunk
+    return received
+
+
+# Classes
+# ------------------------------------------------
+
+class DaemonTest(unittest.TestCase):
+    """
+    Runs the supervisor script like the *supervisor* backend.
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.socket_dir = self._tmp.name
+        self.pid = None
+        return None
+
+    def tearDown(self):
+        if self.pid is not None:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except OSError:
+                pass
+        self._tmp.cleanup()
+        return None
+
+    def test_stream(self):
+        ret = subprocess.call(
+            [sys.executable, SUPERVISOR_PATH, self.socket_dir, "test",
+             "/bin/cat"],
+            timeout=10
+            )
+        self.assertEqual(ret, 0)
+
+        # The control socket is named like a screen socket.
+        name, = os.listdir(self.socket_dir)
+        pid, session = name.split(".", 1)
+        self.pid = int(pid)
+        self.assertEqual(session, "test")
+        path = os.path.join(self.socket_dir, name)
+
+        with _connect(path, supervisor.STREAM) as client:
+            client.sendall(b"say hello\n")
+            self.assertIn(b"say hello", _recv_until(client, b"say hello"))
+
+        # A SEND client does not receive the output, but the ATTACH client
+        # receives the recent output first.
+        with _connect(path, supervisor.SEND) as client:
+            client.sendall(b"list\n")
+        with _connect(path, supervisor.ATTACH) as client:
+            self.assertIn(b"say hello", _recv_until(client, b"list"))
+
+        # The supervisor removes the control socket, when it is terminated.
+        os.kill(self.pid, signal.SIGTERM)
+        deadline = time.monotonic() + 10
+        while os.listdir(self.socket_dir) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(os.listdir(self.socket_dir), [])
+        self.pid = None
+        return None
+
+
+class SlowClientTest(unittest.TestCase):
+    """
+    Runs the supervisor in a thread of the test process.
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "1.test")
+        self.supervisor = supervisor.Supervisor(self.path, ["/bin/cat"])
+        self.supervisor.spawn()
+        self.thread = threading.Thread(target=self.supervisor.run, daemon=True)
+        self.thread.start()
+        return None
+
+    def tearDown(self):
+        try:
+            os.kill(self.supervisor._pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.thread.join(10)
+        self._tmp.cleanup()
+        return None
+
+    def test_max_client_buffer(self):
+        with unittest.mock.patch.object(supervisor, "MAX_CLIENT_BUFFER",
+                                        64*1024):
+            # The slow client never reads.
+            slow = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            slow.connect(self.path)
+            slow.sendall(supervisor.STREAM + b"\n")
+
+            fast = _connect(self.path, supervisor.STREAM)
+            sender = _connect(self.path, supervisor.SEND)
+
+            # Send the lines in batches, which fit into the line buffer of
+            # the terminal, and wait for the echo of each batch, so that the
+            # fast client receives all output, although the slow client
+            # never reads.
+            line = b"x"*99 + b"\n"
+            batches = 300
+            total = 0
+            for i in range(batches):
+                batch = line*30 + "batch {}\n".format(i).encode()
+                sender.sendall(batch)
+                self.assertEqual(_recv_until(fast, batch), batch)
+                total += len(batch)
+            sender.close()
+            fast.close()
+
+        # The slow client has been disconnected.
+        slow.settimeout(5)
+        received = bytes()
+        while True:
+            chunk = slow.recv(65536)
+            if not chunk:
+                break
+            received += chunk
+        slow.close()
+        self.assertLess(len(received), total)
+        return None
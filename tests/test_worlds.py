@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+
+# The MIT License (MIT)
+# 
+# Copyright (c) 2014 Benedikt Schmitt <benedikt@benediktschmitt.de>
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+Tests the completion matcher of
+:meth:`emsm.worlds.WorldWrapper.send_command_get_output` with the console
+and the RCON transport.
+"""
+
+
+# Modules
+# ------------------------------------------------
+
+# std
+import os
+import re
+import tempfile
+import threading
+import unittest
+
+# local
+from emsm import rcon
+from emsm import server
+from emsm import worlds
+
+
+# Classes
+# ------------------------------------------------
+
+class FakeBackend(object):
+    """
+    A backend, which can not stream the console output, so that the log
+    file is followed.
+    """
+
+    def open_stream(self, world, pid):
+        return None
+
+
+class FakeServer(object):
+
+    def translate_command(self, cmd):
+        return cmd
+
+    def command_output_re(self, cmd):
+        return server.VanillaServerWrapper._COMMAND_OUTPUT_RE.get(cmd)
+
+
+class FakeRconPool(object):
+    """
+    Answers each command with *reply* and calls *on_command* like the
+    server, which processes the command.
+    """
+
+    def __init__(self, reply, on_command=None, error=None):
+        self.reply = reply
+        self.on_command = on_command
+        self.error = error
+        self.commands = list()
+        return None
+
+    def command(self, cmd, timeout):
+        if self.error is not None:
+            raise self.error
+        self.commands.append(cmd)
+        if self.on_command is not None:
+            self.on_command(cmd)
+        return self.reply
+
+
+class SendCommandGetOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self._tmp.name, "latest.log")
+        open(self.log_path, "w").close()
+
+        # The world is not initialised with an application, only the
+        # methods used by send_command_get_output() are replaced.
+        self.world = worlds.WorldWrapper.__new__(worlds.WorldWrapper)
+        self.world._name = "foo"
+        self.world._backend = FakeBackend()
+        self.world.pids = lambda cache=True: [1234]
+        self.world.server = lambda: FakeServer()
+        self.world.log_path = lambda: self.log_path
+        self.world.rcon = lambda: None
+
+        # The console commands and the lines, the server writes to the log
+        # in reaction.
+        self.console_commands = list()
+        self.log_lines = list()
+        self.world.send_command = self._send_command
+        return None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        return None
+
+    def _send_command(self, cmd):
+        self.console_commands.append(cmd)
+        self._write_log()
+        return None
+
+    def _write_log(self, *args):
+        """
+        Writes the :attr:`log_lines` to the log in a background thread, like
+        the server.
+        """
+        def write():
+            for line in self.log_lines:
+                with open(self.log_path, "a") as file:
+                    file.write(line + "\n")
+        threading.Timer(0.05, write).start()
+        return None
+
+    def test_console(self):
+        self.log_lines = ["[13:37:00] unrelated", "[13:37:01] Saved the world"]
+        output = self.world.send_command_get_output("save-all", timeout=5)
+        self.assertTrue(re.search("Saved the world", output))
+        self.assertEqual(self.console_commands, ["save-all"])
+        return None
+
+    def test_console_timeout(self):
+        # An unrelated line is not mistaken for the reply.
+        self.log_lines = ["[13:37:00] unrelated"]
+        with self.assertRaises(worlds.WorldCommandTimeout):
+            self.world.send_command_get_output("save-all", timeout=0.5)
+        return None
+
+    def test_console_output_re(self):
+        self.log_lines = ["[13:37:00] unrelated", "[13:37:01] done"]
+        output = self.world.send_command_get_output(
+            "foo", timeout=5, output_re="done"
+            )
+        self.assertTrue(output.endswith("done\n"))
+        return None
+
+    def test_rcon(self):
+        pool = FakeRconPool("Saved the world")
+        self.world.rcon = lambda: pool
+        output = self.world.send_command_get_output("save-all", timeout=5)
+        self.assertEqual(output, "Saved the world")
+        self.assertEqual(pool.commands, ["save-all"])
+        self.assertEqual(self.console_commands, [])
+        return None
+
+    def test_rcon_without_matcher(self):
+        pool = FakeRconPool("")
+        self.world.rcon = lambda: pool
+        self.assertEqual(self.world.send_command_get_output("foo"), "")
+        return None
+
+    def test_rcon_mismatch(self):
+        # The RCON reply does not satisfy the matcher, so the reply is read
+        # from the log, but the command is not sent again.
+        self.log_lines = ["[13:37:00] Saving...", "[13:37:01] Saved the world"]
+        pool = FakeRconPool("Saving...", on_command=self._write_log)
+        self.world.rcon = lambda: pool
+        output = self.world.send_command_get_output("save-all", timeout=5)
+        self.assertTrue(re.search("Saved the world", output))
+        self.assertEqual(pool.commands, ["save-all"])
+        self.assertEqual(self.console_commands, [])
+        return None
+
+    def test_rcon_mismatch_timeout(self):
+        pool = FakeRconPool("Saving...")
+        self.world.rcon = lambda: pool
+        with self.assertRaises(worlds.WorldCommandTimeout):
+            self.world.send_command_get_output("save-all", timeout=0.5)
+        self.assertEqual(self.console_commands, [])
+        return None
+
+    def test_rcon_unavailable(self):
+        self.log_lines = ["[13:37:00] Saved the world"]
+        pool = FakeRconPool(None, error=rcon.RconUnavailableError("refused"))
+        self.world.rcon = lambda: pool
+        output = self.world.send_command_get_output("save-all", timeout=5)
+        self.assertTrue(re.search("Saved the world", output))
+        self.assertEqual(self.console_commands, ["save-all"])
+        return None